@@ -0,0 +1,179 @@
+"""
+Benchmark harness for TB Processor.
+
+Times loader.load_sheet, combiner.combine_monthly and the output writers over
+synthetic workbooks of increasing size, reports wall time and peak memory, and
+compares the results against a stored baseline so regressions show up.
+
+    python -m benchmarks.bench --quick
+    python -m benchmarks.bench --update-baseline
+"""
+import argparse
+import gc
+import hashlib
+import json
+import pathlib
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import pandas as pd
+
+from tb_processor import combiner
+from tb_processor import compact
+from tb_processor import loader
+from tb_processor import writers
+
+from . import synthetic
+
+BASELINE_FILE = pathlib.Path(__file__).with_name("baseline.json")
+
+QUICK = {"accounts": [200, 1000], "years": [1, 3], "trailing_format_rows": [0, 5000], "repeat": 3}
+FULL = {"accounts": [500, 3000, 10000], "years": [1, 5, 10], "trailing_format_rows": [0, 50000], "repeat": 3}
+
+
+def checksum(df: pd.DataFrame) -> dict:
+    """Summarises a frame so results can be compared across runs and pandas versions."""
+    labels = "\n".join(str(v) for v in df.iloc[:, 0]) if len(df.columns) else ""
+    values = df.iloc[:, 1:].apply(pd.to_numeric, errors="coerce").fillna(0)
+    return {
+        "shape": list(df.shape),
+        "labels": hashlib.sha1(labels.encode()).hexdigest()[:16],
+        "total": round(float(values.to_numpy().sum()), 2),
+    }
+
+
+def measure(fn, repeat: int):
+    """
+    Runs fn repeat times and returns (result, best wall seconds, peak traced bytes).
+    Peak memory covers allocations seen by tracemalloc (Python objects and NumPy buffers).
+    """
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+
+    gc.collect()
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, best, peak
+
+
+def bench_load_sheet(workdir: pathlib.Path, sweep: dict, results: dict):
+    for accounts in sweep["accounts"]:
+        for trailing in sweep["trailing_format_rows"]:
+            directory = workdir / f"load_{accounts}_{trailing}"
+            path = synthetic.generate(directory, [2023], accounts, trailing_format_rows=trailing,
+                                      statements=("bs",))[0]
+            df, seconds, peak = measure(lambda: loader.load_bs(path), sweep["repeat"])
+            results[f"load_sheet/accounts={accounts}/trailing={trailing}"] = {
+                "seconds": seconds, "peak_bytes": peak, "checksum": checksum(df),
+            }
+
+
+def bench_combine_and_write(workdir: pathlib.Path, sweep: dict, results: dict):
+    for accounts in sweep["accounts"]:
+        for years in sweep["years"]:
+            directory = workdir / f"combine_{accounts}_{years}"
+            paths = synthetic.generate(directory, list(range(2024 - years, 2024)), accounts, statements=("bs",))
+            dfs = [loader.load_bs(p) for p in paths]
+
+            combined, seconds, peak = measure(lambda: combiner.combine_monthly(dfs), sweep["repeat"])
+            results[f"combine_monthly/accounts={accounts}/years={years}"] = {
+                "seconds": seconds, "peak_bytes": peak, "checksum": checksum(combined),
+            }
+
+            packed, seconds, peak = measure(lambda: combiner.combine_monthly(dfs, compact=True), sweep["repeat"])
+            results[f"combine_compact/accounts={accounts}/years={years}"] = {
+                "seconds": seconds, "peak_bytes": peak, "checksum": checksum(compact.expand(packed)),
+            }
+
+            for fmt in writers.WRITERS:
+                def write():
+                    with writers.open_writer(fmt, directory / "tb_full.xlsx") as writer:
+                        writer.write("Balance Sheet", combined)
+                try:
+                    _, seconds, peak = measure(write, 1)
+                except ImportError as e:
+                    print(f"  skipping {fmt} writer: {e}")
+                    continue
+                results[f"write_{fmt}/accounts={accounts}/years={years}"] = {
+                    "seconds": seconds, "peak_bytes": peak,
+                }
+
+
+def compare(results: dict, baseline: dict, tolerance: float, min_seconds: float) -> list:
+    """Lists regressions: slower or hungrier than baseline beyond tolerance, or different results."""
+    problems = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        if result["seconds"] > base["seconds"] * (1 + tolerance) and result["seconds"] - base["seconds"] > min_seconds:
+            problems.append(f"{name}: {result['seconds']:.3f}s vs baseline {base['seconds']:.3f}s")
+        if (result["peak_bytes"] > base["peak_bytes"] * (1 + tolerance)
+                and result["peak_bytes"] - base["peak_bytes"] > 1_000_000):
+            problems.append(f"{name}: peak {result['peak_bytes'] / 1e6:.1f} MB "
+                            f"vs baseline {base['peak_bytes'] / 1e6:.1f} MB")
+        if "checksum" in base and result.get("checksum") != base["checksum"]:
+            problems.append(f"{name}: result {result.get('checksum')} differs from baseline {base['checksum']}")
+    return problems
+
+
+def print_table(results: dict, baseline: dict):
+    print(f"{'case':<55} {'seconds':>9} {'peak MB':>9} {'vs base':>8}")
+    for name, result in results.items():
+        base = baseline.get(name)
+        ratio = f"{result['seconds'] / base['seconds']:.2f}x" if base and base["seconds"] else "new"
+        print(f"{name:<55} {result['seconds']:>9.3f} {result['peak_bytes'] / 1e6:>9.1f} {ratio:>8}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark TB Processor on synthetic workbooks.")
+    parser.add_argument("--quick", action="store_true", help="Run the small sweep")
+    parser.add_argument("--baseline", type=pathlib.Path, default=BASELINE_FILE)
+    parser.add_argument("--update-baseline", action="store_true", help="Store these results as the baseline")
+    parser.add_argument("--output", type=pathlib.Path, help="Also write the results as JSON")
+    parser.add_argument("--tolerance", type=float, default=0.5,
+                        help="Allowed slowdown or memory growth as a fraction (default 0.5)")
+    parser.add_argument("--min-seconds", type=float, default=0.05,
+                        help="Ignore slowdowns smaller than this many seconds")
+    args = parser.parse_args(argv)
+
+    sweep = QUICK if args.quick else FULL
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        workdir = pathlib.Path(tmp)
+        bench_load_sheet(workdir, sweep, results)
+        bench_combine_and_write(workdir, sweep, results)
+
+    try:
+        stored = json.loads(args.baseline.read_text())
+    except (OSError, ValueError):
+        stored = {}
+    baseline = stored.get("results", {})
+
+    print_table(results, baseline)
+    if args.output:
+        args.output.write_text(json.dumps({"results": results}, indent=2))
+
+    if args.update_baseline:
+        baseline.update(results)
+        args.baseline.write_text(json.dumps({"results": baseline}, indent=2, sort_keys=True) + "\n")
+        print(f"Baseline updated: {args.baseline}")
+        return 0
+
+    problems = compare(results, baseline, args.tolerance, args.min_seconds)
+    for problem in problems:
+        print(f"[REGRESSION] {problem}")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,82 @@
+"""
+Startup benchmark for the tb command.
+
+Runs `tb info` and `tb --help` under `python -X importtime` and checks that the
+imports stay within a time budget and that no heavy module (pandas, numpy,
+openpyxl) is imported by commands that don't need DataFrames.
+
+    python -m benchmarks.startup
+    python -m benchmarks.startup --budget-ms 100
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+
+COMMANDS = [["info"], ["--help"]]
+
+HEAVY_MODULES = ("pandas", "numpy", "openpyxl", "pyarrow", "xlsxwriter")
+
+BUDGET_MS = 150
+
+
+def import_times(args, cwd=None) -> dict:
+    """
+    Runs tb with args under -X importtime and returns {module: cumulative microseconds}
+    for the top-level imports it made.
+    """
+    result = subprocess.run([sys.executable, "-X", "importtime", "-m", "tb_processor.cli"] + list(args),
+                            capture_output=True, text=True, cwd=cwd,
+                            env={**os.environ, "PYTHONPATH": os.pathsep.join(sys.path)})
+    if result.returncode != 0:
+        raise RuntimeError(f"tb {' '.join(args)} failed:\n{result.stdout}{result.stderr}")
+
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if not cumulative.strip().isdigit():
+            # The header line
+            continue
+        # Drop the separator's space, keeping the indentation that marks nested imports
+        times[name[1:].rstrip()] = int(cumulative)
+    return times
+
+
+def total_ms(times: dict) -> float:
+    """Cumulative import time of the top-level imports (nested ones are indented)."""
+    return sum(us for name, us in times.items() if not name.startswith(" ")) / 1000
+
+
+def heavy_imports(times: dict) -> list:
+    return sorted({name.strip() for name in times if name.strip().split(".")[0] in HEAVY_MODULES})
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check the import time of tb commands.")
+    parser.add_argument("--budget-ms", type=float, default=BUDGET_MS,
+                        help=f"Allowed import time per command in milliseconds (default {BUDGET_MS})")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per command; the best run counts")
+    args = parser.parse_args(argv)
+
+    problems = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for command in COMMANDS:
+            runs = [import_times(command, cwd=tmp) for _ in range(args.repeat)]
+            best = min(total_ms(times) for times in runs)
+            heavy = heavy_imports(runs[-1])
+            print(f"tb {' '.join(command):<10} imports {best:7.1f} ms  (budget {args.budget_ms:.0f} ms)")
+            if best > args.budget_ms:
+                problems.append(f"tb {' '.join(command)} imports take {best:.1f} ms")
+            if heavy:
+                problems.append(f"tb {' '.join(command)} imports {', '.join(heavy[:5])}")
+
+    for problem in problems:
+        print(f"[REGRESSION] {problem}")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
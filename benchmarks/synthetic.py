@@ -0,0 +1,112 @@
+"""
+Generates synthetic QuickBooks-style trial balance exports for tests and benchmarks.
+
+Files are named like the real exports ("Balance Sheet by Month-2023.xlsx",
+"Profit and Loss by Month-2023.xlsx") and carry the same clutter: a preamble
+above the header row, section headers without numbers, "Total ..." rows and
+formatting that runs far past the last row of data.
+"""
+import argparse
+import pathlib
+import random
+from typing import List
+
+import openpyxl
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font
+
+MONTHS = ["January", "February", "March", "April", "May", "June", "July",
+          "August", "September", "October", "November", "December"]
+
+BS_SECTIONS = ["Current Assets", "Fixed Assets", "Other Assets", "Current Liabilities",
+               "Long-Term Liabilities", "Equity"]
+IS_SECTIONS = ["Income", "Cost of Goods Sold", "Expenses", "Other Income", "Other Expenses"]
+
+
+def account_names(count: int, sections: List[str]) -> List[List[str]]:
+    """Splits count account names across sections, returning one list per section."""
+    per_section = [[] for _ in sections]
+    for i in range(count):
+        per_section[i % len(sections)].append(f"{10000 + i} {sections[i % len(sections)]} Account {i}")
+    return per_section
+
+
+def statement_rows(year: int, accounts: int, sections: List[str], title: str,
+                   preamble_rows: int = 3, seed: int = 0) -> List[list]:
+    """Builds the rows of one by-month report, including preamble, sections and totals."""
+    rng = random.Random(seed * 10007 + year)
+    rows = [["Example Company LLC"], [title], [f"Fiscal year {year}"]][:preamble_rows]
+    rows += [[f"Generated report line {i}"] for i in range(max(0, preamble_rows - 3))]
+    rows.append([])
+    rows.append([None] + [f"{month} {year}" for month in MONTHS])
+
+    for section, names in zip(sections, account_names(accounts, sections)):
+        rows.append([section])
+        totals = [0.0] * 12
+        for name in names:
+            values = [round(rng.uniform(-50000, 50000), 2) for _ in MONTHS]
+            if rng.random() < 0.1:
+                values[rng.randrange(12)] = None
+            rows.append([name] + values)
+            totals = [t + (v or 0.0) for t, v in zip(totals, values)]
+        rows.append([f"Total {section}"] + [round(t, 2) for t in totals])
+        rows.append([])
+    return rows
+
+
+def write_report(path: pathlib.Path, rows: List[list], trailing_format_rows: int = 0,
+                 format_width: int = 26) -> pathlib.Path:
+    """Writes rows to path, followed by styled but empty rows like real exports carry."""
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet("Sheet1")
+    for row in rows:
+        ws.append(row)
+
+    if trailing_format_rows:
+        bold = Font(bold=True)
+        for _ in range(trailing_format_rows):
+            cell = WriteOnlyCell(ws, value=None)
+            cell.font = bold
+            ws.append([None] * (format_width - 1) + [cell])
+
+    wb.save(path)
+    return path
+
+
+def generate(directory, years: List[int], accounts: int = 200, preamble_rows: int = 3,
+             trailing_format_rows: int = 0, statements=("bs", "is"), seed: int = 0) -> List[pathlib.Path]:
+    """Writes one Balance Sheet and/or Profit and Loss file per year and returns their paths."""
+    directory = pathlib.Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for year in years:
+        if "bs" in statements:
+            rows = statement_rows(year, accounts, BS_SECTIONS, "Balance Sheet", preamble_rows, seed)
+            paths.append(write_report(directory / f"Balance Sheet by Month-{year}.xlsx", rows,
+                                      trailing_format_rows))
+        if "is" in statements:
+            rows = statement_rows(year, accounts, IS_SECTIONS, "Profit and Loss", preamble_rows, seed)
+            paths.append(write_report(directory / f"Profit and Loss by Month-{year}.xlsx", rows,
+                                      trailing_format_rows))
+    return paths
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("directory", help="Where to write the files")
+    parser.add_argument("--start-year", type=int, default=2014)
+    parser.add_argument("--years", type=int, default=10, help="Number of yearly files per statement")
+    parser.add_argument("--accounts", type=int, default=3000, help="Accounts per file")
+    parser.add_argument("--preamble-rows", type=int, default=3, help="Rows above the header row")
+    parser.add_argument("--trailing-format-rows", type=int, default=0,
+                        help="Styled empty rows written after the data")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    paths = generate(args.directory, list(range(args.start_year, args.start_year + args.years)),
+                     args.accounts, args.preamble_rows, args.trailing_format_rows, seed=args.seed)
+    print(f"Wrote {len(paths)} files to {args.directory}")
+
+
+if __name__ == "__main__":
+    main()
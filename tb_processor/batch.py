@@ -0,0 +1,201 @@
+"""
+Batch mode: processes many entities listed in a JSON manifest in one run.
+
+    {
+        "format": "xlsx",
+        "entities": [
+            {"name": "acme", "input_dir": "acme", "output": "out/acme.xlsx"},
+            {"name": "globex", "input_dir": "globex", "bs_pattern": "BS-*.xlsx"}
+        ],
+        "consolidated": {"name": "group", "output": "out/group.xlsx"}
+    }
+
+Relative paths are resolved against the manifest's directory. format, bs_pattern and
+is_pattern can be set at the top level or per entity. An entity without an output writes
+to the TB_OUTPUT_FILE name inside its input directory.
+"""
+import datetime
+import json
+import pathlib
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from . import combiner
+from . import compact as tb_compact
+from . import config
+from . import file_utils
+from . import loader
+from . import writers
+
+SHEETS = (("Balance Sheet", "bs_pattern", loader.load_bs), ("Income Statement", "is_pattern", loader.load_is))
+
+
+class Entity:
+    """One entity of a batch: where its files are, how they are named and where its output goes."""
+
+    def __init__(self, name: str, input_dir: pathlib.Path, output: pathlib.Path, fmt: str,
+                 bs_pattern: str = None, is_pattern: str = None):
+        self.name = name
+        self.input_dir = input_dir
+        self.output = output
+        self.format = fmt
+        self.patterns = {"bs_pattern": bs_pattern or config.BS_PATTERN,
+                         "is_pattern": is_pattern or config.IS_PATTERN}
+
+    def files(self, key: str) -> List[pathlib.Path]:
+        return file_utils.find_monthly_files(self.patterns[key], self.input_dir)
+
+
+def _format(spec: dict, default: str, where: str) -> str:
+    fmt = spec.get("format", default)
+    if fmt not in writers.WRITERS:
+        raise ValueError(f"{where}: unknown format '{fmt}', expected one of: {', '.join(writers.WRITERS)}")
+    return fmt
+
+
+def load_manifest(path, fmt: str = None) -> Tuple[List[Entity], Optional[Entity]]:
+    """
+    Reads a batch manifest and returns (entities, consolidated). consolidated describes the
+    output of the cross-entity total and is None when the manifest doesn't ask for one.
+    Raises ValueError when the manifest is malformed.
+    """
+    path = pathlib.Path(path)
+    try:
+        with open(path) as fh:
+            data = json.load(fh)
+    except ValueError as e:
+        raise ValueError(f"{path} is not valid JSON: {e}") from None
+    if not isinstance(data, dict) or not isinstance(data.get("entities"), list) or not data["entities"]:
+        raise ValueError(f"{path} must contain a non-empty \"entities\" list")
+
+    base = path.parent
+    default_fmt = _format(data, fmt or config.OUTPUT_FORMAT, str(path))
+    patterns = {key: data.get(key) for key in ("bs_pattern", "is_pattern")}
+    output_name = pathlib.Path(config.OUTPUT_FILE).name
+
+    entities = []
+    names = set()
+    for i, spec in enumerate(data["entities"]):
+        if not isinstance(spec, dict) or not spec.get("name") or not spec.get("input_dir"):
+            raise ValueError(f"{path}: entity {i + 1} needs a \"name\" and an \"input_dir\"")
+        if spec["name"] in names:
+            raise ValueError(f"{path}: entity name '{spec['name']}' is used more than once")
+        names.add(spec["name"])
+        input_dir = base / spec["input_dir"]
+        output = base / spec["output"] if spec.get("output") else input_dir / output_name
+        entities.append(Entity(
+            spec["name"], input_dir, output,
+            _format(spec, default_fmt, f"entity '{spec['name']}'"),
+            spec.get("bs_pattern", patterns["bs_pattern"]), spec.get("is_pattern", patterns["is_pattern"]),
+        ))
+
+    consolidated = data.get("consolidated")
+    if consolidated:
+        if isinstance(consolidated, str):
+            consolidated = {"output": consolidated}
+        if not isinstance(consolidated, dict) or not consolidated.get("output"):
+            raise ValueError(f"{path}: \"consolidated\" needs an \"output\"")
+        if consolidated.get("name", "consolidated") in names:
+            raise ValueError(f"{path}: the consolidated output needs a name no entity uses")
+        consolidated = Entity(consolidated.get("name", "consolidated"), base, base / consolidated["output"],
+                              _format(consolidated, default_fmt, "consolidated output"))
+    return entities, consolidated or None
+
+
+def iter_entities(entities: List[Entity], verbose: bool = False, jobs: int = 1, cache=None,
+                  compact: bool = False):
+    """
+    Loads the files of every entity in one shared pool, then yields (entity, {sheet: df})
+    per entity in manifest order. Loaded frames are released once their entity is combined.
+    """
+    tasks = []
+    spans = []
+    for entity in entities:
+        for sheet, key, load_fn in SHEETS:
+            files = entity.files(key)
+            spans.append((entity, sheet, len(tasks), len(files)))
+            tasks.extend((load_fn, f) for f in files)
+
+    print(f"Processing {len(tasks)} files for {len(entities)} entities...")
+    dfs = combiner.load_many(tasks, verbose, jobs, cache)
+
+    sheets = {}
+    for n, (entity, sheet, start, count) in enumerate(spans):
+        if count:
+            sheets[sheet] = combiner.combine_monthly(dfs[start:start + count], compact)
+            dfs[start:start + count] = [None] * count
+        if n + 1 == len(spans) or spans[n + 1][0] is not entity:
+            yield entity, sheets
+            sheets = {}
+
+
+def consolidate(dfs: List[pd.DataFrame]) -> pd.DataFrame:
+    """
+    Sums combined sheets of several entities. Accounts are matched by label and occurrence,
+    as in combine_monthly, and a month missing from an entity counts as 0.
+    """
+    blocks = []
+    key_column = None
+    for df in dfs:
+        df = tb_compact.expand(df)
+        if df.empty:
+            continue
+        key_column = key_column if key_column is not None else df.columns[0]
+        block = df[[col for col in df.columns if isinstance(col, datetime.date)]]
+        block.index = combiner.account_keys(df.iloc[:, 0])
+        blocks.append(block)
+    if not blocks:
+        return pd.DataFrame()
+
+    total = pd.concat(blocks).groupby(level=[0, 1]).sum()
+    columns = {key_column: total.index.get_level_values(0)}
+    for col in sorted(total.columns):
+        columns[col] = total[col].fillna(0).to_numpy()
+    return pd.DataFrame(columns)
+
+
+def write_sheets(entity: Entity, sheets: Dict[str, pd.DataFrame]) -> writers.SheetWriter:
+    """Writes an entity's sheets to its output and returns the writer."""
+    file_utils.ensure_output_dir(entity.output)
+    with writers.BackgroundWriter(writers.open_writer(entity.format, entity.output)) as writer:
+        for sheet, df in sheets.items():
+            writer.write(sheet, df)
+    return writer.writer
+
+
+def run(entities: List[Entity], consolidated: Entity = None, verbose: bool = False, jobs: int = 1,
+        cache=None, compact: bool = False, trial_balances=None) -> Dict[str, List[pathlib.Path]]:
+    """
+    Processes a batch: every entity's files share one pool, each entity gets its own output,
+    and with consolidated the entities' sheets are summed into one more output. Sheets are
+    also saved to trial_balances (a store.TrialBalanceStore) when given.
+    Returns the files written per entity name.
+    """
+    written = {}
+    totals: Dict[str, pd.DataFrame] = {}
+    for entity, sheets in iter_entities(entities, verbose, jobs, cache, compact):
+        sheets = {sheet: df for sheet, df in sheets.items() if not df.empty}
+        if not sheets:
+            print(f"  [{entity.name}] No data extracted from {entity.input_dir}")
+            continue
+        writer = write_sheets(entity, sheets)
+        written[entity.name] = writer.paths
+        print(f"  [{entity.name}] {', '.join(sheets)} written to {', '.join(str(p) for p in writer.paths)}")
+
+        for sheet, df in sheets.items():
+            if trial_balances is not None:
+                trial_balances.save(entity.name, sheet, df)
+            if consolidated is not None:
+                # Fold as we go so only the running total is kept
+                totals[sheet] = consolidate([totals[sheet], df]) if sheet in totals else tb_compact.expand(df)
+
+    if consolidated is not None and totals:
+        writer = write_sheets(consolidated, totals)
+        written[consolidated.name] = writer.paths
+        print(f"  [{consolidated.name}] {len(written) - 1} entities consolidated into "
+              f"{', '.join(str(p) for p in writer.paths)}")
+        if trial_balances is not None:
+            for sheet, df in totals.items():
+                trial_balances.save(consolidated.name, sheet, df)
+    return written
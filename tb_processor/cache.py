@@ -0,0 +1,252 @@
+"""On-disk cache of parsed workbooks so reruns skip files that have not changed."""
+import datetime
+import hashlib
+import json
+import os
+import pathlib
+import pickle
+import time
+from typing import Optional
+
+import pandas as pd
+
+from . import config
+from . import loader
+from . import sources
+
+INDEX_FILE = "index.json"
+FRAMES_DIR = "frames"
+
+
+def parquet_available() -> bool:
+    """True when pyarrow is installed and frames can be stored as Parquet."""
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _encode_label(label):
+    """Encodes a column label as JSON, or returns None if it cannot be."""
+    if isinstance(label, datetime.datetime):
+        return None
+    if isinstance(label, datetime.date):
+        return ["date", label.isoformat()]
+    if isinstance(label, str):
+        return ["str", label]
+    if isinstance(label, (int, float)) and not isinstance(label, bool):
+        return ["num", label]
+    return None
+
+
+def _decode_label(encoded):
+    kind, value = encoded
+    if kind == "date":
+        return datetime.date.fromisoformat(value)
+    return value
+
+
+def write_frame(path: pathlib.Path, df: pd.DataFrame) -> pathlib.Path:
+    """
+    Writes df next to path (without suffix) and returns the file written.
+    Parquet is used when pyarrow is installed and the frame allows it, otherwise pickle.
+    Column labels such as datetime.date and df.attrs survive the round trip.
+    """
+    path = pathlib.Path(path)
+    labels = [_encode_label(col) for col in df.columns]
+
+    if parquet_available() and all(label is not None for label in labels):
+        target = path.with_suffix(".parquet")
+        stored = df.copy(deep=False)
+        stored.columns = [f"c{i}" for i in range(len(df.columns))]
+        stored.attrs = {}
+        meta = {"columns": labels, "attrs": df.attrs}
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            table = pa.Table.from_pandas(stored)
+            table = table.replace_schema_metadata({
+                **(table.schema.metadata or {}),
+                b"tb_processor": json.dumps(meta, default=str).encode(),
+            })
+            pq.write_table(table, target)
+            return target
+        except Exception:
+            # Mixed-type object columns can't be stored as Parquet
+            if target.exists():
+                target.unlink()
+
+    target = path.with_suffix(".pkl")
+    with open(target, "wb") as fh:
+        pickle.dump(df, fh, protocol=pickle.HIGHEST_PROTOCOL)
+    return target
+
+
+def read_frame(path: pathlib.Path) -> pd.DataFrame:
+    """Reads a frame written by write_frame."""
+    path = pathlib.Path(path)
+    if path.suffix == ".pkl":
+        with open(path, "rb") as fh:
+            return pickle.load(fh)
+
+    import pyarrow.parquet as pq
+    table = pq.read_table(path)
+    meta = json.loads(table.schema.metadata[b"tb_processor"])
+    df = table.to_pandas()
+    df.columns = [_decode_label(label) for label in meta["columns"]]
+    df.attrs = meta.get("attrs", {})
+    return df
+
+
+def file_digest(path: pathlib.Path) -> str:
+    """Hashes the file contents (of a path or a source from sources.py)."""
+    digest = hashlib.blake2b(digest_size=20)
+    with sources.open_binary(path) as fh:
+        for chunk in iter(lambda: fh.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ParsedFileCache:
+    """
+    Stores the DataFrames returned by loader.load_bs/load_is, keyed by the source file's
+    path, size, mtime and content hash plus loader.LOADER_VERSION.
+    Entries are evicted least recently used first once the cache grows past max_bytes.
+    """
+
+    def __init__(self, directory=None, max_bytes: int = None):
+        self.directory = pathlib.Path(directory or config.CACHE_DIR).expanduser()
+        self.max_bytes = config.CACHE_MAX_BYTES if max_bytes is None else max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._dirty = False
+        self._entries = self._read_index()
+
+    def _read_index(self) -> dict:
+        try:
+            with open(self.directory / INDEX_FILE) as fh:
+                return json.load(fh).get("entries", {})
+        except (OSError, ValueError):
+            return {}
+
+    @staticmethod
+    def entry_id(kind: str, path: pathlib.Path) -> str:
+        """Identifies the cache slot for one source file loaded one way."""
+        key = f"{kind}\0{sources.identity(path)}"
+        return hashlib.blake2b(key.encode(), digest_size=16).hexdigest()
+
+    def get(self, kind: str, path: pathlib.Path) -> Optional[pd.DataFrame]:
+        """Returns the cached frame for path, or None when it is missing or stale."""
+        entry_id = self.entry_id(kind, path)
+        entry = self._entries.get(entry_id)
+        if entry is None or entry["loader_version"] != loader.LOADER_VERSION:
+            self.misses += 1
+            return None
+
+        try:
+            st = sources.stat(path)
+            if st.st_size != entry["size"]:
+                self.misses += 1
+                return None
+            if st.st_mtime_ns != entry["mtime_ns"]:
+                # Touched or copied: only trust the entry if the contents still match
+                if file_digest(path) != entry["digest"]:
+                    self.misses += 1
+                    return None
+                entry["mtime_ns"] = st.st_mtime_ns
+            df = read_frame(self.directory / FRAMES_DIR / entry["file"])
+        except (OSError, ValueError, KeyError):
+            self._drop(entry_id)
+            self.misses += 1
+            return None
+
+        entry["last_used"] = time.time()
+        self._dirty = True
+        self.hits += 1
+        return df
+
+    def put(self, kind: str, path: pathlib.Path, df: pd.DataFrame):
+        """Stores the frame loaded from path."""
+        entry_id = self.entry_id(kind, path)
+        try:
+            st = sources.stat(path)
+            digest = file_digest(path)
+            frames = self.directory / FRAMES_DIR
+            frames.mkdir(parents=True, exist_ok=True)
+            self._drop(entry_id)
+            target = write_frame(frames / entry_id, df)
+        except OSError as e:
+            print(f"  Could not cache {pathlib.Path(path).name}: {e}")
+            return
+
+        self._entries[entry_id] = {
+            "path": sources.identity(path),
+            "kind": kind,
+            "size": st.st_size,
+            "mtime_ns": st.st_mtime_ns,
+            "digest": digest,
+            "loader_version": loader.LOADER_VERSION,
+            "file": target.name,
+            "bytes": target.stat().st_size,
+            "last_used": time.time(),
+        }
+        self._dirty = True
+        self._evict()
+
+    def _drop(self, entry_id: str):
+        entry = self._entries.pop(entry_id, None)
+        if entry is not None:
+            self._dirty = True
+            try:
+                (self.directory / FRAMES_DIR / entry["file"]).unlink()
+            except OSError:
+                pass
+
+    def _evict(self):
+        """Removes least recently used entries until the cache fits in max_bytes."""
+        total = sum(entry["bytes"] for entry in self._entries.values())
+        for entry_id, entry in sorted(self._entries.items(), key=lambda item: item[1]["last_used"]):
+            if total <= self.max_bytes:
+                break
+            total -= entry["bytes"]
+            self._drop(entry_id)
+
+    def flush(self):
+        """Writes the index to disk if anything changed."""
+        if not self._dirty:
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        tmp = self.directory / f"{INDEX_FILE}.{os.getpid()}.tmp"
+        with open(tmp, "w") as fh:
+            json.dump({"entries": self._entries}, fh)
+        os.replace(tmp, self.directory / INDEX_FILE)
+        self._dirty = False
+
+    def clear(self) -> int:
+        """Removes every entry and returns how many were removed."""
+        count = len(self._entries)
+        for entry_id in list(self._entries):
+            self._drop(entry_id)
+        self.flush()
+        return count
+
+    def stats(self) -> dict:
+        """Summarises what the cache holds."""
+        return {
+            "directory": str(self.directory),
+            "entries": len(self._entries),
+            "bytes": sum(entry["bytes"] for entry in self._entries.values()),
+            "max_bytes": self.max_bytes,
+            "loader_version": loader.LOADER_VERSION,
+            "stale": sum(1 for entry in self._entries.values()
+                         if entry["loader_version"] != loader.LOADER_VERSION),
+            "format": "parquet" if parquet_available() else "pickle",
+        }
+
+
+def open_cache(enabled: bool = None) -> Optional[ParsedFileCache]:
+    """Returns the configured cache, or None when caching is turned off."""
+    if enabled is None:
+        enabled = config.CACHE_ENABLED
+    return ParsedFileCache() if enabled else None
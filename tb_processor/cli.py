@@ -1,12 +1,14 @@
 import click
-import pandas as pd
+import functools
 import os
 import sys
 from datetime import datetime
 
+# Modules that import pandas are imported inside the commands that need them,
+# so tb --help and tb info start quickly
 from . import config
 from . import file_utils
-from . import combiner
+from . import profiling
 
 @click.group()
 def main():
@@ -15,15 +17,178 @@ def main():
     click.echo(f"Using input directory: {config.INPUT_DIR}")
     click.echo(f"Output file will be: {config.OUTPUT_FILE}")
 
+PROFILING_OPTIONS = [
+    click.option('--profile', is_flag=True, help='Print time, rows and peak memory per stage'),
+    click.option('--report-json', type=click.Path(dir_okay=False),
+                 help='Write the per-stage run report as JSON to this path'),
+    click.option('--cprofile', 'cprofile_path', type=click.Path(dir_okay=False),
+                 help='Dump cProfile stats of the --cprofile-stage stages to this path'),
+    click.option('--cprofile-stage', default='combine', show_default=True,
+                 help='Stage name prefix profiled by --cprofile (e.g. combine, load, write)'),
+]
+
+def with_options(fn, options):
+    for option in reversed(options):
+        fn = option(fn)
+    return fn
+
+def profiled(fn):
+    """Adds the profiling options to a command and profiles it when one of them is given."""
+    @functools.wraps(fn)
+    def wrapper(*args, profile, report_json, cprofile_path, cprofile_stage, **kwargs):
+        command = click.get_current_context().info_name
+        with profiling.session(profile, report_json, cprofile_path, cprofile_stage, command):
+            return fn(*args, **kwargs)
+    
+    return with_options(wrapper, PROFILING_OPTIONS)
+
+def use_reader(ctx, param, value):
+    """Sets the input reader for the run, failing early when it isn't installed."""
+    if value != "auto":
+        from . import readers
+        if not readers.READERS[value].available():
+            raise click.BadParameter(f"{value} needs {readers.READERS[value].requires}, which is not installed")
+    config.READER = value
+
+READER_OPTION = click.option('--reader', type=click.Choice(list(config.READERS)), default=config.READER,
+                             show_default=True, expose_value=False, callback=use_reader,
+                             help='Input reader backend (auto picks the fastest installed one per file type)')
+
+def loading_options(fn):
+    """Options for loading and combining files, shared by bs, is, all and batch."""
+    return with_options(fn, [
+        click.option('--verbose', '-v', is_flag=True, help='Enable verbose output'),
+        click.option('--jobs', '-j', type=int, default=config.JOBS, show_default=True,
+                     help='Number of worker processes for loading files (0 = one per CPU)'),
+        click.option('--no-cache', is_flag=True, help='Parse every file even if a cached copy exists'),
+        READER_OPTION,
+        click.option('--format', 'fmt', type=click.Choice(list(config.OUTPUT_FORMATS)),
+                     default=config.OUTPUT_FORMAT, show_default=True,
+                     help='Output format (parquet, csv and arrow write one file per sheet)'),
+        click.option('--compact/--no-compact', default=config.COMPACT, show_default=True,
+                     help='Combine with integer-coded accounts and amounts in cents to save memory'),
+        click.option('--store/--no-store', 'to_store', default=config.STORE_ENABLED, show_default=True,
+                     help='Also save the combined sheets to the SQLite store at TB_STORE_FILE'),
+    ])
+
+def processing_options(fn):
+    """Options shared by the bs, is and all commands, including the profiling options."""
+    return loading_options(with_options(profiled(fn), [
+        click.option('--incremental', 'incremental_run', is_flag=True,
+                     help='Only rebuild sheets whose source files changed'),
+        click.option('--entity', default=config.ENTITY, show_default=True,
+                     help='Entity name the sheets are saved under in the store'),
+        click.option('--pipeline/--no-pipeline', default=config.PIPELINE, show_default=True,
+                     help='Fold each file into the result as soon as it loads, to bound memory'),
+        click.option('--in-flight', type=int, default=config.IN_FLIGHT, show_default=True,
+                     help='With --pipeline, the maximum number of loaded files waiting to be folded (0 = two per worker)'),
+        click.option('--rollups', is_flag=True,
+                     help='Also write section subtotals, quarterly, YTD and trailing-12-month sheets'),
+    ]))
+
+def describe_output(writer):
+    """Names the files a writer produced for the success message."""
+    return ", ".join(str(p) for p in writer.paths) or config.OUTPUT_FILE
+
+def warn_duplicates(files):
+    """Reports files whose names give the same period; months they share come from the last one."""
+    for period, group in file_utils.duplicate_periods(files).items():
+        click.echo(f"[WARNING] {len(group)} files share the period {period.isoformat()}: "
+                   f"{', '.join(f.name for f in group)} (overlapping months come from {group[-1].name})")
+
+def save_to_store(enabled, entity, sheet, df):
+    """Saves a combined sheet to the trial balance store when --store is on."""
+    if not enabled or df.empty:
+        return
+    from . import store as tb_store
+    
+    with profiling.stage("store", sheet=sheet) as info:
+        with tb_store.TrialBalanceStore(config.STORE_FILE) as trial_balances:
+            info["rows"] = trial_balances.save(entity, sheet, df)
+    click.echo(f"{sheet} saved to {config.STORE_FILE} as '{entity}'")
+
+def rollup_sheets(enabled, sheet, df):
+    """The extra sheets --rollups adds for a combined sheet, by name."""
+    if not enabled or df.empty:
+        return {}
+    from . import rollups as tb_rollups
+    
+    with profiling.stage("rollups", sheet=sheet) as info:
+        sheets = tb_rollups.rollup_sheets(sheet, df)
+        info["rows"] = sum(len(extra) for extra in sheets.values())
+    return sheets
+
+def with_rollups(enabled, built, manifest):
+    """Adds the --rollups sheets of each built (sheet, df, inputs, changed) tuple for write_incremental."""
+    out = []
+    for sheet, df, inputs, changed in built:
+        out.append((sheet, df, inputs, changed))
+        for name, extra in rollup_sheets(enabled, sheet, df).items():
+            out.append((name, extra, inputs, changed or name not in manifest.sheets))
+    return out
+
+def write_incremental(built, fmt, group=None):
+    """
+    Writes the output from (sheet, df, inputs, changed) tuples and updates the run manifest.
+    With a group (the statement bs or is built), only that statement's sheets are replaced
+    and the other sheets of the output stay as they are; without one, the built sheets
+    become the whole output. Formats with one file per sheet only rewrite changed sheets.
+    The manifest is re-read under the output lock and only this run's sheets are applied
+    to it, so runs in parallel take turns without writing back each other's old sheets.
+    """
+    from . import incremental
+    from . import shards
+    from . import writers
+    
+    built = [b for b in built if not b[1].empty]
+    names = {sheet for sheet, _, _, _ in built}
+    per_sheet = writers.WRITERS[fmt].per_sheet
+    
+    with shards.output_lock(config.OUTPUT_FILE):
+        manifest = incremental.RunManifest(config.OUTPUT_FILE, fmt)
+        # Sheets of earlier runs that this run replaces; sheets in their own files are left alone
+        stale = [] if per_sheet else [name for name in manifest.sheets if name not in names
+                                      and (group is None or shards.group_of(name) == group)]
+        for name in stale:
+            manifest.forget(name)
+        changed = [sheet for sheet, _, inputs, rebuilt in built
+                   if rebuilt or not manifest.is_current(sheet, inputs)]
+        
+        if manifest.valid and not stale and not changed:
+            click.echo("[SUCCESS] Nothing changed, the output is up to date")
+            return
+        
+        sheets = {}
+        for sheet, df, inputs, _ in built:
+            if sheet in changed or not per_sheet:
+                sheets[sheet] = df
+            if sheet in changed:
+                manifest.record(sheet, inputs, df)
+        
+        with writers.BackgroundWriter(shards.open_output(fmt, config.OUTPUT_FILE, group)) as writer:
+            for sheet, df in sheets.items():
+                writer.write(sheet, df)
+        manifest.save(writer.paths)
+    
+    click.echo(f"[SUCCESS] {', '.join(sheets)} written to {describe_output(writer)}")
+
 @main.command("bs")
-@click.option('--verbose', '-v', is_flag=True, help='Enable verbose output')
-def process_bs(verbose):
-    """Loads all BS files, combines them, and writes to Excel."""
+@processing_options
+def process_bs(verbose, jobs, no_cache, fmt, compact, to_store, incremental_run, entity,
+               pipeline, in_flight, rollups):
+    """Loads all BS files, combines them, and writes the output."""
+    from . import cache as tb_cache
+    from . import combiner
+    from . import incremental
+    from . import loader
+    from . import shards
+    
     try:
         click.echo("Processing Balance Sheet files...")
         
         # Find files matching the pattern
         files = file_utils.find_monthly_files(config.BS_PATTERN)
+        warn_duplicates(files)
         
         if not files:
             click.echo("No Balance Sheet files found matching pattern. Please check your input directory.")
@@ -34,22 +199,36 @@ def process_bs(verbose):
             for f in files:
                 click.echo(f"  - {f.name}")
         
+        file_utils.ensure_output_dir()
+            
+        cache = None if no_cache else tb_cache.open_cache()
+        
+        if incremental_run:
+            manifest = incremental.RunManifest(config.OUTPUT_FILE, fmt)
+            combined_df, changed = incremental.build_sheet(manifest, "Balance Sheet", files, loader.load_bs,
+                                                           verbose, jobs, cache, compact)
+            if combined_df.empty:
+                click.echo("No data was extracted from the files. Please check file format.")
+                return
+            built = [("Balance Sheet", combined_df, incremental.fingerprint(files), changed)]
+            write_incremental(with_rollups(rollups, built, manifest), fmt, "Balance Sheet")
+            save_to_store(to_store, entity, "Balance Sheet", combined_df)
+            return
+        
         # Process files
-        combined_df = combiner.combine_all_bs(files)
+        combined_df = combiner.combine_all_bs(files, verbose, jobs, cache, compact, pipeline, in_flight)
         
         if combined_df.empty:
             click.echo("No data was extracted from the files. Please check file format.")
             return
             
-        # Create output directory if it doesn't exist
-        output_dir = os.path.dirname(config.OUTPUT_FILE)
-        if output_dir and not os.path.exists(output_dir):
-            os.makedirs(output_dir)
-            
-        # Write to Excel
-        with pd.ExcelWriter(config.OUTPUT_FILE, engine="openpyxl") as writer:
-            combined_df.to_excel(writer, sheet_name="Balance Sheet", index=False)
-        click.echo(f"[SUCCESS] Balance Sheet data written to {config.OUTPUT_FILE}")
+        # Write the output, a workbook keeps the sheets of the other statement
+        with shards.open_output(fmt, config.OUTPUT_FILE, "Balance Sheet") as writer:
+            writer.write("Balance Sheet", combined_df)
+            for name, extra in rollup_sheets(rollups, "Balance Sheet", combined_df).items():
+                writer.write(name, extra)
+        click.echo(f"[SUCCESS] Balance Sheet data written to {describe_output(writer)}")
+        save_to_store(to_store, entity, "Balance Sheet", combined_df)
         
     except Exception as e:
         click.echo(f"[ERROR] Error processing Balance Sheet files: {str(e)}")
@@ -59,14 +238,22 @@ def process_bs(verbose):
         sys.exit(1)
 
 @main.command("is")
-@click.option('--verbose', '-v', is_flag=True, help='Enable verbose output')
-def process_is(verbose):
-    """Loads all IS files, combines them, and writes to Excel."""
+@processing_options
+def process_is(verbose, jobs, no_cache, fmt, compact, to_store, incremental_run, entity,
+               pipeline, in_flight, rollups):
+    """Loads all IS files, combines them, and writes the output."""
+    from . import cache as tb_cache
+    from . import combiner
+    from . import incremental
+    from . import loader
+    from . import shards
+    
     try:
         click.echo("Processing Income Statement files...")
         
         # Find files matching the pattern
         files = file_utils.find_monthly_files(config.IS_PATTERN)
+        warn_duplicates(files)
         
         if not files:
             click.echo("No Income Statement files found matching pattern. Please check your input directory.")
@@ -77,27 +264,37 @@ def process_is(verbose):
             for f in files:
                 click.echo(f"  - {f.name}")
         
+        file_utils.ensure_output_dir()
+            
+        cache = None if no_cache else tb_cache.open_cache()
+        
+        if incremental_run:
+            manifest = incremental.RunManifest(config.OUTPUT_FILE, fmt)
+            combined_df, changed = incremental.build_sheet(manifest, "Income Statement", files, loader.load_is,
+                                                           verbose, jobs, cache, compact)
+            if combined_df.empty:
+                click.echo("No data was extracted from the files. Please check file format.")
+                return
+            built = [("Income Statement", combined_df, incremental.fingerprint(files), changed)]
+            write_incremental(with_rollups(rollups, built, manifest), fmt, "Income Statement")
+            save_to_store(to_store, entity, "Income Statement", combined_df)
+            return
+        
         # Process files
-        combined_df = combiner.combine_all_is(files)
+        combined_df = combiner.combine_all_is(files, verbose, jobs, cache, compact, pipeline, in_flight)
         
         if combined_df.empty:
             click.echo("No data was extracted from the files. Please check file format.")
             return
         
-        # Create output directory if it doesn't exist
-        output_dir = os.path.dirname(config.OUTPUT_FILE)
-        if output_dir and not os.path.exists(output_dir):
-            os.makedirs(output_dir)
-            
-        # Check if file exists to determine mode
-        mode = 'a' if os.path.exists(config.OUTPUT_FILE) else 'w'
-        if_sheet_exists = 'replace' if mode == 'a' else None
+        # Write the output, a workbook keeps the sheets of the other statement
+        with shards.open_output(fmt, config.OUTPUT_FILE, "Income Statement") as writer:
+            writer.write("Income Statement", combined_df)
+            for name, extra in rollup_sheets(rollups, "Income Statement", combined_df).items():
+                writer.write(name, extra)
         
-        # Write to Excel
-        with pd.ExcelWriter(config.OUTPUT_FILE, engine="openpyxl", mode=mode, if_sheet_exists=if_sheet_exists) as writer:
-            combined_df.to_excel(writer, sheet_name="Income Statement", index=False)
-        
-        click.echo(f"[SUCCESS] Income Statement data written to {config.OUTPUT_FILE}")
+        click.echo(f"[SUCCESS] Income Statement data written to {describe_output(writer)}")
+        save_to_store(to_store, entity, "Income Statement", combined_df)
         
     except Exception as e:
         click.echo(f"[ERROR] Error processing Income Statement files: {str(e)}")
@@ -107,46 +304,66 @@ def process_is(verbose):
         sys.exit(1)
 
 @main.command("all")
-@click.option('--verbose', '-v', is_flag=True, help='Enable verbose output')
-def process_all(verbose):
+@processing_options
+def process_all(verbose, jobs, no_cache, fmt, compact, to_store, incremental_run, entity,
+                pipeline, in_flight, rollups):
     """Processes both Balance Sheet and Income Statement files."""
+    from . import cache as tb_cache
+    from . import combiner
+    from . import incremental
+    from . import loader
+    from . import shards
+    from . import writers
+    
     try:
         click.echo("Processing all files...")
         
         bs_files = file_utils.find_monthly_files(config.BS_PATTERN)
         is_files = file_utils.find_monthly_files(config.IS_PATTERN)
+        warn_duplicates(bs_files)
+        warn_duplicates(is_files)
 
         if not bs_files and not is_files:
             click.echo("No files found to process.")
             return
 
-        # Create output directory if it doesn't exist
-        output_dir = os.path.dirname(config.OUTPUT_FILE)
-        if output_dir and not os.path.exists(output_dir):
-            os.makedirs(output_dir)
-
-        with pd.ExcelWriter(config.OUTPUT_FILE, engine="openpyxl") as writer:
-            if bs_files:
-                bs_df = combiner.combine_all_bs(bs_files)
-                if not bs_df.empty:
-                    bs_df.to_excel(writer, sheet_name="Balance Sheet", index=False)
-                    click.echo("Balance Sheet data written.")
-                else:
-                    click.echo("No Balance Sheet data extracted.")
-            else:
-                click.echo("No Balance Sheet files found.")
-
-            if is_files:
-                is_df = combiner.combine_all_is(is_files)
-                if not is_df.empty:
-                    is_df.to_excel(writer, sheet_name="Income Statement", index=False)
-                    click.echo("Income Statement data written.")
+        file_utils.ensure_output_dir()
+
+        cache = None if no_cache else tb_cache.open_cache()
+        
+        if incremental_run:
+            manifest = incremental.RunManifest(config.OUTPUT_FILE, fmt)
+            built = []
+            for sheet, files, load_fn in (("Balance Sheet", bs_files, loader.load_bs),
+                                          ("Income Statement", is_files, loader.load_is)):
+                if files:
+                    df, changed = incremental.build_sheet(manifest, sheet, files, load_fn, verbose, jobs, cache,
+                                                          compact)
+                    built.append((sheet, df, incremental.fingerprint(files), changed))
+            write_incremental(with_rollups(rollups, built, manifest), fmt)
+            for sheet, df, _, _ in built:
+                save_to_store(to_store, entity, sheet, df)
+            return
+
+        found = {"Balance Sheet": bool(bs_files), "Income Statement": bool(is_files)}
+
+        # Load both sets in one pool so BS and IS files are parsed at the same time,
+        # and write each sheet in the background while the next one is combined
+        with writers.BackgroundWriter(shards.open_output(fmt, config.OUTPUT_FILE)) as writer:
+            for sheet, df in combiner.iter_combine_all(bs_files, is_files, verbose, jobs, cache, compact,
+                                                      pipeline, in_flight):
+                if not found[sheet]:
+                    click.echo(f"No {sheet} files found.")
+                elif df.empty:
+                    click.echo(f"No {sheet} data extracted.")
                 else:
-                    click.echo("No Income Statement data extracted.")
-            else:
-                click.echo("No Income Statement files found.")
+                    writer.write(sheet, df)
+                    for name, extra in rollup_sheets(rollups, sheet, df).items():
+                        writer.write(name, extra)
+                    click.echo(f"{sheet} data written.")
+                    save_to_store(to_store, entity, sheet, df)
                 
-        click.echo(f"[SUCCESS] All data written to {config.OUTPUT_FILE}")
+        click.echo(f"[SUCCESS] All data written to {describe_output(writer)}")
         
     except Exception as e:
         click.echo(f"[ERROR] Error processing files: {str(e)}")
@@ -155,14 +372,108 @@ def process_all(verbose):
             click.echo(traceback.format_exc())
         sys.exit(1)
 
+@main.command("batch")
+@click.argument('manifest', type=click.Path(exists=True, dir_okay=False))
+@loading_options
+@profiled
+def process_batch(manifest, verbose, jobs, no_cache, fmt, compact, to_store):
+    """Processes every entity listed in a JSON manifest in one shared worker pool."""
+    from . import batch
+    from . import cache as tb_cache
+    from . import store as tb_store
+    
+    try:
+        entities, consolidated = batch.load_manifest(manifest, fmt)
+        click.echo(f"Processing {len(entities)} entities from {manifest}...")
+        
+        cache = None if no_cache else tb_cache.open_cache()
+        trial_balances = tb_store.TrialBalanceStore(config.STORE_FILE) if to_store else None
+        try:
+            written = batch.run(entities, consolidated, verbose, jobs, cache, compact, trial_balances)
+        finally:
+            if trial_balances is not None:
+                trial_balances.close()
+        
+        if not written:
+            click.echo("No data was extracted from any entity. Please check the manifest.")
+            return
+        click.echo(f"[SUCCESS] Outputs written for {len(written)} of {len(entities) + bool(consolidated)} targets")
+        if to_store:
+            click.echo(f"Sheets saved to {config.STORE_FILE}")
+        
+    except Exception as e:
+        click.echo(f"[ERROR] Error processing batch: {str(e)}")
+        if verbose:
+            import traceback
+            click.echo(traceback.format_exc())
+        sys.exit(1)
+
+@main.command("watch")
+@loading_options
+@click.option('--entity', default=config.ENTITY, show_default=True,
+              help='Entity name the sheets are saved under in the store')
+@click.option('--interval', type=float, default=2.0, show_default=True,
+              help='Seconds between scans of the input directory')
+@click.option('--debounce', type=float, default=1.0, show_default=True,
+              help='Seconds the files must stay unchanged before a rebuild')
+def watch_files(verbose, jobs, no_cache, fmt, compact, to_store, entity, interval, debounce):
+    """Rebuilds the output whenever Balance Sheet or Income Statement files change."""
+    from . import cache as tb_cache
+    from . import store as tb_store
+    from . import watch as tb_watch
+    
+    cache = None if no_cache else tb_cache.open_cache()
+    trial_balances = tb_store.TrialBalanceStore(config.STORE_FILE) if to_store else None
+    watcher = tb_watch.Watcher(fmt, verbose, jobs, cache, compact, trial_balances, entity)
+    try:
+        watcher.run(interval, debounce)
+    except KeyboardInterrupt:
+        click.echo("Stopped watching.")
+    finally:
+        if trial_balances is not None:
+            trial_balances.close()
+
+@main.command("serve")
+@click.option('--host', default='127.0.0.1', show_default=True, help='Address to listen on')
+@click.option('--port', type=int, default=8765, show_default=True, help='Port to listen on')
+@click.option('--interval', type=float, default=2.0, show_default=True,
+              help='Seconds between checks of the input directory for changed files')
+@click.option('--verbose', '-v', is_flag=True, help='Enable verbose output and log every request')
+@click.option('--jobs', '-j', type=int, default=config.JOBS, show_default=True,
+              help='Number of worker processes for loading files (0 = one per CPU)')
+@click.option('--no-cache', is_flag=True, help='Parse every file even if a cached copy exists')
+@READER_OPTION
+def serve_queries(host, port, interval, verbose, jobs, no_cache):
+    """Answers JSON balance queries over HTTP from the combined sheets kept in memory."""
+    from . import cache as tb_cache
+    from . import server as tb_server
+    
+    cache = None if no_cache else tb_cache.open_cache()
+    try:
+        httpd = tb_server.TrialBalanceServer((host, port), verbose, jobs, cache)
+    except OSError as e:
+        click.echo(f"[ERROR] Could not listen on {host}:{port}: {e}")
+        sys.exit(1)
+    
+    click.echo(f"Serving {httpd.state.files} files on http://{host}:{httpd.server_port} "
+               f"(/query, /accounts, /status; Ctrl+C to stop)")
+    try:
+        httpd.serve(interval)
+    except KeyboardInterrupt:
+        click.echo("Stopped serving.")
+
 @main.command("info")
 def show_info():
     """Shows configuration and file information."""
     click.echo("TB Processor Configuration:")
     click.echo(f"  Input Directory: {config.INPUT_DIR}")
     click.echo(f"  Output File: {config.OUTPUT_FILE}")
+    click.echo(f"  Output Format: {config.OUTPUT_FORMAT}")
+    click.echo(f"  Store File: {config.STORE_FILE}")
     click.echo(f"  Balance Sheet Pattern: {config.BS_PATTERN}")
     click.echo(f"  Income Statement Pattern: {config.IS_PATTERN}")
+    click.echo(f"  Search Subdirectories: {'yes' if config.RECURSIVE else 'no'}")
+    click.echo(f"  Reader: {config.READER}")
     click.echo()
     
     bs_files = file_utils.find_monthly_files(config.BS_PATTERN)
@@ -175,6 +486,64 @@ def show_info():
     click.echo(f"Found {len(is_files)} Income Statement files:")
     for f in is_files:
         click.echo(f"  - {f.name}")
+    
+    warn_duplicates(bs_files)
+    warn_duplicates(is_files)
+
+@main.command("query")
+@click.option('--account', '-a', 'accounts', multiple=True, help='Account name (repeat for several accounts)')
+@click.option('--from', 'start', help='First period, as YYYY-MM or YYYY-MM-DD')
+@click.option('--to', 'end', help='Last period, as YYYY-MM or YYYY-MM-DD')
+@click.option('--entity', help='Only rows of this entity')
+@click.option('--statement', type=click.Choice(['bs', 'is']), help='Only Balance Sheet or Income Statement rows')
+@click.option('--wide', is_flag=True, help='One row per account with a column per period')
+@click.option('--csv', 'as_csv', is_flag=True, help='Print CSV instead of a table')
+def query_store(accounts, start, end, entity, statement, wide, as_csv):
+    """Looks up accounts and periods in the trial balance store."""
+    from . import store as tb_store
+    
+    if not os.path.exists(config.STORE_FILE):
+        click.echo(f"[ERROR] No store at {config.STORE_FILE}. Run bs, is or all with --store first.")
+        sys.exit(1)
+    
+    try:
+        with tb_store.TrialBalanceStore(config.STORE_FILE) as trial_balances:
+            result = trial_balances.query(accounts, start, end, entity, statement)
+    except ValueError as e:
+        click.echo(f"[ERROR] {e}")
+        sys.exit(1)
+    
+    if wide:
+        result = tb_store.pivot(result)
+    if result.empty:
+        click.echo("No matching rows.")
+        return
+    click.echo(result.to_csv(index=False) if as_csv else result.to_string(index=False))
+
+@main.group("cache")
+def cache_group():
+    """Inspects or clears the parsed-file cache."""
+
+@cache_group.command("stats")
+def cache_stats():
+    """Shows what the parsed-file cache holds."""
+    from . import cache as tb_cache
+    
+    stats = tb_cache.ParsedFileCache().stats()
+    click.echo("Parsed-file cache:")
+    click.echo(f"  Directory: {stats['directory']}")
+    click.echo(f"  Enabled: {'yes' if config.CACHE_ENABLED else 'no'}")
+    click.echo(f"  Format: {stats['format']}")
+    click.echo(f"  Entries: {stats['entries']} ({stats['stale']} from an older loader version)")
+    click.echo(f"  Size: {stats['bytes'] / 1024 / 1024:.1f} MB of {stats['max_bytes'] / 1024 / 1024:.0f} MB")
+
+@cache_group.command("clear")
+def cache_clear():
+    """Removes every entry from the parsed-file cache."""
+    from . import cache as tb_cache
+    
+    removed = tb_cache.ParsedFileCache().clear()
+    click.echo(f"Removed {removed} cached files.")
 
 if __name__ == "__main__":
     main()
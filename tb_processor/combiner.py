@@ -1,17 +1,66 @@
+import numpy as np
 import pandas as pd
-from typing import List
+from typing import Callable, List, Tuple
+import concurrent.futures
+import os
 import pathlib
 import datetime
+import time
 
+from . import compact as tb_compact
+from . import config
+from . import hierarchy
 from . import loader
+from . import numeric
+from . import profiling
+from . import sources
 
-def combine_monthly(dfs: List[pd.DataFrame]) -> pd.DataFrame:
+def account_keys(accounts: pd.Series) -> pd.MultiIndex:
+    """
+    Builds the alignment key for a column of account labels.
+    Labels that repeat within one file are told apart by their occurrence number,
+    so the second "Other" in one file lines up with the second "Other" in the next.
+    """
+    labels = accounts.astype(str)
+    occurrence = labels.groupby(labels).cumcount()
+    return pd.MultiIndex.from_arrays([labels.to_numpy(), occurrence.to_numpy()])
+
+def combine_monthly(dfs: List[pd.DataFrame], compact: bool = False) -> pd.DataFrame:
+    """
+    Combines monthly frames, recording a "combine" stage when profiling.
+    With compact set the result uses integer-coded accounts and int64 cents (see compact.py).
+    """
+    with profiling.stage("combine", files=len(dfs), compact=compact) as info:
+        if compact:
+            result = tb_compact.combine(dfs)
+        else:
+            result = _combine_monthly([tb_compact.expand(df) for df in dfs])
+        _attach_hierarchy(result, [hierarchy_part(df) for df in reversed(dfs)])
+        info["rows"], info["cols"] = result.shape
+    return result
+
+def hierarchy_part(df: pd.DataFrame):
+    """The (account keys, hierarchy) of a frame for hierarchy.combine, or None without one."""
+    structure = hierarchy.of(df)
+    if structure is None or df.empty:
+        return None
+    return account_keys(df.iloc[:, 0]), structure
+
+def _attach_hierarchy(result: pd.DataFrame, parts) -> pd.DataFrame:
+    """Sets the hierarchy of a combined frame from its files' parts, newest first."""
+    if not result.empty and any(found is not None for found in parts):
+        result.attrs["hierarchy"] = hierarchy.combine(parts, account_keys(result.iloc[:, 0]))
+    return result
+
+def _combine_monthly(dfs: List[pd.DataFrame]) -> pd.DataFrame:
     """
     Combines multiple trial balance dataframes:
     - Aligns on the first column (typically account names)
     - Preserves all unique accounts across all dataframes
     - Fills missing values with 0
     - Ensures consistent monthly columns
+    When the same month appears in more than one dataframe, the column from the
+    latest dataframe in the list wins (files are passed in date order).
     """
     if not dfs:
         return pd.DataFrame()
@@ -25,75 +74,323 @@ def combine_monthly(dfs: List[pd.DataFrame]) -> pd.DataFrame:
     # Use the first column as the key for joining (typically account names)
     key_column = dfs[0].columns[0]
     
-    # Collect all unique accounts across all dataframes
-    all_accounts = set()
-    for df in dfs:
-        if not df.empty and len(df.columns) > 0:
-            accounts = df[df.columns[0]].dropna().astype(str).unique()
-            all_accounts.update(accounts)
-    
-    # Create a result dataframe with all unique accounts
-    result = pd.DataFrame({key_column: sorted(list(all_accounts))})
-    
-    # Add data from each dataframe
-    for df in dfs:
-        if df.empty:
+    # Walk the files newest first so each month is taken from the latest file only
+    blocks = []
+    taken = set()
+    all_keys = set()
+    for df in reversed(dfs):
+        if len(df.columns) == 0:
             continue
-            
-        # Get date columns only
-        date_cols = [col for col in df.columns if isinstance(col, datetime.date)]
         
+        df = df[df[df.columns[0]].notna()]
+        keys = account_keys(df[df.columns[0]])
+        all_keys.update(keys)
+        
+        # Get date columns only, skipping months a later file already provided
+        date_cols = [col for col in df.columns if isinstance(col, datetime.date) and col not in taken]
         if not date_cols:
-            # If no date columns, skip this dataframe
             continue
+        taken.update(date_cols)
         
-        # Convert key column to string for consistent joining
-        df = df.copy()
-        df[df.columns[0]] = df[df.columns[0]].astype(str)
-        
-        # For each date column, merge into the result
-        for date_col in date_cols:
-            # Create a temporary dataframe with just the key column and this date column
-            temp_df = df[[df.columns[0], date_col]].copy()
-            temp_df.columns = [key_column, date_col]  # Ensure consistent column names
-            
-            # Merge with the result
-            result = pd.merge(result, temp_df, on=key_column, how='left')
-    
-    # Clean up any NaN values - replace with 0 for numeric columns
-    for col in result.columns:
-        if col != key_column:
-            result[col] = pd.to_numeric(result[col], errors='coerce').fillna(0)
+        block = df[date_cols]
+        block.index = keys
+        blocks.append(block)
+    
+    # Align every file onto the shared account index in one pass
+    index = pd.MultiIndex.from_tuples(sorted(all_keys)) if all_keys else pd.MultiIndex.from_arrays([[], []])
+    columns = {key_column: index.get_level_values(0)}
+    aligned = [block.reindex(index) for block in blocks]
     
     # Sort columns: account column first, followed by date columns in chronological order
-    date_cols = [col for col in result.columns if isinstance(col, datetime.date)]
-    other_cols = [col for col in result.columns if col != key_column and col not in date_cols]
+    # Clean up any NaN values - replace with 0
+    for date_col in sorted(taken):
+        for block in aligned:
+            if date_col in block.columns:
+                col = numeric.coerce_column(block[date_col])
+                columns[date_col] = col.fillna(0).to_numpy()
+                break
     
-    sorted_cols = [key_column] + sorted(date_cols) + other_cols
+    return pd.DataFrame(columns)
+
+def timed_load(load_fn, path: pathlib.Path, profile: bool = False):
+    """
+    Runs load_fn on path and returns (df, seconds, error, stage records) without raising.
+    With profile set (used in worker processes) stages are collected locally and returned.
+    """
+    profiler = profiling.enable() if profile else None
+    start = time.perf_counter()
+    try:
+        with profiling.stage("load", file=path.name) as info:
+            df = load_fn(path)
+            info["rows"], info["cols"] = df.shape
+        error = None
+    except Exception as e:
+        df = pd.DataFrame()
+        error = str(e)
+    finally:
+        if profiler is not None:
+            profiling.disable()
+    return df, time.perf_counter() - start, error, profiler.records if profiler else []
+
+def _use_reader(name: str):
+    config.READER = name
+
+def worker_pool(jobs: int) -> concurrent.futures.ProcessPoolExecutor:
+    """A process pool whose workers read files with the reader chosen in this process (--reader)."""
+    return concurrent.futures.ProcessPoolExecutor(max_workers=jobs, initializer=_use_reader,
+                                                  initargs=(config.READER,))
+
+def resolve_jobs(jobs: int) -> int:
+    """Turns the --jobs value into a worker count (0 means one per CPU)."""
+    if jobs is None or jobs < 0:
+        return 1
+    return jobs or os.cpu_count() or 1
+
+def load_many(tasks: List[Tuple[Callable, pathlib.Path]], verbose: bool = False, jobs: int = 1,
+              cache=None) -> List[pd.DataFrame]:
+    """
+    Loads (load_fn, path) tasks, in a process pool when jobs > 1.
+    Results come back in task order and a failing file yields an empty DataFrame
+    instead of stopping the batch. Files found in cache are not parsed again.
+    The pool is handed the largest files first so one big file doesn't finish last.
+    """
+    results = [None] * len(tasks)
+    if cache is not None:
+        for i, (load_fn, f) in enumerate(tasks):
+            with profiling.stage("load.cached", file=f.name) as info:
+                df = cache.get(load_fn.__name__, f)
+                if df is not None:
+                    info["rows"], info["cols"] = df.shape
+            if df is not None:
+                results[i] = (df, 0.0, None, [])
+    pending = [i for i, result in enumerate(results) if result is None]
     
-    # Only include columns that exist in the result
-    sorted_cols = [col for col in sorted_cols if col in result.columns]
+    jobs = min(resolve_jobs(jobs), len(pending)) if pending else 1
     
-    return result[sorted_cols]
-
-def combine_all_bs(files: List[pathlib.Path]) -> pd.DataFrame:
-    """Combine all Balance Sheet files."""
-    print(f"Processing {len(files)} Balance Sheet files...")
-    dfs = []
+    if jobs <= 1:
+        loaded = (timed_load(*tasks[i]) for i in pending)
+    else:
+        executor = worker_pool(jobs)
+        profile = profiling.active() is not None
+        futures = {i: executor.submit(timed_load, *tasks[i], profile)
+                   for i in sorted(pending, key=lambda i: -_file_size(tasks[i][1]))}
+        loaded = (_future_result(futures[i]) for i in pending)
+    
+    try:
+        # Pull results in task order, parsing lazily when running serially
+        loaded = iter(loaded)
+        dfs = []
+        for i, (load_fn, f) in enumerate(tasks):
+            cached = results[i] is not None
+            if not cached:
+                results[i] = next(loaded)
+            dfs.append(_finish_load(load_fn, f, results[i], cached, verbose, cache))
+    finally:
+        if jobs > 1:
+            executor.shutdown()
+        if cache is not None:
+            cache.flush()
     
-    for f in files:
+    return dfs
+
+def _finish_load(load_fn, f: pathlib.Path, result, cached: bool, verbose: bool, cache) -> pd.DataFrame:
+    """Reports a loaded file, keeps its worker's stage records and stores it in cache."""
+    df, elapsed, error, records = result
+    if records:
+        profiling.active().extend(records)
+    if error:
+        print(f"  [ERROR] Failed to load {f.name}: {error}")
+    elif cached and verbose:
+        print(f"  Loading {f.name} (cached, {len(df)} rows)")
+    elif verbose:
+        print(f"  Loading {f.name} ({elapsed:.2f}s, {len(df)} rows)")
+    else:
         print(f"  Loading {f.name}")
-        dfs.append(loader.load_bs(f))
+    if df.attrs.get("unparseable_cells"):
+        print(f"  [WARNING] {f.name}: {df.attrs['unparseable_cells']} cells in month columns "
+              f"are not numbers and were read as 0")
+    if cache is not None and not cached and not error:
+        cache.put(load_fn.__name__, f, df)
+    return df
+
+def _file_size(path: pathlib.Path) -> int:
+    try:
+        return sources.stat(path).st_size
+    except (OSError, KeyError):
+        return 0
+
+def _future_result(future):
+    """Unwraps a load future, turning pool failures into per-file errors."""
+    try:
+        return future.result()
+    except Exception as e:
+        return pd.DataFrame(), 0.0, str(e), []
+
+class MonthlyAccumulator:
+    """
+    Folds monthly frames into an account x month result one file at a time, in any order.
+    rank is the file's position in date order: a month is taken from the highest-ranked
+    file that has it, so the result equals combine_monthly over the files in rank order.
+    Only the winning columns are kept, as row positions plus values, so a folded frame
+    can be released straight away.
+    """
+
+    def __init__(self):
+        self.rows = {}
+        self.months = {}
+        self.key_column = None
+        self._key_rank = None
+        # rank -> (account keys, hierarchy) of each folded file
+        self.hierarchies = {}
+
+    def add(self, rank: int, df: pd.DataFrame):
+        df = tb_compact.expand(df)
+        if df.empty or len(df.columns) == 0:
+            return
+        if self._key_rank is None or rank < self._key_rank:
+            self.key_column, self._key_rank = df.columns[0], rank
+        
+        self.hierarchies[rank] = hierarchy_part(df)
+        df = df[df[df.columns[0]].notna()]
+        rows = self.rows
+        positions = np.fromiter((rows.setdefault(key, len(rows)) for key in account_keys(df[df.columns[0]])),
+                                dtype="int64", count=len(df))
+        
+        for col in df.columns:
+            if not isinstance(col, datetime.date) or self.months.get(col, (rank,))[0] > rank:
+                continue
+            values = numeric.coerce_column(df[col])
+            self.months[col] = (rank, positions, values.to_numpy(copy=True))
+
+    def result(self) -> pd.DataFrame:
+        """The combined frame, laid out exactly like combine_monthly's."""
+        if self.key_column is None:
+            return pd.DataFrame()
+        keys = list(self.rows)
+        order = sorted(range(len(keys)), key=keys.__getitem__)
+        # Row id -> position in the sorted result
+        where = np.empty(len(keys), dtype="int64")
+        where[order] = np.arange(len(keys))
+        
+        columns = {self.key_column: pd.Index([keys[i][0] for i in order], dtype=object)}
+        for col in sorted(self.months):
+            _, positions, values = self.months[col]
+            # Like reindex: a month that misses accounts becomes float, then NaN -> 0
+            dtype = values.dtype if len(positions) == len(keys) else np.result_type(values.dtype, np.float64)
+            column = np.zeros(len(keys), dtype=dtype)
+            column[where[positions]] = values
+            if column.dtype.kind == "f":
+                column[np.isnan(column)] = 0
+            columns[col] = column
+        result = pd.DataFrame(columns)
+        _attach_hierarchy(result, [self.hierarchies[rank] for rank in sorted(self.hierarchies, reverse=True)])
+        return result
+
+def pipeline_combine(groups: List[List[Tuple[Callable, pathlib.Path]]], verbose: bool = False, jobs: int = 1,
+                     cache=None, compact: bool = False, in_flight: int = 0) -> List[pd.DataFrame]:
+    """
+    Loads and combines each group of (load_fn, path) tasks, folding every file into its
+    group's MonthlyAccumulator as soon as it is loaded and releasing it right after.
+    At most in_flight files (default: two per worker) are loaded but not yet folded, so
+    peak memory stays near one file per worker plus the results. Files are reported in
+    the order they finish.
+    """
+    accumulators = [MonthlyAccumulator() for _ in groups]
+    tasks = [(g, rank, load_fn, f) for g, group in enumerate(groups) for rank, (load_fn, f) in enumerate(group)]
+    
+    def fold(task, result, cached):
+        g, rank, load_fn, f = task
+        with profiling.stage("combine.fold", file=f.name) as info:
+            df = _finish_load(load_fn, f, result, cached, verbose, cache)
+            info["rows"], info["cols"] = df.shape
+            accumulators[g].add(rank, df)
+    
+    pending = []
+    for task in tasks:
+        df = None
+        if cache is not None:
+            with profiling.stage("load.cached", file=task[3].name) as info:
+                df = cache.get(task[2].__name__, task[3])
+                if df is not None:
+                    info["rows"], info["cols"] = df.shape
+        if df is not None:
+            fold(task, (df, 0.0, None, []), True)
+        else:
+            pending.append(task)
+        df = None
     
-    return combine_monthly(dfs)
+    jobs = min(resolve_jobs(jobs), len(pending)) if pending else 1
+    try:
+        if jobs <= 1:
+            for task in pending:
+                fold(task, timed_load(task[2], task[3]), False)
+        else:
+            limit = in_flight if in_flight and in_flight > 0 else 2 * jobs
+            queue = sorted(pending, key=lambda task: -_file_size(task[3]))[::-1]
+            profile = profiling.active() is not None
+            with worker_pool(jobs) as executor:
+                running = {}
+                while queue or running:
+                    while queue and len(running) < max(limit, 1):
+                        task = queue.pop()
+                        running[executor.submit(timed_load, task[2], task[3], profile)] = task
+                    done, _ = concurrent.futures.wait(running, return_when=concurrent.futures.FIRST_COMPLETED)
+                    for future in done:
+                        fold(running.pop(future), _future_result(future), False)
+                    del done, future
+    finally:
+        if cache is not None:
+            cache.flush()
+    
+    with profiling.stage("combine", files=len(tasks), compact=compact) as info:
+        results = [accumulator.result() for accumulator in accumulators]
+        if compact:
+            results = [_attach_hierarchy(tb_compact.combine([df]), [hierarchy_part(df)]) for df in results]
+        info["rows"] = sum(len(df) for df in results)
+    return results
+
+def load_files(files: List[pathlib.Path], load_fn, verbose: bool = False, jobs: int = 1,
+               cache=None) -> List[pd.DataFrame]:
+    """Loads each file with load_fn, reporting per-file timing in verbose mode."""
+    return load_many([(load_fn, f) for f in files], verbose, jobs, cache)
+
+def combine_all_bs(files: List[pathlib.Path], verbose: bool = False, jobs: int = 1,
+                   cache=None, compact: bool = False, pipeline: bool = False, in_flight: int = 0) -> pd.DataFrame:
+    """Combine all Balance Sheet files. With pipeline, files are folded in as they load."""
+    print(f"Processing {len(files)} Balance Sheet files...")
+    if pipeline:
+        return pipeline_combine([[(loader.load_bs, f) for f in files]], verbose, jobs, cache, compact, in_flight)[0]
+    return combine_monthly(load_files(files, loader.load_bs, verbose, jobs, cache), compact)
 
-def combine_all_is(files: List[pathlib.Path]) -> pd.DataFrame:
-    """Combine all Income Statement files."""
+def combine_all_is(files: List[pathlib.Path], verbose: bool = False, jobs: int = 1,
+                   cache=None, compact: bool = False, pipeline: bool = False, in_flight: int = 0) -> pd.DataFrame:
+    """Combine all Income Statement files. With pipeline, files are folded in as they load."""
     print(f"Processing {len(files)} Income Statement files...")
-    dfs = []
-    
-    for f in files:
-        print(f"  Loading {f.name}")
-        dfs.append(loader.load_is(f))
+    if pipeline:
+        return pipeline_combine([[(loader.load_is, f) for f in files]], verbose, jobs, cache, compact, in_flight)[0]
+    return combine_monthly(load_files(files, loader.load_is, verbose, jobs, cache), compact)
+
+def iter_combine_all(bs_files: List[pathlib.Path], is_files: List[pathlib.Path],
+                     verbose: bool = False, jobs: int = 1, cache=None, compact: bool = False,
+                     pipeline: bool = False, in_flight: int = 0):
+    """
+    Loads the Balance Sheet and Income Statement sets together, then yields
+    ("Balance Sheet", df) and ("Income Statement", df). The Income Statement is only
+    combined once the caller asks for it, so writing the first sheet can overlap with it.
+    With pipeline, both sets are folded in as their files load (see pipeline_combine).
+    """
+    print(f"Processing {len(bs_files)} Balance Sheet and {len(is_files)} Income Statement files...")
+    bs_tasks = [(loader.load_bs, f) for f in bs_files]
+    is_tasks = [(loader.load_is, f) for f in is_files]
+    if pipeline:
+        bs_df, is_df = pipeline_combine([bs_tasks, is_tasks], verbose, jobs, cache, compact, in_flight)
+        yield "Balance Sheet", bs_df
+        del bs_df
+        yield "Income Statement", is_df
+        return
     
-    return combine_monthly(dfs)
+    dfs = load_many(bs_tasks + is_tasks, verbose, jobs, cache)
+    bs_dfs, is_dfs = dfs[:len(bs_files)], dfs[len(bs_files):]
+    del dfs
+    yield "Balance Sheet", combine_monthly(bs_dfs, compact)
+    yield "Income Statement", combine_monthly(is_dfs, compact)
@@ -0,0 +1,163 @@
+"""
+Compact in-memory representation of combined sheets.
+
+Account labels are dictionary-encoded into integer codes shared by every file of a
+combine, and amounts are held as int64 cents. A compact frame has a categorical
+account column, int64 amount columns and attrs["amounts"] == "cents"; expand()
+turns it back into the plain frame that writers export.
+"""
+import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from . import numeric
+
+CENTS = 100
+
+# Occurrence numbers live in the low bits of an account key
+OCCURRENCE_BITS = 32
+
+
+def is_compact(df: pd.DataFrame) -> bool:
+    return df.attrs.get("amounts") == "cents"
+
+
+def to_cents(values: np.ndarray) -> Optional[np.ndarray]:
+    """
+    Converts float amounts to int64 cents (NaN becomes 0).
+    Returns None when a value has more precision than cents, so converting would change it.
+    """
+    values = np.asarray(values, dtype="float64")
+    filled = np.where(np.isnan(values), 0.0, values)
+    cents = np.rint(filled * CENTS)
+    if not np.array_equal(cents / CENTS, filled):
+        return None
+    return cents.astype("int64")
+
+
+def expand(df: pd.DataFrame) -> pd.DataFrame:
+    """Returns the plain frame for a compact one: object account labels and float64 amounts."""
+    if not is_compact(df):
+        return df
+    columns = {df.columns[0]: df.iloc[:, 0].astype(object).to_numpy()}
+    for col in df.columns[1:]:
+        columns[col] = df[col].to_numpy() / CENTS
+    out = pd.DataFrame(columns)
+    out.attrs = {k: v for k, v in df.attrs.items() if k != "amounts"}
+    return out
+
+
+class AccountDictionary:
+    """Maps account labels to integer codes, shared by every file of one combine."""
+
+    def __init__(self):
+        self.codes: Dict[str, int] = {}
+        self.labels: List[str] = []
+
+    def encode(self, accounts: pd.Series) -> np.ndarray:
+        """
+        Returns one int64 key per row: the label's code in the high bits and its
+        occurrence number within this file in the low bits (see combiner.account_keys).
+        Only the distinct labels of the file are looked up.
+        """
+        local, uniques = pd.factorize(accounts, sort=False)
+        uniques = [str(label) for label in uniques]
+        if len(set(uniques)) < len(uniques):
+            # Distinct values with the same text (1 and "1") are one account, as in the plain combine
+            local, uniques = pd.factorize(accounts.astype(str), sort=False)
+        mapping = np.empty(len(uniques), dtype="int64")
+        for i, label in enumerate(uniques):
+            code = self.codes.get(label)
+            if code is None:
+                code = self.codes[label] = len(self.labels)
+                self.labels.append(label)
+            mapping[i] = code
+        occurrence = pd.Series(local).groupby(local).cumcount().to_numpy()
+        return (mapping[local] << OCCURRENCE_BITS) | occurrence
+
+    def sort_order(self, keys: np.ndarray) -> np.ndarray:
+        """Positions that sort keys by label, then occurrence, like the plain combine."""
+        rank = np.empty(len(self.labels), dtype="int64")
+        rank[np.argsort(np.array(self.labels, dtype=object), kind="stable")] = np.arange(len(self.labels))
+        sortable = (rank[keys >> OCCURRENCE_BITS] << OCCURRENCE_BITS) | (keys & ((1 << OCCURRENCE_BITS) - 1))
+        return np.argsort(sortable, kind="stable")
+
+
+def _amounts(df: pd.DataFrame, col) -> np.ndarray:
+    values = df[col]
+    if is_compact(df):
+        return values.to_numpy(dtype="int64")
+    return numeric.coerce_column(values).to_numpy(dtype="float64")
+
+
+def combine(dfs: List[pd.DataFrame]) -> pd.DataFrame:
+    """
+    Compact counterpart of combiner.combine_monthly, with the same alignment rules
+    (newest file wins per month, repeated labels kept per occurrence). Falls back to
+    float64 amounts when a value does not fit in whole cents, so results never change.
+    """
+    dfs = [df for df in dfs if not df.empty and len(df.columns)]
+    if not dfs:
+        return pd.DataFrame()
+    key_column = dfs[0].columns[0]
+
+    dictionary = AccountDictionary()
+    blocks = []
+    taken = set()
+    for df in reversed(dfs):
+        accounts = df.iloc[:, 0]
+        if accounts.hasnans:
+            df = df[accounts.notna()]
+            accounts = df.iloc[:, 0]
+        keys = dictionary.encode(accounts)
+
+        date_cols = [col for col in df.columns if isinstance(col, datetime.date) and col not in taken]
+        taken.update(date_cols)
+        blocks.append((df, keys, date_cols))
+
+    all_keys = np.unique(np.concatenate([keys for _, keys, _ in blocks]))
+    all_keys = all_keys[dictionary.sort_order(all_keys)]
+    index = pd.Index(all_keys)
+
+    amounts = {}
+    for df, keys, date_cols in blocks:
+        if not date_cols:
+            continue
+        positions = index.get_indexer(keys)
+        for col in date_cols:
+            amounts[col] = (positions, _amounts(df, col), is_compact(df))
+
+    columns = {}
+    cents = True
+    for col in sorted(amounts):
+        positions, values, compact_values = amounts[col]
+        if not compact_values:
+            converted = to_cents(values)
+            if converted is None:
+                cents = False
+            else:
+                values = converted
+        columns[col] = (positions, values)
+
+    codes = (all_keys >> OCCURRENCE_BITS)
+    categories = pd.Index(dictionary.labels, dtype=object)
+    out = {key_column: pd.Categorical.from_codes(codes, categories=categories)}
+    for col, (positions, values) in columns.items():
+        if cents:
+            column = np.zeros(len(index), dtype="int64")
+        else:
+            column = np.zeros(len(index), dtype="float64")
+            if values.dtype.kind == "i":
+                values = values / CENTS
+            values = np.where(np.isnan(values), 0.0, values)
+        column[positions] = values
+        out[col] = column
+
+    result = pd.DataFrame(out)
+    if cents:
+        result.attrs["amounts"] = "cents"
+    else:
+        result[key_column] = result[key_column].astype(object)
+    return result
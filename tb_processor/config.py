@@ -3,5 +3,38 @@ import os
 # Allow override by environment variables
 INPUT_DIR = os.environ.get('TB_INPUT_DIR', './')  # Current directory as default
 OUTPUT_FILE = os.environ.get('TB_OUTPUT_FILE', "tb_full.xlsx")
+OUTPUT_FORMAT = os.environ.get('TB_OUTPUT_FORMAT', "xlsx")  # xlsx, parquet, csv or arrow
+OUTPUT_FORMATS = ("xlsx", "parquet", "csv", "arrow")  # the keys of writers.WRITERS
 BS_PATTERN = os.environ.get('TB_BS_PATTERN', "Balance Sheet by Month-*.xlsx")
 IS_PATTERN = os.environ.get('TB_IS_PATTERN', "Profit and Loss by Month-*.xlsx")
+# Also look for files in subdirectories of INPUT_DIR
+RECURSIVE = os.environ.get('TB_RECURSIVE', '0').lower() in ('1', 'true', 'yes', 'on')
+
+# Input reader backend: auto picks the fastest installed one per file extension,
+# or name one of openpyxl, calamine, pyxlsb, csv or pandas (the keys of readers.READERS)
+READER = os.environ.get('TB_READER', 'auto')
+READERS = ("auto", "calamine", "openpyxl", "pyxlsb", "csv", "pandas")
+
+# Reading a sheet stops after this many consecutive blank rows
+BLANK_ROW_LIMIT = int(os.environ.get('TB_BLANK_ROW_LIMIT', '50'))
+
+# Number of worker processes used to load files (0 = one per CPU)
+JOBS = int(os.environ.get('TB_JOBS', '1'))
+
+# Fold files into the result as they load instead of loading them all first (TB_PIPELINE=1),
+# with at most IN_FLIGHT loaded files waiting to be folded (0 = two per worker)
+PIPELINE = os.environ.get('TB_PIPELINE', '0').lower() in ('1', 'true', 'yes', 'on')
+IN_FLIGHT = int(os.environ.get('TB_IN_FLIGHT', '0'))
+
+# Parsed-file cache (set TB_CACHE=0 to disable)
+CACHE_ENABLED = os.environ.get('TB_CACHE', '1').lower() not in ('0', 'false', 'no', 'off')
+CACHE_DIR = os.environ.get('TB_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'tb_processor'))
+CACHE_MAX_BYTES = int(float(os.environ.get('TB_CACHE_MAX_MB', '512')) * 1024 * 1024)
+
+# Combine with integer-coded accounts and int64 cents (set TB_COMPACT=1 to turn on)
+COMPACT = os.environ.get('TB_COMPACT', '0').lower() in ('1', 'true', 'yes', 'on')
+
+# SQLite store of combined results used by --store and tb query (set TB_STORE=1 to always save)
+STORE_FILE = os.environ.get('TB_STORE_FILE', "tb_store.sqlite")
+STORE_ENABLED = os.environ.get('TB_STORE', '0').lower() in ('1', 'true', 'yes', 'on')
+ENTITY = os.environ.get('TB_ENTITY', "default")
@@ -1,42 +1,181 @@
 import pathlib
 import datetime
+import fnmatch
+import functools
 import glob
 import re
 import os
+import posixpath
+import time
+import zipfile
 
 # Handle both direct execution and module import
 try:
     from . import config
+    from . import profiling
+    from . import sources
 except ImportError:
     # When run directly, use absolute import
     import sys
     sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
     import tb_processor.config as config
+    import tb_processor.profiling as profiling
+    import tb_processor.sources as sources
 
-def find_monthly_files(pattern: str) -> list[pathlib.Path]:
-    """Uses glob on INPUT_DIR and sorts by date parsed from filename."""
+# Directory listings already classified, keyed by (directory, patterns, recursive)
+_LISTINGS = {}
+
+# A directory modified this recently may still change within its mtime resolution,
+# so its listing is not cached (some network file systems only keep 1-2 second mtimes)
+RACY_NS = 2_000_000_000
+
+def _hidden_ok(name: str, pattern: str) -> bool:
+    # Like glob, wildcards don't match names starting with a dot
+    return not name.startswith(".") or pattern.startswith(".")
+
+def scan_directory(input_dir, patterns, recursive: bool = False) -> dict:
+    """
+    Lists input_dir once (and its subdirectories with recursive) and returns
+    {pattern: [paths]} for every pattern, each sorted by the date in the filename.
+    A zip archive is listed like a directory, matching member names anywhere in the archive,
+    and yields sources.ArchiveMember entries.
+    The result is cached until the modification time of one of the scanned directories changes.
+    """
+    patterns = tuple(dict.fromkeys(patterns))
+    key = (os.path.abspath(input_dir), patterns, recursive)
+    
+    cached = _LISTINGS.get(key)
+    if cached is not None:
+        mtimes, listing = cached
+        if all(_mtime_ns(d) == mtime for d, mtime in mtimes.items()):
+            return listing
+    
+    # Same case rules as glob: case-insensitive only where the file system is (Windows)
+    matchers = [(pattern, re.compile(fnmatch.translate(os.path.normcase(pattern))).match) for pattern in patterns]
+    found = {pattern: [] for pattern in patterns}
+    mtimes = {}
+    archive = sources.is_archive(input_dir)
+    pending = [] if archive else [str(input_dir)]
+    if archive:
+        try:
+            mtimes[str(input_dir)] = os.stat(input_dir).st_mtime_ns
+            members = sources.archive_members(input_dir)
+        except (OSError, zipfile.BadZipFile):
+            members = []
+        for member in members:
+            name = posixpath.basename(member)
+            normalized = os.path.normcase(name)
+            for pattern, match in matchers:
+                if match(normalized) and _hidden_ok(name, pattern):
+                    found[pattern].append((name, member))
+    while pending:
+        directory = pending.pop()
+        try:
+            mtimes[directory] = os.stat(directory).st_mtime_ns
+            entries = list(os.scandir(directory))
+        except OSError:
+            continue
+        for entry in entries:
+            name = entry.name
+            if recursive and not name.startswith(".") and entry.is_dir(follow_symlinks=False):
+                pending.append(entry.path)
+                continue
+            normalized = os.path.normcase(name)
+            for pattern, match in matchers:
+                if match(normalized) and _hidden_ok(name, pattern):
+                    found[pattern].append((name, entry.path))
+    
+    # Sort on the names, then build Path objects once
+    listing = {}
+    for pattern, entries in found.items():
+        entries.sort(key=lambda e: (_period(os.path.splitext(e[0])[0]), e[1]))
+        listing[pattern] = [sources.ArchiveMember(input_dir, path) if archive else pathlib.Path(path)
+                            for _, path in entries]
+    
+    now = time.time_ns()
+    if all(now - mtime > RACY_NS for mtime in mtimes.values()):
+        _LISTINGS[key] = (mtimes, listing)
+    return listing
+
+def _mtime_ns(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+def clear_listing_cache():
+    _LISTINGS.clear()
+
+def ensure_output_dir(output=None):
+    """Creates the directory of output (OUTPUT_FILE by default) if it doesn't exist."""
+    output_dir = os.path.dirname(output or config.OUTPUT_FILE)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+
+def find_monthly_files(pattern: str, input_dir=None, recursive: bool = None) -> list[pathlib.Path]:
+    """
+    Finds the files in input_dir (INPUT_DIR by default) matching pattern, sorted by the date
+    parsed from the filename. input_dir may also be a zip archive, see scan_directory.
+    The directory is listed once for the configured BS and IS patterns together, so
+    finding the other statement's files afterwards doesn't list it again.
+    """
     # Replace pattern placeholders with actual glob pattern
     glob_pattern = pattern.replace("yyyy-mm", "*")
+    if recursive is None:
+        recursive = config.RECURSIVE
     
-    # Get all matching files
-    files = [pathlib.Path(p) for p in glob.glob(str(pathlib.Path(config.INPUT_DIR) / glob_pattern))]
-    
-    # Sort files by the date extracted from filename
-    return sorted(files, key=extract_date)
+    with profiling.stage("discover", pattern=pattern) as info:
+        patterns = [p.replace("yyyy-mm", "*") for p in (config.BS_PATTERN, config.IS_PATTERN)] + [glob_pattern]
+        if any(os.sep in p or "/" in p for p in patterns) and not sources.is_archive(input_dir or config.INPUT_DIR):
+            # Patterns reaching into subdirectories are left to glob
+            files = [pathlib.Path(p) for p in glob.glob(str(pathlib.Path(input_dir or config.INPUT_DIR) / glob_pattern),
+                                                        recursive=recursive)]
+            files.sort(key=lambda f: (extract_date(f), str(f)))
+        else:
+            files = list(scan_directory(input_dir or config.INPUT_DIR, patterns, recursive)[glob_pattern])
+        info["rows"] = len(files)
+        
+        # Sorted by the date extracted from filename, then by path so the order is stable
+        return files
+
+def duplicate_periods(files: list) -> dict:
+    """Returns {date: [files]} for every period covered by more than one file."""
+    periods = {}
+    for f in files:
+        periods.setdefault(extract_date(f), []).append(f)
+    return {period: group for period, group in periods.items() if len(group) > 1}
+
+YEAR_PATTERN = re.compile(r'(\d{4})')
+# A date like yyyy-mm or mm-yyyy
+DATE_PATTERN = re.compile(r'(\d{4})-(\d{1,2})|(\d{1,2})-(\d{4})')
+MONTH_NAMES = {
+    'jan': 1, 'feb': 2, 'mar': 3, 'apr': 4, 'may': 5, 'jun': 6,
+    'jul': 7, 'aug': 8, 'sep': 9, 'oct': 10, 'nov': 11, 'dec': 12
+}
+# Lookahead, so overlapping names are all found
+MONTH_NAME_PATTERN = re.compile('(?=(' + '|'.join(MONTH_NAMES) + '))')
 
 def extract_date(fn: pathlib.Path) -> datetime.date:
     """Extracts date from filename."""
+    # If no year found, the current date is used as fallback
+    return _period(fn.stem)
+
+def _period(stem: str) -> datetime.date:
+    date = _date_from_stem(stem)
+    return date if date is not None else datetime.date.today()
+
+@functools.lru_cache(maxsize=65536)
+def _date_from_stem(stem: str):
     # Extract year from filename (looking for 4-digit year like 2022, 2023, etc.)
-    year_match = re.search(r'(\d{4})', fn.stem)
+    year_match = YEAR_PATTERN.search(stem)
     if not year_match:
-        # If no year found, use current year as fallback
-        return datetime.date.today()
+        return None
     
     year = int(year_match.group(1))
     
     # Look for month in filename
     # First try to find a date pattern like yyyy-mm or mm-yyyy
-    date_pattern = re.search(r'(\d{4})-(\d{1,2})|(\d{1,2})-(\d{4})', fn.stem)
+    date_pattern = DATE_PATTERN.search(stem)
     
     if date_pattern:
         # Extract month based on which pattern matched
@@ -48,19 +187,10 @@ def extract_date(fn: pathlib.Path) -> datetime.date:
             # Default to January if parsing fails
             month = 1
     else:
-        # Try to extract month from month name or abbreviation
-        month_names = {
-            'jan': 1, 'feb': 2, 'mar': 3, 'apr': 4, 'may': 5, 'jun': 6,
-            'jul': 7, 'aug': 8, 'sep': 9, 'oct': 10, 'nov': 11, 'dec': 12
-        }
-        
-        for month_name, month_num in month_names.items():
-            if month_name in fn.stem.lower():
-                month = month_num
-                break
-        else:
-            # Default to January if no month found
-            month = 1
+        # Try to extract month from month name or abbreviation, earliest month first
+        months = [MONTH_NAMES[m.group(1)] for m in MONTH_NAME_PATTERN.finditer(stem.lower())]
+        # Default to January if no month found
+        month = min(months) if months else 1
     
     # Create date with day=1 (first day of the month)
     return datetime.date(year, month, 1)
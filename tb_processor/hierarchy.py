@@ -0,0 +1,130 @@
+"""
+Account hierarchy of a report, kept alongside the loaded and combined frames.
+
+Report exports nest accounts in sections: a label row without amounts opens a section
+("Current Assets") and a "Total ..." row with the same name closes it. A label row
+without amounts and without a later total, e.g. an inactive account, is not a section. The loader
+records that structure in df.attrs["hierarchy"] before it drops the label rows:
+
+    {"sections": [[label, parent], ...],  # parent is a section id, -1 at the top
+     "rows": [section id per row],        # innermost section of each row, -1 for none
+     "totals": [0 or 1 per row]}          # 1 for the report's own "Total ..." rows
+
+The structure is JSON friendly, so it survives the parsed-file cache, and combine()
+carries it over to a combined frame whose rows are aligned by account key.
+"""
+import re
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+TOTAL_PATTERN = re.compile(r"total\s+(.+)", re.IGNORECASE)
+
+
+def _label(val) -> str:
+    if val is None or (isinstance(val, float) and np.isnan(val)):
+        return ""
+    return str(val).strip()
+
+
+def capture(labels: Sequence, has_values: np.ndarray) -> dict:
+    """
+    Walks the rows of a sheet once and returns the hierarchy for every row, including the
+    section label rows (has_values False) that the loader drops afterwards.
+    """
+    # Last "Total <name>" row of every name, so only labels that get closed open a section
+    last_total: Dict[str, int] = {}
+    for i, val in enumerate(labels):
+        match = TOTAL_PATTERN.fullmatch(_label(val))
+        if match:
+            last_total[match.group(1).casefold()] = i
+
+    sections: List[list] = []
+    rows = np.full(len(labels), -1, dtype="int64")
+    totals = np.zeros(len(labels), dtype="int64")
+    # Open sections, innermost last, as (casefolded label, id)
+    stack: List[Tuple[str, int]] = []
+
+    for i, (val, valued) in enumerate(zip(labels, has_values)):
+        label = _label(val)
+        if not label:
+            rows[i] = stack[-1][1] if stack else -1
+            continue
+
+        match = TOTAL_PATTERN.fullmatch(label)
+        closes = match.group(1).casefold() if match else None
+        depth = next((d for d in range(len(stack) - 1, -1, -1) if stack[d][0] == closes), None)
+        if depth is not None:
+            # "Total Current Assets" closes Current Assets and anything left open inside it
+            rows[i] = stack[depth][1]
+            totals[i] = 1
+            del stack[depth:]
+        elif not valued and not match and last_total.get(label.casefold(), -1) > i:
+            sections.append([label, stack[-1][1] if stack else -1])
+            stack.append((label.casefold(), len(sections) - 1))
+            rows[i] = len(sections) - 1
+        else:
+            rows[i] = stack[-1][1] if stack else -1
+
+    return {"sections": sections, "rows": rows.tolist(), "totals": totals.tolist()}
+
+
+def subset(structure: dict, mask: np.ndarray) -> dict:
+    """The hierarchy of the rows selected by a boolean mask."""
+    return {
+        "sections": structure["sections"],
+        "rows": np.asarray(structure["rows"], dtype="int64")[mask].tolist(),
+        "totals": np.asarray(structure["totals"], dtype="int64")[mask].tolist(),
+    }
+
+
+def of(df: pd.DataFrame) -> Optional[dict]:
+    """The hierarchy of a frame, or None when it has none or it no longer matches its rows."""
+    structure = df.attrs.get("hierarchy")
+    if not structure or len(structure.get("rows", ())) != len(df):
+        return None
+    return structure
+
+
+def paths(sections: List[list]) -> List[Tuple[str, ...]]:
+    """The full path of every section, e.g. ("Assets", "Current Assets")."""
+    out: List[Tuple[str, ...]] = []
+    for label, parent in sections:
+        out.append((out[parent] if parent >= 0 else ()) + (label,))
+    return out
+
+
+def combine(parts: List[Optional[Tuple[pd.MultiIndex, dict]]], index: pd.MultiIndex) -> dict:
+    """
+    Builds the hierarchy of a combined frame whose rows have the account keys in index.
+    parts come newest file first; each account takes its place from the newest file
+    that has it, so a restructured chart of accounts follows the latest report.
+    """
+    ids: Dict[Tuple[str, ...], int] = {}
+    sections: List[list] = []
+
+    def intern(path: Tuple[str, ...]) -> int:
+        if path not in ids:
+            parent = intern(path[:-1]) if len(path) > 1 else -1
+            ids[path] = len(sections)
+            sections.append([path[-1], parent])
+        return ids[path]
+
+    rows = np.full(len(index), -1, dtype="int64")
+    totals = np.zeros(len(index), dtype="int64")
+    assigned = np.zeros(len(index), dtype=bool)
+    for found in parts:
+        if found is None:
+            continue
+        keys, structure = found
+        # Local section id -> combined id, with the last slot mapping -1 to -1
+        mapping = np.array([intern(path) for path in paths(structure["sections"])] + [-1], dtype="int64")
+        positions = index.get_indexer(keys)
+        take = positions >= 0
+        take[take] = ~assigned[positions[take]]
+        rows[positions[take]] = mapping[np.asarray(structure["rows"], dtype="int64")[take]]
+        totals[positions[take]] = np.asarray(structure["totals"], dtype="int64")[take]
+        assigned[positions[take]] = True
+
+    return {"sections": sections, "rows": rows.tolist(), "totals": totals.tolist()}
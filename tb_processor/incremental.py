@@ -0,0 +1,170 @@
+"""Run manifest that lets tb skip sheets whose source files have not changed."""
+import json
+import os
+import pathlib
+import re
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from . import cache
+from . import combiner
+from . import loader
+from . import sources
+
+MANIFEST_VERSION = 2
+
+
+def manifest_path(output) -> pathlib.Path:
+    """The manifest lives next to the output file."""
+    output = pathlib.Path(output)
+    return output.with_name(output.name + ".manifest.json")
+
+
+def snapshot_dir(output) -> pathlib.Path:
+    """Directory holding a copy of every sheet last written to output."""
+    output = pathlib.Path(output)
+    return output.with_name(output.name + ".sheets")
+
+
+def fingerprint(files: List[pathlib.Path]) -> List[dict]:
+    """Identifies the input files of a sheet by path, size and mtime."""
+    inputs = []
+    for f in files:
+        st = sources.stat(f)
+        inputs.append({"path": sources.identity(f), "size": st.st_size, "mtime_ns": st.st_mtime_ns})
+    return inputs
+
+
+def _mtime_ns(path) -> Optional[int]:
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+class RunManifest:
+    """
+    Records which source files and months produced each sheet of the output.
+    The manifest is only trusted while the output files are the ones it describes
+    and were written in the same format.
+    """
+
+    def __init__(self, output, fmt: str = "xlsx"):
+        self.output = pathlib.Path(output)
+        self.path = manifest_path(output)
+        self.format = fmt
+        self.sheets: Dict[str, dict] = {}
+        self.outputs: Dict[str, int] = {}
+        self._obsolete = []
+
+        try:
+            with open(self.path) as fh:
+                data = json.load(fh)
+        except (OSError, ValueError):
+            return
+
+        outputs = data.get("outputs", {})
+        if (data.get("version") == MANIFEST_VERSION
+                and data.get("loader_version") == loader.LOADER_VERSION
+                and data.get("format") == fmt
+                and outputs
+                and all(_mtime_ns(path) == mtime for path, mtime in outputs.items())):
+            self.sheets = data.get("sheets", {})
+            self.outputs = outputs
+
+    @property
+    def valid(self) -> bool:
+        """True when the manifest matches the output currently on disk."""
+        return bool(self.sheets)
+
+    def is_current(self, sheet: str, inputs: List[dict]) -> bool:
+        """True when sheet was last built from exactly these inputs."""
+        entry = self.sheets.get(sheet)
+        return entry is not None and entry["inputs"] == inputs
+
+    def snapshot(self, sheet: str) -> Optional[pd.DataFrame]:
+        """Returns the frame last written for sheet, if it is still available."""
+        entry = self.sheets.get(sheet)
+        if entry is None:
+            return None
+        try:
+            return cache.read_frame(snapshot_dir(self.output) / entry["snapshot"])
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def record(self, sheet: str, inputs: List[dict], df: pd.DataFrame):
+        """Remembers the inputs and a snapshot of a sheet that is about to be written."""
+        directory = snapshot_dir(self.output)
+        directory.mkdir(parents=True, exist_ok=True)
+        slug = re.sub(r"[^A-Za-z0-9]+", "_", sheet).strip("_").lower()
+        target = cache.write_frame(directory / f"{slug}-{time.time_ns()}", df)
+
+        previous = self.sheets.get(sheet)
+        if previous is not None and previous["snapshot"] != target.name:
+            self._obsolete.append(previous["snapshot"])
+        self.sheets[sheet] = {
+            "inputs": inputs,
+            "months": [col.isoformat() for col in df.columns[1:] if hasattr(col, "isoformat")],
+            "snapshot": target.name,
+        }
+
+    def forget(self, sheet: str):
+        """Drops a sheet that is no longer part of the output."""
+        entry = self.sheets.pop(sheet, None)
+        if entry is not None:
+            self._obsolete.append(entry["snapshot"])
+
+    def save(self, written: List[pathlib.Path]):
+        """Writes the manifest after the given output files were written."""
+        for path in written:
+            self.outputs[os.path.abspath(path)] = _mtime_ns(path)
+        data = {
+            "version": MANIFEST_VERSION,
+            "loader_version": loader.LOADER_VERSION,
+            "format": self.format,
+            "outputs": self.outputs,
+            "sheets": self.sheets,
+        }
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp, "w") as fh:
+            json.dump(data, fh, indent=2)
+        os.replace(tmp, self.path)
+
+        for name in self._obsolete:
+            try:
+                (snapshot_dir(self.output) / name).unlink()
+            except OSError:
+                pass
+        self._obsolete = []
+
+
+def build_sheet(manifest: RunManifest, sheet: str, files: List[pathlib.Path], load_fn: Callable,
+                verbose: bool = False, jobs: int = 1, file_cache=None,
+                compact: bool = False) -> Tuple[pd.DataFrame, bool]:
+    """
+    Returns (df, changed) for one sheet.
+    An unchanged sheet comes from its snapshot. When the only change is new files that sort
+    after every file already included, just those files are loaded and folded into the snapshot.
+    Anything else rebuilds the sheet from all of its files.
+    """
+    inputs = fingerprint(files)
+    previous = manifest.sheets.get(sheet)
+    snapshot = manifest.snapshot(sheet) if previous else None
+
+    if snapshot is not None:
+        if manifest.is_current(sheet, inputs):
+            print(f"  {sheet} is up to date ({len(files)} files unchanged)")
+            return snapshot, False
+
+        done = previous["inputs"]
+        if len(inputs) > len(done) and inputs[:len(done)] == done:
+            added = files[len(done):]
+            print(f"  {sheet}: adding {len(added)} new files to {len(done)} unchanged files")
+            dfs = combiner.load_files(added, load_fn, verbose, jobs, file_cache)
+            return combiner.combine_monthly([snapshot] + dfs, compact), True
+
+    print(f"  {sheet}: rebuilding from {len(files)} files")
+    dfs = combiner.load_files(files, load_fn, verbose, jobs, file_cache)
+    return combiner.combine_monthly(dfs, compact), True
@@ -1,122 +1,273 @@
 import datetime
+import functools
 import re
 import pathlib
 import numpy as np
 import pandas as pd
+from . import config
 from . import file_utils
+from . import hierarchy
+from . import numeric
+from . import profiling
+from . import readers
+from . import sources
 
-def find_header_row(df, keywords=["account", "description", "total", "item", "distribution account", "january", "february", "gl", "gl code", "account number"]):
+# Bump whenever a change alters what load_bs/load_is return, so cached results are rebuilt
+LOADER_VERSION = 4
+
+# Number of leading rows searched for the header row
+HEADER_SCAN_ROWS = 15
+
+HEADER_KEYWORDS = ["account", "description", "total", "item", "distribution account", "january", "february", "gl", "gl code", "account number"]
+
+def find_header_row(df, keywords=HEADER_KEYWORDS):
     """Find the header row by looking for common accounting terms."""
-    for i in range(min(15, len(df))):  # Check the first 15 rows or all rows if fewer
-        row_values = [str(val).lower() for val in df.iloc[i].values if val is not None and str(val).strip()]
-        row_text = " ".join(row_values)
-        
-        # Look for month names which typically appear in the header row
-        if "january" in row_text and "february" in row_text and "march" in row_text:
-            return i
-            
-        # Or look for other accounting terms
-        if any(keyword in row_text for keyword in keywords):
+    for i in range(min(HEADER_SCAN_ROWS, len(df))):  # Check the first 15 rows or all rows if fewer
+        if is_header_row(df.iloc[i].values, keywords):
             return i
             
     return 0  # Default to first row if no match found
 
+def is_header_row(values, keywords=HEADER_KEYWORDS) -> bool:
+    """True when a row's cells contain the terms find_header_row looks for."""
+    row_values = [str(val).lower() for val in values if val is not None and str(val).strip()]
+    row_text = " ".join(row_values)
+    
+    # Look for month names which typically appear in the header row
+    if "january" in row_text and "february" in row_text and "march" in row_text:
+        return True
+    
+    # Or look for other accounting terms
+    return any(keyword in row_text for keyword in keywords)
+
+# Handle specific format from these Excel files (e.g., "January 2022")
+MONTH_PATTERN = re.compile(r'(January|February|March|April|May|June|July|August|September|October|November|December)\s+(\d{4})', re.IGNORECASE)
+
+MONTH_NUMBERS = {
+    'January': 1, 'February': 2, 'March': 3, 'April': 4, 'May': 5, 'June': 6,
+    'July': 7, 'August': 8, 'September': 9, 'October': 10, 'November': 11, 'December': 12
+}
+
+DATE_FORMATS = ['%b %Y', '%B %Y', '%m/%d/%Y', '%Y-%m-%d', '%m-%d-%Y']
+
+@functools.lru_cache(maxsize=4096)
+def parse_column_label(col):
+    """
+    Converts a column label that looks like a date to a date object, otherwise returns it unchanged.
+    Memoized, since every file of a report layout carries the same labels.
+    """
+    if not isinstance(col, str):
+        return col
+    
+    match = MONTH_PATTERN.match(col)
+    if match:
+        # Create date object (day 1 of the month)
+        return datetime.date(int(match.group(2)), MONTH_NUMBERS.get(match.group(1).capitalize(), 1), 1)
+    
+    # Try standard date formats
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.datetime.strptime(col, date_format).date()
+        except ValueError:
+            continue
+    
+    # If no date format matches, keep original
+    return col
+
+@functools.lru_cache(maxsize=256)
+def _convert_labels(columns: tuple) -> tuple:
+    # Skip the first column (typically account names)
+    return tuple(col if col == columns[0] else parse_column_label(col) for col in columns)
+
 def convert_columns_to_dates(df):
     """Convert column names that look like dates to datetime objects."""
-    new_columns = []
+    return list(_convert_labels(tuple(df.columns))) if len(df.columns) else []
+
+@functools.lru_cache(maxsize=256)
+def _choose_sheet(sheet_names: tuple, candidates: tuple):
+    for name in candidates:
+        if name in sheet_names:
+            return name
+    return sheet_names[0] if sheet_names else 0
+
+def choose_sheet(sheet_names, candidates):
+    """Pick the first candidate present in the workbook, falling back to the first sheet."""
+    return _choose_sheet(tuple(sheet_names), tuple(candidates))
+
+# Layout fingerprint -> header row, for every report layout seen in this process
+_LAYOUTS = {}
+LAYOUT_STATS = {"hits": 0, "misses": 0}
+
+def _cell_kind(val):
+    """Describes a header cell for the fingerprint: empty, a date label, or the label itself."""
+    if val is None or (isinstance(val, float) and np.isnan(val)):
+        return None
+    if isinstance(val, (datetime.date, pd.Timestamp)):
+        return "<date>"
+    label = str(val).strip()
+    if not label:
+        return None
+    return "<date>" if isinstance(parse_column_label(label), datetime.date) else label.lower()
+
+def layout_fingerprint(sheet_name, head, header_row: int) -> tuple:
+    """
+    Fingerprints a report layout: the sheet name, the shape of the preamble above the
+    header row and the header cells (dates abstracted, so other years match too).
+    """
+    preamble = tuple(sum(1 for val in row if _cell_kind(val) is not None) for row in head[:header_row])
+    return (sheet_name, preamble, tuple(_cell_kind(val) for val in head[header_row]))
+
+def detect_header_row(sheet_name, head) -> int:
+    """
+    Finds the header row among the first rows of a sheet. A layout seen before is recognised
+    from its fingerprint, and full detection with find_header_row only runs for new layouts.
+    The fingerprint only counts the cells above the header, so a recognised header row is
+    used only after checking it is the first row find_header_row would accept.
+    """
+    for header_row in sorted(set(_LAYOUTS.values())):
+        if header_row < len(head) and _LAYOUTS.get(layout_fingerprint(sheet_name, head, header_row)) == header_row:
+            if next((i for i, row in enumerate(head) if is_header_row(row)), 0) == header_row:
+                LAYOUT_STATS["hits"] += 1
+                return header_row
     
-    for col in df.columns:
-        # Skip the first column (typically account names)
-        if col == df.columns[0]:
-            new_columns.append(col)
+    LAYOUT_STATS["misses"] += 1
+    width = max((len(row) for row in head), default=0)
+    header_row = find_header_row(pd.DataFrame([tuple(r) + (None,) * (width - len(r)) for r in head]))
+    if header_row < len(head):
+        _LAYOUTS[layout_fingerprint(sheet_name, head, header_row)] = header_row
+    return header_row
+
+def clear_layout_cache():
+    """Forgets every layout and memoized column label."""
+    _LAYOUTS.clear()
+    LAYOUT_STATS.update(hits=0, misses=0)
+    parse_column_label.cache_clear()
+    _convert_labels.cache_clear()
+    _choose_sheet.cache_clear()
+
+def is_blank_row(row) -> bool:
+    """True when every cell in the row is empty or whitespace."""
+    return all(val is None or (isinstance(val, str) and not val.strip()) for val in row)
+
+def trim_rows(rows, blank_row_limit: int = None):
+    """
+    Yields rows with trailing empty cells trimmed and blank rows as ().
+    Stops after blank_row_limit consecutive blank rows so formatting that extends
+    far past the data (e.g. A1:Z1048576) is never read.
+    """
+    if blank_row_limit is None:
+        blank_row_limit = config.BLANK_ROW_LIMIT
+    
+    blank_run = 0
+    for row in rows:
+        if is_blank_row(row):
+            blank_run += 1
+            if blank_run >= blank_row_limit:
+                break
+            yield ()
             continue
-            
-        # Try to convert to date if it's a string
-        if isinstance(col, str):
-            # Handle specific format from these Excel files (e.g., "January 2022")
-            month_pattern = re.compile(r'(January|February|March|April|May|June|July|August|September|October|November|December)\s+(\d{4})', re.IGNORECASE)
-            match = month_pattern.match(col)
-            
-            if match:
-                month_name = match.group(1).capitalize()
-                year = int(match.group(2))
-                
-                # Convert month name to month number
-                month_mapping = {
-                    'January': 1, 'February': 2, 'March': 3, 'April': 4, 'May': 5, 'June': 6,
-                    'July': 7, 'August': 8, 'September': 9, 'October': 10, 'November': 11, 'December': 12
-                }
-                month_num = month_mapping.get(month_name, 1)
-                
-                # Create date object (day 1 of the month)
-                date_obj = datetime.date(year, month_num, 1)
-                new_columns.append(date_obj)
-                continue
-                
-            # Try standard date formats
-            for date_format in ['%b %Y', '%B %Y', '%m/%d/%Y', '%Y-%m-%d', '%m-%d-%Y']:
-                try:
-                    date_obj = datetime.datetime.strptime(col, date_format).date()
-                    new_columns.append(date_obj)
-                    break
-                except ValueError:
-                    continue
-            else:
-                # If no date format matches, keep original
-                new_columns.append(col)
+        
+        blank_run = 0
+        end = len(row)
+        while end and row[end - 1] is None:
+            end -= 1
+        yield tuple(row[:end])
+
+def build_frame(names, rows) -> pd.DataFrame:
+    """
+    Builds the header-promoted DataFrame from body rows.
+    The numeric block is converted to float64 in one step when every cell allows it.
+    """
+    width = len(names)
+    padded = [tuple(row) + (None,) * (width - len(row)) if len(row) < width else tuple(row[:width])
+              for row in rows]
+    
+    labels = [row[0] for row in padded] if width else []
+    try:
+        block = np.array([row[1:] for row in padded], dtype=np.float64).reshape(len(padded), max(width - 1, 0))
+    except (TypeError, ValueError):
+        # Text or dates in the value columns, let pandas infer per column
+        return pd.DataFrame(padded, columns=names).infer_objects()
+    
+    df = pd.DataFrame(block, columns=names[1:])
+    df.insert(0, names[0], pd.Series(labels, dtype=object).infer_objects())
+    return df
+
+def read_rows(sheet_name, rows) -> pd.DataFrame:
+    """
+    Builds the header-promoted DataFrame of a sheet from its trimmed rows, detecting the
+    header from the first rows as they arrive. Blank body rows are skipped.
+    """
+    with profiling.stage("load.header") as info:
+        head = []
+        for row in rows:
+            head.append(row)
+            if len(head) >= HEADER_SCAN_ROWS:
+                break
+        if not head:
+            return pd.DataFrame()
+        
+        hits = LAYOUT_STATS["hits"]
+        header_row = detect_header_row(sheet_name, head)
+        info["rows"] = len(head)
+        info["layout"] = "known" if LAYOUT_STATS["hits"] > hits else "new"
+    
+    with profiling.stage("load.parse") as info:
+        body = [row for row in head[header_row + 1:] if row]
+        body.extend(row for row in rows if row)
+        info["rows"] = len(body)
+    
+    width = max([len(head[header_row])] + [len(row) for row in body])
+    header = tuple(head[header_row]) + (None,) * (width - len(head[header_row]))
+    
+    names = []
+    seen = {}
+    for i, val in enumerate(header):
+        name = f"Unnamed: {i}" if val is None else val
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
         else:
-            new_columns.append(col)
-            
-    return new_columns
+            seen[name] = 0
+        names.append(name)
+    
+    with profiling.stage("load.build", rows=len(body), cols=width):
+        return build_frame(names, body)
+
+def open_workbook(path: pathlib.Path, reader: str = None) -> readers.SheetReader:
+    """
+    Opens a file with the reader picked for its extension, or the named reader
+    (config.READER, set by --reader) when it handles the file.
+    """
+    return readers.open_reader(path, reader or config.READER)
+
+def sheet_names(workbook: readers.SheetReader):
+    """Lists the sheet names of a workbook returned by open_workbook."""
+    return workbook.sheet_names
 
-def load_sheet(path: pathlib.Path, sheet_name: str) -> pd.DataFrame:
+def load_sheet(path: pathlib.Path, sheet_name, workbook: readers.SheetReader = None,
+               reader: str = None) -> pd.DataFrame:
     """
-    Reads Excel file and processes it to have clean headers with date columns.
+    Reads a sheet and processes it to have clean headers with date columns.
     Specifically handles the trial balance format in the provided Excel files.
+    Pass a workbook from open_workbook to avoid reopening the file, or the name of
+    a reader (see readers.READERS) to read it with that backend. path may also be an
+    archive member, a buffer or bytes (see sources.py).
     """
+    path = sources.as_source(path)
     try:
-        # Read the Excel file without headers first
-        df = pd.read_excel(path, sheet_name=sheet_name, header=None)
+        if workbook is None:
+            with profiling.stage("load.open") as info:
+                workbook = open_workbook(path, reader)
+                info["reader"] = workbook.name
+            with workbook:
+                return load_sheet(path, sheet_name, workbook)
         
-        # Find the header row (typically row with month names)
-        header_row = find_header_row(df)
+        name = workbook.sheet_name(sheet_name)
+        df = read_rows(name, trim_rows(workbook.rows(name)))
         
-        # Re-read with the detected header row
-        df = pd.read_excel(path, sheet_name=sheet_name, header=header_row)
-        
-        # Clean up column names
-        df.columns = [str(col).strip() if col is not None else f"Column_{i}" 
-                     for i, col in enumerate(df.columns)]
-        
-        # Convert date-like columns to proper dates
-        df.columns = convert_columns_to_dates(df)
-        
-        # Filter out rows that are just section headers or blank
-        # In trial balance reports, actual data rows typically have numeric values
-        numeric_mask = df.iloc[:, 1:].apply(lambda x: pd.to_numeric(x, errors='coerce')).notna().any(axis=1)
-        df = df[numeric_mask]
-        
-        # Drop any columns that are entirely NaN
-        df = df.dropna(axis=1, how='all')
-        
-        # Sort columns: first column (typically account name/number) followed by dates in order
-        date_cols = [col for col in df.columns[1:] if isinstance(col, datetime.date)]
-        non_date_cols = [col for col in df.columns[1:] if not isinstance(col, datetime.date)]
-        
-        # Reorder columns: first column, then date columns (sorted), then other columns
-        if date_cols:  # Only reorder if we have identified date columns
-            new_order = [df.columns[0]] + sorted(date_cols) + non_date_cols
-            df = df[new_order]
-        
-        # Clean up data - replace NaN with 0 for numeric columns
-        for col in df.columns[1:]:
-            try:
-                if df[col].dtype in [np.float64, np.int64] or pd.api.types.is_numeric_dtype(df[col]):
-                    df[col] = df[col].fillna(0)
-            except:
-                pass
-        
-        return df
+        with profiling.stage("load.clean", rows=len(df), cols=len(df.columns)):
+            return clean_sheet(df)
     
     except Exception as e:
         print(f"Error loading {path}, sheet '{sheet_name}': {e}")
@@ -124,34 +275,73 @@ def load_sheet(path: pathlib.Path, sheet_name: str) -> pd.DataFrame:
         empty_df = pd.DataFrame(columns=["Line Item", file_utils.extract_date(path)])
         return empty_df
 
-def load_bs(path: pathlib.Path) -> pd.DataFrame:
-    """Loads Balance Sheet data."""
-    # Try different sheet names that might contain balance sheet data
-    for sheet_name in ["Sheet1", "Balance Sheet", "BS", "Balance_Sheet"]:
-        try:
-            return load_sheet(path, sheet_name=sheet_name)
-        except Exception:
-            continue
-            
-    # If no sheet found, try the first sheet
+def clean_sheet(df: pd.DataFrame) -> pd.DataFrame:
+    """Turns a header-promoted sheet into account rows with date columns in order."""
+    # Clean up column names
+    df.columns = [str(col).strip() if col is not None else f"Column_{i}" 
+                 for i, col in enumerate(df.columns)]
+    
+    # Convert date-like columns to proper dates
+    df.columns = convert_columns_to_dates(df)
+    
+    # Coerce the whole value block in one pass, reading accounting formats like "(1,234.56)"
+    values, unparseable = numeric.coerce_block(df.iloc[:, 1:])
+    
+    # Filter out rows that are just section headers or blank
+    # In trial balance reports, actual data rows typically have numeric values
+    numeric_mask = ~np.isnan(values).all(axis=1) if values.shape[1] else np.zeros(len(df), dtype=bool)
+    values, unparseable = values[numeric_mask], unparseable[numeric_mask]
+    
+    # Section rows are dropped, but the account tree they define is kept for rollups
+    structure = hierarchy.subset(hierarchy.capture(df.iloc[:, 0].tolist(), numeric_mask), numeric_mask)
+    
+    # Drop any columns that are entirely NaN
+    keep = ~np.isnan(values).all(axis=0)
+    value_cols = [col for col, kept in zip(df.columns[1:], keep) if kept]
+    values, unparseable = values[:, keep], unparseable[:, keep]
+    
+    # Sort columns: first column (typically account name/number) followed by dates in order,
+    # then other columns
+    date_cols = sorted(col for col in value_cols if isinstance(col, datetime.date))
+    non_date_cols = [col for col in value_cols if not isinstance(col, datetime.date)]
+    position = {col: i for i, col in enumerate(value_cols)}
+    
+    # Clean up data - replace NaN with 0
+    values = np.nan_to_num(values, nan=0.0)
+    columns = {df.columns[0]: df.iloc[:, 0].to_numpy()[numeric_mask]}
+    for col in date_cols + non_date_cols:
+        columns[col] = values[:, position[col]]
+    out = pd.DataFrame(columns)
+    
+    # Text in the month columns that isn't a number is counted rather than silently dropped
+    out.attrs["unparseable_cells"] = int(sum(unparseable[:, position[col]].sum() for col in date_cols))
+    out.attrs["hierarchy"] = structure
+    return out
+
+BS_SHEETS = ["Sheet1", "Balance Sheet", "BS", "Balance_Sheet"]
+IS_SHEETS = ["Sheet1", "Income Statement", "Profit and Loss", "P&L", "IS"]
+
+def load_statement(path: pathlib.Path, candidates, label: str) -> pd.DataFrame:
+    """
+    Opens the workbook once, picks the sheet from its sheet list and loads it.
+    path may be a file, an archive member, a buffer or bytes (see sources.py).
+    """
+    path = sources.as_source(path)
     try:
-        return load_sheet(path, sheet_name=0)
+        with profiling.stage("load.open") as info:
+            workbook = open_workbook(path)
+            info["reader"] = workbook.name
+        with workbook:
+            sheet_name = choose_sheet(sheet_names(workbook), candidates)
+            return load_sheet(path, sheet_name, workbook=workbook)
     except Exception as e:
-        print(f"Failed to load balance sheet from {path}: {e}")
+        print(f"Failed to load {label} from {path}: {e}")
         return pd.DataFrame()
 
+def load_bs(path: pathlib.Path) -> pd.DataFrame:
+    """Loads Balance Sheet data."""
+    return load_statement(path, BS_SHEETS, "balance sheet")
+
 def load_is(path: pathlib.Path) -> pd.DataFrame:
     """Loads Income Statement data."""
-    # Try different sheet names that might contain income statement data
-    for sheet_name in ["Sheet1", "Income Statement", "Profit and Loss", "P&L", "IS"]:
-        try:
-            return load_sheet(path, sheet_name=sheet_name)
-        except Exception:
-            continue
-            
-    # If no sheet found, try the first sheet
-    try:
-        return load_sheet(path, sheet_name=0)
-    except Exception as e:
-        print(f"Failed to load income statement from {path}: {e}")
-        return pd.DataFrame()
+    return load_statement(path, IS_SHEETS, "income statement")
@@ -0,0 +1,82 @@
+"""
+Vectorized coercion of accounting-formatted cells to numbers.
+
+Exports mix real numbers with text such as "(1,234.56)", "$ 1,234", "1,234-" and
+"—". coerce_block turns a whole block of cells into a float64 (or int64 cents)
+matrix in one pass and reports the cells it could not read:
+
+- numbers pass through, blanks (None, NaN, "") stay NaN
+- "(1,234.56)" and a trailing minus ("1,234.56-") are negative
+- currency symbols, thousands separators and spaces are ignored
+- a lone dash ("-", "–", "—", "−") means zero
+- text with more than one sign ("-12-", "(-12)") is unreadable
+"""
+from typing import Tuple
+
+import numpy as np
+import pandas as pd
+
+DASHES = ("-", "–", "—", "−")
+
+# Characters dropped before parsing: currency symbols, thousands separators and spaces
+NOISE = r"[\s$€£¥, ]"
+
+
+def _parse_text(text: pd.Series) -> pd.Series:
+    """Parses accounting-formatted strings; anything else becomes NaN."""
+    text = text.str.strip()
+    dash = text.isin(DASHES)
+
+    parens = text.str.startswith("(") & text.str.endswith(")")
+    text = text.where(~parens, text.str[1:-1])
+    text = text.str.replace(NOISE, "", regex=True).str.replace("−", "-", regex=False)
+    # Parentheses, a leading and a trailing minus each mark a negative; only one may be used
+    signs = text.str.count("-") + parens
+    trailing = text.str.endswith("-") & (text.str.len() > 1)
+    text = text.where(~trailing, text.str[:-1])
+
+    values = pd.to_numeric(text, errors="coerce")
+    values = values.where(~(parens | trailing), -values)
+    values = values.where(signs <= 1)
+    return values.where(~dash, 0.0)
+
+
+def coerce_block(block, cents: bool = False) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Converts a 2-D block of cells (array or DataFrame) to numbers.
+    Returns (values, unparseable): a float64 matrix with NaN for blank and unreadable cells,
+    and a boolean mask of the non-blank cells that could not be read. With cents the values
+    are int64 cents instead, rounded to the nearest cent, with blanks as 0.
+    """
+    if isinstance(block, pd.DataFrame):
+        block = block.to_numpy(dtype=object) if any(dt.kind not in "fiub" for dt in block.dtypes) \
+            else block.to_numpy(dtype=np.float64)
+    block = np.asarray(block)
+    shape = block.shape
+
+    if block.dtype.kind in "fiub":
+        values = block.astype(np.float64)
+        unparseable = np.zeros(shape, dtype=bool)
+    else:
+        cells = pd.Series(block.ravel(), dtype=object)
+        values = pd.to_numeric(cells, errors="coerce")
+
+        # Only text that plain parsing missed goes through the accounting rules
+        text = cells.map(type).eq(str) & values.isna()
+        if text.any():
+            values[text] = _parse_text(cells[text].astype(str))
+        blank = cells.isna() | (text & cells.where(text, "x").str.strip().eq(""))
+        unparseable = (values.isna() & ~blank).to_numpy().reshape(shape)
+        values = values.to_numpy(dtype=np.float64).reshape(shape)
+
+    if cents:
+        return np.rint(np.nan_to_num(values, nan=0.0) * 100).astype(np.int64), unparseable
+    return values, unparseable
+
+
+def coerce_column(column: pd.Series) -> pd.Series:
+    """coerce_block for a single column; numeric columns are returned unchanged."""
+    if pd.api.types.is_numeric_dtype(column):
+        return column
+    values, _ = coerce_block(column.to_numpy(dtype=object).reshape(-1, 1))
+    return pd.Series(values[:, 0], index=column.index, name=column.name)
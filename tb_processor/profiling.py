@@ -0,0 +1,156 @@
+"""Stage-level instrumentation for --profile and --report-json."""
+import contextlib
+import cProfile
+import datetime
+import json
+import os
+import sys
+import threading
+import time
+from typing import List, Optional
+
+_active = None
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process in MB, or None where it isn't available."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+class Profiler:
+    """
+    Collects one record per stage: wall time, rows and columns processed and the
+    process's peak RSS when the stage ended. Stages whose name starts with
+    cprofile_stage are also run under cProfile.
+    """
+
+    def __init__(self, cprofile_stage: str = None):
+        self.records: List[dict] = []
+        self.started = time.time()
+        self.cprofile_stage = cprofile_stage
+        self.cprofile = cProfile.Profile() if cprofile_stage else None
+        self._lock = threading.Lock()
+        self._profiling = False
+
+    @contextlib.contextmanager
+    def stage(self, name: str, **fields):
+        """Times the enclosed block. The yielded dict takes rows/cols and any extra fields."""
+        info = dict(fields)
+        use_cprofile = (self.cprofile is not None and name.startswith(self.cprofile_stage)
+                        and threading.current_thread() is threading.main_thread() and not self._profiling)
+        if use_cprofile:
+            self._profiling = True
+            self.cprofile.enable()
+        start = time.perf_counter()
+        try:
+            yield info
+        finally:
+            seconds = time.perf_counter() - start
+            if use_cprofile:
+                self.cprofile.disable()
+                self._profiling = False
+            record = {"stage": name, "seconds": seconds, "rows": info.pop("rows", None),
+                      "cols": info.pop("cols", None), "peak_rss_mb": peak_rss_mb(), "pid": os.getpid()}
+            record.update(info)
+            with self._lock:
+                self.records.append(record)
+
+    def extend(self, records: List[dict]):
+        """Adds records collected in a worker process."""
+        with self._lock:
+            self.records.extend(records)
+
+    def summary(self) -> List[dict]:
+        """Aggregates records per stage, in the order stages first ran."""
+        stages = {}
+        for record in self.records:
+            entry = stages.setdefault(record["stage"], {"stage": record["stage"], "count": 0, "seconds": 0.0,
+                                                        "rows": 0, "cols": 0, "peak_rss_mb": None})
+            entry["count"] += 1
+            entry["seconds"] += record["seconds"]
+            entry["rows"] += record["rows"] or 0
+            entry["cols"] = max(entry["cols"], record["cols"] or 0)
+            if record["peak_rss_mb"] is not None:
+                entry["peak_rss_mb"] = max(entry["peak_rss_mb"] or 0, record["peak_rss_mb"])
+        return list(stages.values())
+
+    def format_table(self) -> str:
+        lines = [f"{'stage':<20} {'count':>6} {'seconds':>9} {'rows':>10} {'cols':>6} {'peak RSS MB':>12}"]
+        for entry in self.summary():
+            rss = f"{entry['peak_rss_mb']:.1f}" if entry["peak_rss_mb"] is not None else "-"
+            lines.append(f"{entry['stage']:<20} {entry['count']:>6} {entry['seconds']:>9.3f} "
+                         f"{entry['rows']:>10} {entry['cols']:>6} {rss:>12}")
+        lines.append(f"Total wall time: {time.time() - self.started:.3f}s")
+        return "\n".join(lines)
+
+    def report(self, command: str = None) -> dict:
+        """The machine-readable run report written by --report-json."""
+        return {
+            "command": command,
+            "started": datetime.datetime.fromtimestamp(self.started).isoformat(timespec="seconds"),
+            "total_seconds": time.time() - self.started,
+            "peak_rss_mb": peak_rss_mb(),
+            "summary": self.summary(),
+            "stages": self.records,
+        }
+
+
+def active() -> Optional[Profiler]:
+    """The profiler collecting stages in this process, if any."""
+    return _active
+
+
+def enable(cprofile_stage: str = None) -> Profiler:
+    global _active
+    _active = Profiler(cprofile_stage)
+    return _active
+
+
+def disable():
+    global _active
+    _active = None
+
+
+@contextlib.contextmanager
+def stage(name: str, **fields):
+    """Times the enclosed block when profiling is on, otherwise does nothing."""
+    profiler = _active
+    if profiler is None:
+        yield {}
+        return
+    with profiler.stage(name, **fields) as info:
+        yield info
+
+
+@contextlib.contextmanager
+def session(profile: bool = False, report_json: str = None, cprofile_path: str = None,
+            cprofile_stage: str = "combine", command: str = None):
+    """
+    Profiles the enclosed run when any of the outputs is requested: prints the summary
+    table for profile, writes the report to report_json and the cProfile stats to cprofile_path.
+    """
+    if not (profile or report_json or cprofile_path):
+        yield None
+        return
+
+    profiler = enable(cprofile_stage if cprofile_path else None)
+    try:
+        yield profiler
+    finally:
+        disable()
+        if profile:
+            print()
+            print(profiler.format_table())
+        if report_json:
+            with open(report_json, "w") as fh:
+                json.dump(profiler.report(command), fh, indent=2, default=str)
+            print(f"Run report written to {report_json}")
+        if cprofile_path:
+            profiler.cprofile.dump_stats(cprofile_path)
+            print(f"cProfile stats for '{cprofile_stage}' stages written to {cprofile_path}")
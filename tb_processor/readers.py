@@ -0,0 +1,249 @@
+"""
+Input readers: the backends that turn a source file into rows of cell values.
+
+Every reader yields a sheet as tuples of plain Python values (None for empty cells,
+whole numbers as int, dates as datetime), so the loader builds the same DataFrame
+whichever backend read the file. The reader for a file is picked by its extension,
+preferring the fastest one that is installed:
+
+    calamine   .xlsx .xlsm .xlsb .xls .ods   needs python-calamine
+    openpyxl   .xlsx .xlsm                   streams in read-only mode
+    pyxlsb     .xlsb                         needs pyxlsb
+    csv        .csv .txt                     standard library
+    pandas     .xls .ods                     needs xlrd / odfpy
+"""
+import csv
+import datetime
+import importlib.util
+import io
+import re
+from typing import Dict, Iterator, List, Optional, Type
+
+from . import sources
+
+AUTO = "auto"
+
+# Plain numbers in text files, read as int or float like Excel cells
+NUMBER_PATTERN = re.compile(r"-?\d+(\.\d+)?")
+
+
+def _cell(val):
+    """Normalizes a cell from a reader that doesn't type cells like openpyxl does."""
+    if val is None or val == "":
+        return None
+    if isinstance(val, float):
+        if val != val:
+            # NaN from pandas
+            return None
+        return int(val) if val.is_integer() else val
+    if type(val) is datetime.date:
+        return datetime.datetime.combine(val, datetime.time())
+    return val
+
+
+class SheetReader:
+    """
+    Base class for input readers. Open one per file, list its sheet_names and iterate
+    rows(sheet) for the raw rows of a sheet, from its first row down. The file may be a
+    path or a source from sources.py; self.target is what to hand the reader library.
+    """
+    name = ""
+    suffixes = ()
+    # Module that must be importable for the reader to be used
+    requires: Optional[str] = None
+
+    @classmethod
+    def available(cls) -> bool:
+        return cls.requires is None or importlib.util.find_spec(cls.requires) is not None
+
+    def __init__(self, path):
+        self.path = sources.as_source(path)
+        self.target = sources.openable(self.path)
+
+    @property
+    def sheet_names(self) -> List[str]:
+        raise NotImplementedError
+
+    def sheet_name(self, sheet) -> str:
+        """Resolves a sheet given by position, as choose_sheet returns for an empty list."""
+        return self.sheet_names[sheet] if isinstance(sheet, int) else sheet
+
+    def rows(self, sheet) -> Iterator[tuple]:
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class OpenpyxlReader(SheetReader):
+    """Streams workbooks with openpyxl in read-only mode."""
+    name = "openpyxl"
+    suffixes = (".xlsx", ".xlsm")
+
+    def __init__(self, path):
+        super().__init__(path)
+        import openpyxl
+        self.workbook = openpyxl.load_workbook(self.target, read_only=True, data_only=True)
+
+    @property
+    def sheet_names(self) -> List[str]:
+        return self.workbook.sheetnames
+
+    def worksheet(self, sheet):
+        return self.workbook[self.sheet_name(sheet)]
+
+    def rows(self, sheet) -> Iterator[tuple]:
+        ws = self.worksheet(sheet)
+        # The stored dimensions are often wrong for exported files, so don't trust them
+        if hasattr(ws, "reset_dimensions"):
+            ws.reset_dimensions()
+        return ws.iter_rows(values_only=True)
+
+    def close(self):
+        self.workbook.close()
+
+
+class CalamineReader(SheetReader):
+    """Reads any Excel format with the Rust calamine parser."""
+    name = "calamine"
+    suffixes = (".xlsx", ".xlsm", ".xlsb", ".xls", ".ods")
+    requires = "python_calamine"
+
+    def __init__(self, path):
+        super().__init__(path)
+        from python_calamine import CalamineWorkbook
+        if isinstance(self.target, str):
+            self.workbook = CalamineWorkbook.from_path(self.target)
+        else:
+            self.workbook = CalamineWorkbook.from_filelike(self.target)
+
+    @property
+    def sheet_names(self) -> List[str]:
+        return self.workbook.sheet_names
+
+    def rows(self, sheet) -> Iterator[tuple]:
+        ws = self.workbook.get_sheet_by_name(self.sheet_name(sheet))
+        # Keep the empty area above and left of the data so rows and columns line up with A1
+        for row in ws.to_python(skip_empty_area=False):
+            yield tuple(_cell(val) for val in row)
+
+    def close(self):
+        self.workbook.close()
+
+
+class PyxlsbReader(SheetReader):
+    """Reads Excel binary workbooks with pyxlsb. Dates come back as serial numbers."""
+    name = "pyxlsb"
+    suffixes = (".xlsb",)
+    requires = "pyxlsb"
+
+    def __init__(self, path):
+        super().__init__(path)
+        import pyxlsb
+        self.workbook = pyxlsb.open_workbook(self.target)
+
+    @property
+    def sheet_names(self) -> List[str]:
+        return self.workbook.sheets
+
+    def rows(self, sheet) -> Iterator[tuple]:
+        with self.workbook.get_sheet(self.sheet_name(sheet)) as ws:
+            for row in ws.rows():
+                yield tuple(_cell(c.v) for c in row)
+
+    def close(self):
+        self.workbook.close()
+
+
+class CsvReader(SheetReader):
+    """Reads comma, semicolon or tab separated exports as a single sheet."""
+    name = "csv"
+    suffixes = (".csv", ".txt")
+    # The single sheet is named like the first sheet of an exported workbook, so CSV files
+    # share report layouts with their .xlsx counterparts
+    sheet = "Sheet1"
+
+    @property
+    def sheet_names(self) -> List[str]:
+        return [self.sheet]
+
+    def rows(self, sheet) -> Iterator[tuple]:
+        raw = open(self.target, "rb") if isinstance(self.target, str) else io.BytesIO(self.target.getvalue())
+        with io.TextIOWrapper(raw, encoding="utf-8-sig", newline="") as fh:
+            try:
+                dialect = csv.Sniffer().sniff(fh.read(64 * 1024), delimiters=",;\t")
+            except csv.Error:
+                dialect = csv.excel
+            fh.seek(0)
+            for row in csv.reader(fh, dialect):
+                yield tuple(self.cell(val) for val in row)
+
+    @staticmethod
+    def cell(text: str):
+        text = text.strip()
+        if not text:
+            return None
+        if NUMBER_PATTERN.fullmatch(text):
+            return float(text) if "." in text else int(text)
+        return text
+
+
+class PandasReader(SheetReader):
+    """Reads whatever pd.read_excel can, e.g. .xls with xlrd or .ods with odfpy."""
+    name = "pandas"
+    suffixes = (".xlsx", ".xlsm", ".xls", ".ods")
+
+    def __init__(self, path):
+        super().__init__(path)
+        import pandas as pd
+        self.workbook = pd.ExcelFile(self.target)
+
+    @property
+    def sheet_names(self) -> List[str]:
+        return self.workbook.sheet_names
+
+    def rows(self, sheet) -> Iterator[tuple]:
+        raw = self.workbook.parse(sheet_name=self.sheet_name(sheet), header=None)
+        for row in raw.itertuples(index=False, name=None):
+            yield tuple(_cell(val) for val in row)
+
+    def close(self):
+        self.workbook.close()
+
+
+# In order of preference when several readers handle an extension
+READERS: Dict[str, Type[SheetReader]] = {
+    reader.name: reader for reader in (CalamineReader, OpenpyxlReader, PyxlsbReader, CsvReader, PandasReader)
+}
+
+
+def reader_for(path, name: str = AUTO) -> Type[SheetReader]:
+    """
+    Picks the reader class for a file. A named reader is used when it handles the file's
+    extension, otherwise (and with "auto") the first installed reader that does.
+    Raises ValueError for an unknown or uninstalled reader, or an unsupported extension.
+    """
+    suffix = sources.as_source(path).suffix.lower()
+    if name and name != AUTO:
+        if name not in READERS:
+            raise ValueError(f"Unknown reader '{name}', expected one of: {', '.join(READERS)}")
+        reader = READERS[name]
+        if not reader.available():
+            raise ValueError(f"The {name} reader needs {reader.requires}, which is not installed")
+        if suffix in reader.suffixes:
+            return reader
+    for reader in READERS.values():
+        if suffix in reader.suffixes and reader.available():
+            return reader
+    raise ValueError(f"No installed reader handles {suffix or 'files without an extension'}")
+
+
+def open_reader(path, name: str = AUTO) -> SheetReader:
+    """Opens a file with the reader reader_for picks."""
+    return reader_for(path, name)(path)
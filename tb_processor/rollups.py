@@ -0,0 +1,160 @@
+"""
+Rollups of a combined sheet: section subtotals and quarterly, year-to-date and
+trailing-twelve-month figures for every account.
+
+Everything is computed on the account x month matrix at once. Subtotals are segment
+sums of the account rows over their sections (from the hierarchy the loader captured),
+and period figures are segment sums and cumulative-sum differences along the months.
+Amounts that fit in whole cents are summed as int64 cents, so the figures add up
+exactly.
+
+Balance sheet amounts are balances, so a quarter shows its closing balance and there
+are no YTD or T12 figures. Income statement amounts are flows and are summed.
+"""
+import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from . import compact as tb_compact
+from . import hierarchy
+
+# Sheets whose amounts are flows over the month rather than balances at month end
+FLOW_SHEETS = {"Income Statement"}
+
+# Joins section labels in the Section column of a subtotals sheet
+PATH_SEPARATOR = " / "
+
+
+def _matrix(df: pd.DataFrame):
+    """The month columns of a combined frame and their amounts, in int64 cents when possible."""
+    months = [col for col in df.columns if isinstance(col, datetime.date)]
+    values = df[months].to_numpy(dtype="float64") if months else np.zeros((len(df), 0))
+    cents = tb_compact.to_cents(values)
+    return months, (values if cents is None else cents), cents is not None
+
+
+def _frame(first: Dict[str, object], labels: List, values: np.ndarray, in_cents: bool) -> pd.DataFrame:
+    columns = dict(first)
+    amounts = values / tb_compact.CENTS if in_cents else values
+    for i, label in enumerate(labels):
+        columns[label] = amounts[:, i]
+    return pd.DataFrame(columns)
+
+
+def segment_sums(values: np.ndarray, segments: np.ndarray, count: int) -> np.ndarray:
+    """Sums the rows of values per segment id (0 <= id < count); empty segments are 0."""
+    out = np.zeros((count,) + values.shape[1:], dtype=values.dtype)
+    if not len(segments):
+        return out
+    order = np.argsort(segments, kind="stable")
+    ids = segments[order]
+    starts = np.flatnonzero(np.r_[True, ids[1:] != ids[:-1]])
+    out[ids[starts]] = np.add.reduceat(values[order], starts, axis=0)
+    return out
+
+
+def subtotals(df: pd.DataFrame) -> Optional[pd.DataFrame]:
+    """
+    Sums the accounts of every section of the report, nested sections included. The
+    report's own "Total ..." rows are not counted. Returns None without a hierarchy.
+    """
+    df = tb_compact.expand(df)
+    structure = hierarchy.of(df)
+    if structure is None or not structure["sections"]:
+        return None
+    months, values, in_cents = _matrix(df)
+
+    rows = np.asarray(structure["rows"], dtype="int64")
+    accounts = np.flatnonzero((rows >= 0) & (np.asarray(structure["totals"]) == 0))
+    parents = np.array([parent for _, parent in structure["sections"]], dtype="int64")
+
+    # Pair each account with its section and every section above it, one level at a time
+    members, sections = [], []
+    current = rows[accounts]
+    while len(accounts):
+        members.append(accounts)
+        sections.append(current)
+        current = parents[current]
+        accounts = accounts[current >= 0]
+        current = current[current >= 0]
+    members = np.concatenate(members) if members else np.zeros(0, dtype="int64")
+    sections = np.concatenate(sections) if sections else np.zeros(0, dtype="int64")
+
+    sums = segment_sums(values[members], sections, len(parents))
+    paths = hierarchy.paths(structure["sections"])
+    return _frame({"Section": [PATH_SEPARATOR.join(path) for path in paths],
+                   "Level": [len(path) for path in paths]}, months, sums, in_cents)
+
+
+def _month_numbers(months: List[datetime.date]) -> np.ndarray:
+    return np.array([m.year * 12 + m.month - 1 for m in months], dtype="int64")
+
+
+def quarterly(df: pd.DataFrame, flows: bool) -> pd.DataFrame:
+    """
+    One column per calendar quarter: the sum of its months for flows, the balance of
+    its last month otherwise.
+    """
+    df = tb_compact.expand(df)
+    months, values, in_cents = _matrix(df)
+    quarters = _month_numbers(months) // 3
+    starts = np.flatnonzero(np.diff(quarters, prepend=-1) != 0)
+    if not len(starts):
+        sums = values
+    elif flows:
+        sums = np.add.reduceat(values, starts, axis=1)
+    else:
+        sums = values[:, np.r_[starts[1:], len(months)] - 1]
+    labels = [f"{q // 4} Q{q % 4 + 1}" for q in quarters[starts]]
+    return _frame({df.columns[0]: df.iloc[:, 0].to_numpy()}, labels, sums, in_cents)
+
+
+def _running(values: np.ndarray) -> np.ndarray:
+    """Cumulative sums along the months with a leading column of zeros."""
+    return np.concatenate([np.zeros((len(values), 1), dtype=values.dtype), np.cumsum(values, axis=1)], axis=1)
+
+
+def year_to_date(df: pd.DataFrame) -> pd.DataFrame:
+    """Each month's total since the start of its calendar year."""
+    df = tb_compact.expand(df)
+    months, values, in_cents = _matrix(df)
+    years = np.array([m.year for m in months], dtype="int64")
+    first = np.searchsorted(years, years, side="left")
+    running = _running(values)
+    ytd = running[:, 1:] - running[:, first]
+    return _frame({df.columns[0]: df.iloc[:, 0].to_numpy()}, months, ytd, in_cents)
+
+
+def trailing_twelve(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Each month's total over the twelve months ending with it. Only months with all
+    twelve months on file get a column.
+    """
+    df = tb_compact.expand(df)
+    months, values, in_cents = _matrix(df)
+    numbers = _month_numbers(months)
+    first = np.searchsorted(numbers, numbers - 11, side="left")
+    complete = np.flatnonzero(np.arange(len(months)) - first == 11)
+    running = _running(values)
+    t12 = running[:, complete + 1] - running[:, first[complete]]
+    return _frame({df.columns[0]: df.iloc[:, 0].to_numpy()}, [months[i] for i in complete], t12, in_cents)
+
+
+def rollup_sheets(sheet: str, df: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+    """The rollup sheets for a combined sheet, named after it ("Balance Sheet Quarterly", ...)."""
+    if df.empty:
+        return {}
+    flows = sheet in FLOW_SHEETS
+    sheets = {}
+    totals = subtotals(df)
+    if totals is not None:
+        sheets[f"{sheet} Subtotals"] = totals
+    sheets[f"{sheet} Quarterly"] = quarterly(df, flows)
+    if flows:
+        sheets[f"{sheet} YTD"] = year_to_date(df)
+        t12 = trailing_twelve(df)
+        if len(t12.columns) > 1:
+            sheets[f"{sheet} T12"] = t12
+    return sheets
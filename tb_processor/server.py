@@ -0,0 +1,235 @@
+"""
+tb serve: a local HTTP service answering balance queries from combined sheets kept in memory.
+
+    GET /query?account=Cash&account=Accounts%20Receivable&from=2023-01&to=2023-12&statement=bs
+    GET /accounts?statement=is
+    GET /status
+
+Responses are JSON. Every response carries an ETag derived from the source files'
+fingerprints and the query, so a client sending If-None-Match gets 304 Not Modified
+until an input file changes. A background thread polls the input directory and,
+once the files have settled, builds a new state and swaps it in with one assignment;
+requests in flight keep answering from the state they started with.
+"""
+import datetime
+import hashlib
+import http.server
+import json
+import threading
+import urllib.parse
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from . import combiner
+from . import compact as tb_compact
+from . import loader
+from . import store
+from . import watch
+
+# Rendered responses kept per state
+RESPONSE_CACHE_SIZE = 1024
+
+
+def source_tag(snapshot) -> str:
+    """Hashes the (size, mtime) of every source file, and the loader version, into an ETag base."""
+    digest = hashlib.blake2b(digest_size=12)
+    digest.update(str(loader.LOADER_VERSION).encode())
+    for sheet in sorted(snapshot):
+        for path, (size, mtime_ns) in sorted(snapshot[sheet].items()):
+            digest.update(f"{sheet}\0{path}\0{size}\0{mtime_ns}\n".encode())
+    return digest.hexdigest()
+
+
+class Statement:
+    """A combined sheet laid out for lookups: account -> rows, and sorted month columns."""
+
+    def __init__(self, name: str, df: pd.DataFrame):
+        df = tb_compact.expand(df)
+        self.name = name
+        self.periods = [col for col in df.columns if isinstance(col, datetime.date)]
+        self.period_text = [p.isoformat() for p in self.periods]
+        self.values = df[self.periods].to_numpy(dtype="float64") if len(df) else np.zeros((0, 0))
+        self.accounts = df.iloc[:, 0].astype(str).tolist() if len(df) else []
+        self.rows: Dict[str, List[int]] = {}
+        for i, account in enumerate(self.accounts):
+            self.rows.setdefault(account, []).append(i)
+
+    def lookup(self, accounts: List[str], start: Optional[datetime.date], end: Optional[datetime.date]) -> list:
+        """Long-format rows for the accounts (all when empty) over the inclusive period range."""
+        lo = 0 if start is None else int(np.searchsorted(self.periods, start, side="left"))
+        hi = len(self.periods) if end is None else int(np.searchsorted(self.periods, end, side="right"))
+        if accounts:
+            positions = [(account, n, i) for account in accounts
+                         for n, i in enumerate(self.rows.get(account, ()))]
+        else:
+            occurrence: Dict[str, int] = {}
+            positions = []
+            for i, account in enumerate(self.accounts):
+                positions.append((account, occurrence.get(account, 0), i))
+                occurrence[account] = occurrence.get(account, 0) + 1
+        return [
+            {"statement": self.name, "account": account, "occurrence": n,
+             "period": self.period_text[j], "amount": float(self.values[i, j])}
+            for account, n, i in positions for j in range(lo, hi)
+        ]
+
+
+class State:
+    """One immutable generation of the served data, with its own response cache."""
+
+    def __init__(self, sheets: Dict[str, pd.DataFrame], snapshot):
+        self.statements = {name: Statement(name, df) for name, df in sheets.items() if not df.empty}
+        self.tag = source_tag(snapshot)
+        self.files = sum(len(files) for files in snapshot.values())
+        self.loaded_at = datetime.datetime.now().isoformat(timespec="seconds")
+        self.responses: Dict[str, bytes] = {}
+
+    def pick(self, statement: Optional[str]) -> List[Statement]:
+        if statement is None:
+            return list(self.statements.values())
+        name = store.STATEMENTS.get(statement, statement)
+        if name not in store.STATEMENTS.values():
+            raise ValueError(f"Unknown statement '{statement}', expected bs or is")
+        return [self.statements[name]] if name in self.statements else []
+
+    def render(self, path: str, params: Dict[str, List[str]]) -> bytes:
+        """The JSON body for a request. Raises ValueError for a bad request, KeyError for an unknown path."""
+        statement = params.get("statement", [None])[-1]
+        if path == "/query":
+            start = store.parse_period(params.get("from", [None])[-1])
+            end = store.parse_period(params.get("to", [None])[-1])
+            accounts = params.get("account", [])
+            rows = [row for s in self.pick(statement) for row in s.lookup(accounts, start, end)]
+            body = {"rows": rows}
+        elif path == "/accounts":
+            body = {"accounts": {s.name: list(s.rows) for s in self.pick(statement)}}
+        elif path == "/status":
+            body = {"files": self.files, "loaded_at": self.loaded_at,
+                    "statements": {s.name: {"accounts": len(s.accounts), "periods": len(s.periods),
+                                            "first": s.period_text[0] if s.periods else None,
+                                            "last": s.period_text[-1] if s.periods else None}
+                                   for s in self.statements.values()}}
+        else:
+            raise KeyError(path)
+        return json.dumps(body).encode()
+
+    def response(self, path: str, query: str):
+        """Returns (etag, body) for a request, rendering each distinct request once per state."""
+        params = urllib.parse.parse_qs(query, keep_blank_values=False)
+        # Parameter order doesn't matter, but the order of repeated accounts does
+        key = path + "?" + urllib.parse.urlencode([(k, v) for k in sorted(params) for v in params[k]])
+        etag = f'"{self.tag}-{hashlib.blake2b(key.encode(), digest_size=6).hexdigest()}"'
+        body = self.responses.get(key)
+        if body is None:
+            body = self.render(path, params)
+            if len(self.responses) >= RESPONSE_CACHE_SIZE:
+                self.responses.clear()
+            self.responses[key] = body
+        return etag, body
+
+
+def load_state(verbose: bool = False, jobs: int = 1, cache=None) -> State:
+    """Scans the input directory and combines both statements into a new State."""
+    snapshot = watch.scan()
+    sheets = {}
+    for sheet, files in snapshot.items():
+        if not files:
+            continue
+        if sheet == "Balance Sheet":
+            sheets[sheet] = combiner.combine_all_bs(list(files), verbose, jobs, cache)
+        else:
+            sheets[sheet] = combiner.combine_all_is(list(files), verbose, jobs, cache)
+    return State(sheets, snapshot)
+
+
+class Handler(http.server.BaseHTTPRequestHandler):
+    server: "TrialBalanceServer"
+
+    def do_GET(self):
+        url = urllib.parse.urlsplit(self.path)
+        # Read the state once so a reload mid-request can't mix two generations
+        state = self.server.state
+        try:
+            etag, body = state.response(url.path, url.query)
+        except KeyError:
+            return self.reply(404, {"error": f"Unknown path {url.path}, use /query, /accounts or /status"})
+        except ValueError as e:
+            return self.reply(400, {"error": str(e)})
+
+        if etag in [tag.strip() for tag in self.headers.get("If-None-Match", "").split(",")]:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def reply(self, status: int, payload: dict):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class TrialBalanceServer(http.server.ThreadingHTTPServer):
+    """
+    Serves the current State and rebuilds it in the background when source files change.
+    The rebuilt state replaces the old one in a single attribute assignment.
+    """
+    daemon_threads = True
+
+    def __init__(self, address, verbose: bool = False, jobs: int = 1, cache=None):
+        self.verbose = verbose
+        self.jobs = jobs
+        self.cache = cache
+        self.state = load_state(verbose, jobs, cache)
+        self._stop = threading.Event()
+        super().__init__(address, Handler)
+
+    def reload(self):
+        """Builds a fresh state from the input directory and swaps it in."""
+        state = load_state(self.verbose, self.jobs, self.cache)
+        self.state = state
+        stamp = datetime.datetime.now().strftime("%H:%M:%S")
+        print(f"[{stamp}] Reloaded {state.files} files")
+
+    def poll(self, interval: float = 2.0):
+        """Reloads once the files differ from the served state and stayed the same for one interval."""
+        last = None
+        while not self._stop.wait(interval):
+            snapshot = watch.scan()
+            if source_tag(snapshot) == self.state.tag:
+                last = None
+                continue
+            if snapshot != last:
+                last = snapshot
+                continue
+            try:
+                self.reload()
+            except Exception as e:
+                # Keep serving the previous state
+                print(f"[ERROR] Reload failed: {e}")
+            last = None
+
+    def serve(self, interval: float = 2.0):
+        """Serves until interrupted, polling for changes every interval seconds."""
+        poller = threading.Thread(target=self.poll, args=(interval,), daemon=True)
+        poller.start()
+        try:
+            self.serve_forever()
+        finally:
+            self._stop.set()
+            self.server_close()
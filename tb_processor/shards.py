@@ -0,0 +1,313 @@
+"""
+Sharded workbook output, so tb bs, tb is and tb all can run at the same time.
+
+Every sheet of the workbook is also kept as its own frame (a shard) in a directory next
+to it, written with cache.write_frame. A command writes the shards of its own sheets,
+then takes the output lock, records them in the shard index and assembles the
+workbook from the index: its own sheets from memory, the others from their shards.
+The workbook is written under a temporary name and renamed into place, so readers
+never see a half-written file and the sheets of concurrent runs are never lost.
+
+    tb_full.xlsx
+    tb_full.xlsx.lock               held while the workbook and index are replaced
+    tb_full.xlsx.shards/index.json  sheet -> shard file, in workbook order
+    tb_full.xlsx.shards/balance_sheet-<time>.parquet
+
+Sheets belong to a group, the statement they came from ("Balance Sheet" for the
+balance sheet and its rollups), and a command replaces its whole group, so turning
+--rollups off removes the rollup sheets it wrote before.
+"""
+import contextlib
+import datetime
+import json
+import os
+import pathlib
+import threading
+import time
+import zipfile
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from . import cache
+from . import profiling
+from . import writers
+
+try:
+    import fcntl
+except ImportError:
+    # Windows
+    fcntl = None
+    import msvcrt
+
+INDEX_VERSION = 1
+
+# Statement sheets in workbook order; other groups follow in the order they were added
+GROUP_ORDER = ("Balance Sheet", "Income Statement")
+
+# Shard files no index refers to, left by a run that died, are removed after this long
+ORPHAN_SECONDS = 24 * 60 * 60
+
+# On Windows, each attempt to take the output lock waits about 10 seconds, so another
+# run gets about 5 minutes to finish before this one gives up
+LOCK_ATTEMPTS = 30
+
+# Serializes the threads of this process and makes output_lock reentrant
+_GUARD = threading.RLock()
+_HELD: Dict[str, list] = {}
+
+
+def shard_dir(output) -> pathlib.Path:
+    output = pathlib.Path(output)
+    return output.with_name(output.name + ".shards")
+
+
+def lock_path(output) -> pathlib.Path:
+    output = pathlib.Path(output)
+    return output.with_name(output.name + ".lock")
+
+
+def _lock(fh, output):
+    """
+    Takes the lock on fh. flock waits for as long as another process holds it (a run that
+    dies releases it). On Windows, raises TimeoutError after LOCK_ATTEMPTS attempts.
+    """
+    if fcntl is not None:
+        fcntl.flock(fh.fileno(), fcntl.LOCK_EX)
+        return
+    fh.seek(0)
+    for _ in range(LOCK_ATTEMPTS):
+        try:
+            # LK_LOCK itself retries once a second, 10 times, before raising OSError
+            msvcrt.locking(fh.fileno(), msvcrt.LK_LOCK, 1)
+            return
+        except OSError:
+            continue
+    raise TimeoutError(f"{output} is locked by another run, try again once it has finished")
+
+
+def _unlock(fh):
+    if fcntl is not None:
+        fcntl.flock(fh.fileno(), fcntl.LOCK_UN)
+    else:
+        fh.seek(0)
+        msvcrt.locking(fh.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+@contextlib.contextmanager
+def output_lock(output):
+    """
+    Holds the lock file of output, waiting for other processes that hold it. Threads of
+    one process take turns, and a thread already holding the lock may take it again.
+    """
+    path = os.path.abspath(lock_path(output))
+    with _GUARD:
+        held = _HELD.get(path)
+        if held is None:
+            fh = open(path, "a+b")
+            try:
+                _lock(fh, output)
+            except BaseException:
+                fh.close()
+                raise
+            held = _HELD[path] = [fh, 0]
+        held[1] += 1
+        try:
+            yield
+        finally:
+            held[1] -= 1
+            if not held[1]:
+                del _HELD[path]
+                try:
+                    _unlock(held[0])
+                finally:
+                    held[0].close()
+
+
+def _mtime_ns(path) -> Optional[int]:
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def group_of(sheet: str) -> str:
+    """The statement a sheet belongs to: rollup sheets are named after theirs ("Balance Sheet Quarterly")."""
+    return next((group for group in GROUP_ORDER if sheet == group or sheet.startswith(group + " ")), sheet)
+
+
+def _rank(group: str) -> int:
+    return GROUP_ORDER.index(group) if group in GROUP_ORDER else len(GROUP_ORDER)
+
+
+class ShardIndex:
+    """
+    The shards making up the workbook, as {"sheet", "group", "file"} entries in sheet
+    order. Only trusted while the workbook is the one last assembled from it; read and
+    change it while holding output_lock.
+    """
+
+    def __init__(self, output):
+        self.output = pathlib.Path(output)
+        self.directory = shard_dir(output)
+        self.path = self.directory / "index.json"
+        self.entries: List[dict] = []
+        self._obsolete: List[str] = []
+
+        try:
+            with open(self.path) as fh:
+                data = json.load(fh)
+        except (OSError, ValueError):
+            data = {}
+        if data.get("version") == INDEX_VERSION and data.get("output_mtime_ns") == _mtime_ns(self.output):
+            self.entries = data.get("entries", [])
+        else:
+            self._obsolete = [entry["file"] for entry in data.get("entries", [])]
+
+    @property
+    def valid(self) -> bool:
+        return bool(self.entries)
+
+    def adopt(self, keep: List[str]):
+        """
+        Takes over the sheets of a workbook written without shards (an older version, or a
+        copy put in place by hand), so they survive the next assembly. Sheets in keep are
+        about to be replaced and aren't read.
+        """
+        if not self.output.exists():
+            return
+        try:
+            sheets = pd.read_excel(self.output, sheet_name=None, engine="openpyxl")
+        except (OSError, ValueError, KeyError, zipfile.BadZipFile):
+            print(f"  [WARNING] Could not read the sheets of {self.output}, they are not kept")
+            return
+        for sheet, df in sheets.items():
+            if sheet in keep:
+                continue
+            df.columns = [col.date() if isinstance(col, datetime.datetime) else col for col in df.columns]
+            self.entries.append({"sheet": sheet, "group": group_of(sheet), "file": self.write(sheet, df).name})
+
+    def write(self, sheet: str, df: pd.DataFrame) -> pathlib.Path:
+        """Writes the shard of a sheet under a new name; it takes effect with put() and save()."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        name = f"{writers.sheet_slug(sheet)}-{time.time_ns()}-{os.getpid()}-{threading.get_ident()}"
+        return cache.write_frame(self.directory / name, df)
+
+    def put(self, group: str, entries: List[dict]):
+        """Replaces the sheets of group, and any other shard of the same sheets, with entries."""
+        sheets = {entry["sheet"] for entry in entries}
+        kept = []
+        for entry in self.entries:
+            if entry["group"] == group or entry["sheet"] in sheets:
+                self._obsolete.append(entry["file"])
+            else:
+                kept.append(entry)
+        self.entries = sorted(kept + entries, key=lambda entry: _rank(entry["group"]))
+
+    def replace_all(self, entries: List[dict]):
+        self._obsolete.extend(entry["file"] for entry in self.entries)
+        self.entries = list(entries)
+
+    def read(self, entry: dict) -> pd.DataFrame:
+        return cache.read_frame(self.directory / entry["file"])
+
+    def save(self):
+        """Records the index for the workbook now on disk and removes shards no longer used."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        data = {
+            "version": INDEX_VERSION,
+            "output_mtime_ns": _mtime_ns(self.output),
+            "entries": self.entries,
+        }
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp, "w") as fh:
+            json.dump(data, fh, indent=2)
+        os.replace(tmp, self.path)
+
+        used = {entry["file"] for entry in self.entries} | {self.path.name}
+        for name in self._obsolete:
+            if name not in used:
+                writers.discard(self.directory / name)
+        self._obsolete = []
+        now = time.time()
+        for leftover in self.directory.iterdir():
+            try:
+                if leftover.name not in used and now - leftover.stat().st_mtime > ORPHAN_SECONDS:
+                    writers.discard(leftover)
+            except OSError:
+                pass
+
+
+class ShardedXlsxWriter(writers.SheetWriter):
+    """
+    Writes sheets as shards and, on close, assembles the workbook under the output lock.
+
+    With a group, the sheets written replace that group and the workbook keeps the other
+    groups' sheets. With replace_all, the sheets written become the whole workbook, which
+    is then streamed to a temporary file as the sheets come in and only the rename waits
+    for the lock.
+    """
+    extension = ".xlsx"
+    per_sheet = False
+
+    def __init__(self, output, group: Optional[str] = None, replace_all: bool = False):
+        super().__init__(output)
+        self.paths = [self.output]
+        self.group = group
+        self.replace_all = replace_all
+        self.index = ShardIndex(output)
+        self.entries: List[dict] = []
+        self.frames: Dict[str, pd.DataFrame] = {}
+        self._workbook = writers.XlsxWriter(output) if replace_all else None
+
+    def write_sheet(self, sheet: str, df: pd.DataFrame):
+        target = self.index.write(sheet, df)
+        self.entries.append({"sheet": sheet, "group": self.group or group_of(sheet), "file": target.name})
+        if self._workbook is not None:
+            self._workbook.write_sheet(sheet, df)
+        else:
+            self.frames[target.name] = df
+
+    def close(self):
+        try:
+            with output_lock(self.output):
+                # Another run may have published since this writer was opened
+                self.index = ShardIndex(self.output)
+                if self.replace_all:
+                    self.index.replace_all(self.entries)
+                    self._workbook.close()
+                    self._workbook = None
+                else:
+                    if not self.index.valid:
+                        self.index.adopt([entry["sheet"] for entry in self.entries])
+                    self.index.put(self.group, self.entries)
+                    self.assemble()
+                self.index.save()
+        except BaseException:
+            self.discard()
+            raise
+
+    def assemble(self):
+        with profiling.stage("write.assemble", format="xlsx", sheets=len(self.index.entries)):
+            with writers.XlsxWriter(self.output) as workbook:
+                for entry in self.index.entries:
+                    df = self.frames.get(entry["file"])
+                    workbook.write_sheet(entry["sheet"], df if df is not None else self.index.read(entry))
+
+    def discard(self):
+        if self._workbook is not None:
+            self._workbook.discard()
+            self._workbook = None
+        for entry in self.entries:
+            writers.discard(self.index.directory / entry["file"])
+        self.entries = []
+
+
+def open_output(fmt: str, output, group: Optional[str] = None) -> writers.SheetWriter:
+    """
+    The writer for a command's output. A workbook is written through its shards, replacing
+    group (or everything without a group); other formats already write a file per sheet.
+    """
+    if fmt == "xlsx":
+        return ShardedXlsxWriter(output, group, replace_all=group is None)
+    return writers.open_writer(fmt, output)
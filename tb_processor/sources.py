@@ -0,0 +1,168 @@
+"""
+Sources the loaders can read besides plain file paths: members of a zip archive and
+in-memory buffers.
+
+Both look enough like a pathlib.Path for the rest of the tool (name, stem, suffix) and
+are read into memory rather than extracted, so a month-end package can be processed
+straight from its archive. ArchiveMember only holds the archive path and member name,
+so it can be handed to worker processes.
+
+The helpers below (stat, identity, open_binary, openable) accept paths and sources
+alike, and are what the cache, discovery and readers use to handle either.
+"""
+import hashlib
+import io
+import os
+import pathlib
+import posixpath
+import zipfile
+from typing import NamedTuple, Union
+
+ARCHIVE_SUFFIXES = (".zip",)
+
+
+class Stat(NamedTuple):
+    """The parts of os.stat_result the tool relies on."""
+    st_size: int
+    st_mtime_ns: int
+
+
+class ArchiveMember:
+    """
+    A file inside a zip archive. Its modification time is the archive's, so replacing the
+    archive marks every member as possibly changed (the cache then compares contents).
+    """
+
+    def __init__(self, archive, member: str):
+        self.archive = pathlib.Path(archive)
+        self.member = member
+
+    @property
+    def name(self) -> str:
+        return posixpath.basename(self.member)
+
+    @property
+    def stem(self) -> str:
+        return pathlib.PurePosixPath(self.name).stem
+
+    @property
+    def suffix(self) -> str:
+        return pathlib.PurePosixPath(self.name).suffix
+
+    @property
+    def identity(self) -> str:
+        return f"{os.path.abspath(self.archive)}!{self.member}"
+
+    def read_bytes(self) -> bytes:
+        with zipfile.ZipFile(self.archive) as zf:
+            return zf.read(self.member)
+
+    def stat(self) -> Stat:
+        with zipfile.ZipFile(self.archive) as zf:
+            size = zf.getinfo(self.member).file_size
+        return Stat(size, os.stat(self.archive).st_mtime_ns)
+
+    def __eq__(self, other):
+        return isinstance(other, ArchiveMember) and (self.archive, self.member) == (other.archive, other.member)
+
+    def __lt__(self, other):
+        return str(self) < str(other)
+
+    def __hash__(self):
+        return hash((self.archive, self.member))
+
+    def __str__(self):
+        return f"{self.archive}!{self.member}"
+
+    def __repr__(self):
+        return f"ArchiveMember({str(self.archive)!r}, {self.member!r})"
+
+
+class BufferSource:
+    """File contents already in memory, with the file name used for matching and dating."""
+
+    def __init__(self, data: bytes, name: str = ""):
+        self.data = bytes(data)
+        self.name = name or f"buffer{sniff_suffix(self.data)}"
+
+    @property
+    def stem(self) -> str:
+        return pathlib.PurePath(self.name).stem
+
+    @property
+    def suffix(self) -> str:
+        return pathlib.PurePath(self.name).suffix or sniff_suffix(self.data)
+
+    @property
+    def identity(self) -> str:
+        # Buffers have no location, so they are known by their contents
+        return f"buffer!{hashlib.blake2b(self.data, digest_size=16).hexdigest()}!{self.name}"
+
+    def read_bytes(self) -> bytes:
+        return self.data
+
+    def stat(self) -> Stat:
+        return Stat(len(self.data), 0)
+
+    def __str__(self):
+        return self.name
+
+    def __repr__(self):
+        return f"BufferSource(<{len(self.data)} bytes>, {self.name!r})"
+
+
+Source = Union[pathlib.Path, ArchiveMember, BufferSource]
+
+
+def sniff_suffix(data: bytes) -> str:
+    """Guesses a file type from its first bytes: a zip means .xlsx, an OLE file .xls, otherwise CSV."""
+    if data[:4] == b"PK\x03\x04":
+        return ".xlsx"
+    if data[:8] == b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1":
+        return ".xls"
+    return ".csv"
+
+
+def as_source(obj) -> Source:
+    """Turns what a caller passed as a file into a source: bytes and file objects become buffers."""
+    if isinstance(obj, (ArchiveMember, BufferSource, pathlib.PurePath)):
+        return obj
+    if isinstance(obj, (bytes, bytearray, memoryview)):
+        return BufferSource(obj)
+    if hasattr(obj, "read"):
+        return BufferSource(obj.read(), os.path.basename(getattr(obj, "name", "") or ""))
+    return pathlib.Path(obj)
+
+
+def is_file(source) -> bool:
+    return not isinstance(source, (ArchiveMember, BufferSource))
+
+
+def stat(source):
+    """os.stat for paths, the equivalent Stat for sources."""
+    return os.stat(source) if is_file(source) else source.stat()
+
+
+def identity(source) -> str:
+    """A string that tells sources apart, e.g. for cache keys: the absolute path for files."""
+    return os.path.abspath(source) if is_file(source) else source.identity
+
+
+def open_binary(source):
+    """Opens a source for reading bytes."""
+    return open(source, "rb") if is_file(source) else io.BytesIO(source.read_bytes())
+
+
+def openable(source):
+    """What to hand a reader library: the path of a file, or an in-memory buffer of anything else."""
+    return str(source) if is_file(source) else io.BytesIO(source.read_bytes())
+
+
+def is_archive(path) -> bool:
+    return str(path).lower().endswith(ARCHIVE_SUFFIXES) and os.path.isfile(path)
+
+
+def archive_members(archive) -> list:
+    """The member names of a zip archive, without directories."""
+    with zipfile.ZipFile(archive) as zf:
+        return [info.filename for info in zf.infolist() if not info.is_dir()]
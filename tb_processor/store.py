@@ -0,0 +1,162 @@
+"""
+Local SQLite store of combined trial balances.
+
+Sheets are kept in long format, one row per (entity, statement, account, period),
+so a few accounts over a date range can be looked up through the indexes without
+opening the output workbook.
+
+    with TrialBalanceStore("tb_store.sqlite") as store:
+        store.query(accounts=["Cash"], start="2023-01", end="2023-12")
+"""
+import datetime
+import itertools
+import pathlib
+import sqlite3
+from typing import Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+from . import compact
+
+SCHEMA_VERSION = 1
+
+# Short names accepted by tb query --statement
+STATEMENTS = {"bs": "Balance Sheet", "is": "Income Statement"}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS balances (
+    entity TEXT NOT NULL,
+    statement TEXT NOT NULL,
+    account TEXT NOT NULL,
+    occurrence INTEGER NOT NULL,
+    period TEXT NOT NULL,
+    amount REAL NOT NULL,
+    PRIMARY KEY (entity, statement, account, occurrence, period)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS balances_account_period ON balances (account, period);
+CREATE INDEX IF NOT EXISTS balances_period ON balances (period);
+"""
+
+COLUMNS = ["entity", "statement", "account", "occurrence", "period", "amount"]
+
+
+def parse_period(value) -> Optional[datetime.date]:
+    """Accepts a date, "YYYY-MM" or "YYYY-MM-DD" and returns a date (None stays None)."""
+    if value is None or isinstance(value, datetime.date):
+        return value
+    value = str(value).strip()
+    try:
+        if len(value) == 7:
+            return datetime.datetime.strptime(value, "%Y-%m").date()
+        return datetime.date.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"Invalid period '{value}', expected YYYY-MM or YYYY-MM-DD") from None
+
+
+def long_rows(entity: str, statement: str, df: pd.DataFrame) -> Iterable[tuple]:
+    """
+    Turns a combined sheet into (entity, statement, account, occurrence, period, amount) rows.
+    A label used more than once in the sheet is told apart by its occurrence number.
+    """
+    df = compact.expand(df)
+    accounts = df.iloc[:, 0].astype(str)
+    occurrence = accounts.groupby(accounts).cumcount().to_numpy()
+    periods = [col for col in df.columns[1:] if isinstance(col, datetime.date)]
+    values = df[periods].to_numpy(dtype="float64")
+
+    n = len(periods)
+    return zip(
+        itertools.repeat(entity),
+        itertools.repeat(statement),
+        np.repeat(accounts.to_numpy(), n).tolist(),
+        np.repeat(occurrence, n).tolist(),
+        [p.isoformat() for p in periods] * len(df),
+        values.ravel().tolist(),
+    )
+
+
+class TrialBalanceStore:
+    """An SQLite file holding combined sheets for any number of entities."""
+
+    def __init__(self, path):
+        self.path = pathlib.Path(path)
+        if self.path.parent and not self.path.parent.exists():
+            self.path.parent.mkdir(parents=True)
+        self.conn = sqlite3.connect(str(self.path))
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+
+        version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        if version not in (0, SCHEMA_VERSION):
+            raise ValueError(f"{self.path} uses store schema {version}, expected {SCHEMA_VERSION}")
+        with self.conn:
+            self.conn.executescript(SCHEMA)
+            self.conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def save(self, entity: str, statement: str, df: pd.DataFrame) -> int:
+        """Replaces the stored rows of one sheet in a single transaction. Returns the rows written."""
+        with self.conn:
+            self.conn.execute("DELETE FROM balances WHERE entity = ? AND statement = ?", (entity, statement))
+            cursor = self.conn.executemany(
+                "INSERT INTO balances (entity, statement, account, occurrence, period, amount) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                long_rows(entity, statement, df))
+        return cursor.rowcount
+
+    def query(self, accounts: Iterable[str] = None, start=None, end=None,
+              entity: str = None, statement: str = None) -> pd.DataFrame:
+        """
+        Returns the stored amounts in long format, filtered by account names, an inclusive
+        period range ("YYYY-MM" strings or dates), entity and statement. Periods come back as dates.
+        """
+        where, params = [], []
+        accounts = list(accounts or [])
+        if accounts:
+            where.append(f"account IN ({', '.join('?' * len(accounts))})")
+            params.extend(accounts)
+        start, end = parse_period(start), parse_period(end)
+        if start is not None:
+            where.append("period >= ?")
+            params.append(start.isoformat())
+        if end is not None:
+            where.append("period <= ?")
+            params.append(end.isoformat())
+        if entity is not None:
+            where.append("entity = ?")
+            params.append(entity)
+        if statement is not None:
+            where.append("statement = ?")
+            params.append(STATEMENTS.get(statement, statement))
+
+        sql = f"SELECT {', '.join(COLUMNS)} FROM balances"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY entity, statement, account, occurrence, period"
+
+        df = pd.DataFrame(self.conn.execute(sql, params).fetchall(), columns=COLUMNS)
+        df["period"] = [datetime.date.fromisoformat(p) for p in df["period"]]
+        return df
+
+    def entities(self) -> list:
+        """Entities with data in the store."""
+        return [row[0] for row in self.conn.execute("SELECT DISTINCT entity FROM balances ORDER BY entity")]
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def pivot(long: pd.DataFrame) -> pd.DataFrame:
+    """Turns query results back into one row per account with a column per period."""
+    if long.empty:
+        return pd.DataFrame()
+    wide = long.pivot_table(index=["entity", "statement", "account", "occurrence"], columns="period",
+                            values="amount", aggfunc="sum", fill_value=0)
+    wide.columns = list(wide.columns)
+    return wide.reset_index().drop(columns="occurrence")
@@ -0,0 +1,149 @@
+"""
+Watch mode: polls INPUT_DIR and rebuilds the output whenever source files change.
+
+Parsed frames stay in memory between rebuilds, so only files that were added or
+modified are loaded again. A burst of saves is debounced into a single rebuild.
+"""
+import datetime
+import pathlib
+import time
+from typing import Dict, List, Tuple
+
+import pandas as pd
+
+from . import combiner
+from . import config
+from . import file_utils
+from . import loader
+from . import shards
+from . import sources
+from . import writers
+
+# (sheet, pattern, loader function name)
+SHEETS = (("Balance Sheet", "BS_PATTERN", "load_bs"), ("Income Statement", "IS_PATTERN", "load_is"))
+
+Signature = Tuple[int, int]
+
+
+def scan() -> Dict[str, Dict[pathlib.Path, Signature]]:
+    """Lists each sheet's files in date order with their (size, mtime_ns)."""
+    snapshot = {}
+    for sheet, pattern, _ in SHEETS:
+        files = {}
+        for f in file_utils.find_monthly_files(getattr(config, pattern)):
+            try:
+                st = sources.stat(f)
+            except (OSError, KeyError):
+                # Deleted between listing and stat
+                continue
+            files[f] = (st.st_size, st.st_mtime_ns)
+        snapshot[sheet] = files
+    return snapshot
+
+
+class Watcher:
+    """
+    Keeps the parsed frame of every source file and the combined sheets in memory.
+    rebuild() brings them up to date with a scan, loading only added or modified files.
+    """
+
+    def __init__(self, fmt: str, verbose: bool = False, jobs: int = 1, cache=None,
+                 compact: bool = False, trial_balances=None, entity: str = None):
+        self.format = fmt
+        self.verbose = verbose
+        self.jobs = jobs
+        self.cache = cache
+        self.compact = compact
+        self.trial_balances = trial_balances
+        self.entity = entity or config.ENTITY
+        self.files: Dict[str, Dict[pathlib.Path, Signature]] = {}
+        self.frames: Dict[Tuple[str, pathlib.Path], pd.DataFrame] = {}
+        self.combined: Dict[str, pd.DataFrame] = {}
+        # Sheets rebuilt but not written yet, e.g. because the output was locked
+        self.unwritten: List[str] = []
+
+    def rebuild(self, snapshot: Dict[str, Dict[pathlib.Path, Signature]]) -> List[str]:
+        """Reloads changed files, recombines the affected sheets and returns their names."""
+        changed = []
+        for sheet, _, load_name in SHEETS:
+            old = self.files.get(sheet, {})
+            new = snapshot.get(sheet, {})
+            if list(old.items()) == list(new.items()):
+                continue
+
+            modified = [f for f, sig in new.items() if old.get(f) != sig]
+            deleted = [f for f in old if f not in new]
+            added = sum(1 for f in modified if f not in old)
+            print(f"{sheet}: {added} added, {len(modified) - added} modified, {len(deleted)} deleted")
+
+            dfs = combiner.load_files(modified, getattr(loader, load_name), self.verbose, self.jobs, self.cache)
+            for f, df in zip(modified, dfs):
+                self.frames[(sheet, f)] = df
+            for f in deleted:
+                del self.frames[(sheet, f)]
+
+            self.files[sheet] = dict(new)
+            if new:
+                self.combined[sheet] = combiner.combine_monthly([self.frames[(sheet, f)] for f in new], self.compact)
+            else:
+                self.combined.pop(sheet, None)
+            changed.append(sheet)
+        return changed
+
+    def write(self, changed: List[str]):
+        """Writes the output. Formats with one file per sheet only rewrite the changed sheets."""
+        per_sheet = writers.WRITERS[self.format].per_sheet
+        sheets = {sheet: df for sheet, df in self.combined.items()
+                  if not df.empty and (sheet in changed or not per_sheet)}
+        if not sheets:
+            print("No data extracted, output not written.")
+            return
+
+        file_utils.ensure_output_dir()
+        with writers.BackgroundWriter(shards.open_output(self.format, config.OUTPUT_FILE)) as writer:
+            for sheet, df in sheets.items():
+                writer.write(sheet, df)
+                if self.trial_balances is not None and sheet in changed:
+                    self.trial_balances.save(self.entity, sheet, df)
+
+        stamp = datetime.datetime.now().strftime("%H:%M:%S")
+        print(f"[{stamp}] {', '.join(sheets)} written to {', '.join(str(p) for p in writer.paths)}")
+
+    def update(self, snapshot) -> bool:
+        """Rebuilds and writes for a scan. Returns True when anything changed."""
+        changed = self.rebuild(snapshot)
+        self.unwritten.extend(sheet for sheet in changed if sheet not in self.unwritten)
+        if self.unwritten:
+            self.write(self.unwritten)
+            self.unwritten = []
+        return bool(changed)
+
+    def run(self, interval: float = 2.0, debounce: float = 1.0):
+        """
+        Polls every interval seconds until interrupted. A change is acted on once the
+        files have stayed the same for debounce seconds, so a burst of saves (or a file
+        still being copied) triggers one rebuild.
+        """
+        self.update(scan())
+        print(f"Watching {config.INPUT_DIR} (Ctrl+C to stop)...")
+
+        last = None
+        stable_since = None
+        while True:
+            time.sleep(interval)
+            snapshot = scan()
+            if snapshot == {sheet: self.files.get(sheet, {}) for sheet, _, _ in SHEETS} and not self.unwritten:
+                last = stable_since = None
+                continue
+            if snapshot != last:
+                last, stable_since = snapshot, time.monotonic()
+                continue
+            if time.monotonic() - stable_since < debounce:
+                continue
+
+            try:
+                self.update(snapshot)
+            except Exception as e:
+                # Keep watching, e.g. when the output is open in Excel
+                print(f"[ERROR] Rebuild failed: {e}")
+            last = stable_since = None
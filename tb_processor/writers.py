@@ -0,0 +1,284 @@
+"""
+Output writers for combined trial balance sheets.
+
+Every file is written under a temporary name next to its destination and renamed into
+place once complete, so a reader never opens a half-written output.
+"""
+import concurrent.futures
+import datetime
+import os
+import pathlib
+import re
+import threading
+from typing import Dict, List, Type
+
+import pandas as pd
+
+from . import compact
+from . import profiling
+
+
+def sheet_slug(sheet: str) -> str:
+    """Turns a sheet name into a file-name friendly slug ("Balance Sheet" -> "balance_sheet")."""
+    return re.sub(r"[^A-Za-z0-9]+", "_", sheet).strip("_").lower()
+
+
+# Header cells look like the ones pd.DataFrame.to_excel writes: bold, thin borders,
+# centred, and month columns formatted as dates
+HEADER_STYLE = {"bold": True, "border": 1, "align": "center", "valign": "top"}
+HEADER_DATE_FORMAT = "YYYY-MM-DD"
+
+
+def temp_path(path) -> pathlib.Path:
+    """A hidden sibling of path, unique to this thread, to write before renaming into place."""
+    path = pathlib.Path(path)
+    return path.with_name(f".{path.stem}-{os.getpid()}-{threading.get_ident()}.tmp{path.suffix}")
+
+
+def discard(path):
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
+
+
+def columnar_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Columnar formats need string column names, so dates become ISO strings."""
+    out = df.copy(deep=False)
+    out.columns = [col.isoformat() if isinstance(col, datetime.date) else str(col) for col in df.columns]
+    return out
+
+
+class SheetWriter:
+    """
+    Base class for output writers.
+    Writers that put every sheet in its own file set per_sheet, so a sheet can be
+    rewritten without touching the others. Leaving the with block on an exception
+    discards the output instead of renaming a partial file into place.
+    """
+    extension = ""
+    per_sheet = True
+
+    def __init__(self, output):
+        self.output = pathlib.Path(output)
+        self.paths: List[pathlib.Path] = []
+
+    def sheet_path(self, sheet: str) -> pathlib.Path:
+        """Where a sheet is written, e.g. tb_full_balance_sheet.parquet for tb_full.xlsx."""
+        return self.output.with_name(f"{self.output.stem}_{sheet_slug(sheet)}{self.extension}")
+
+    def write(self, sheet: str, df: pd.DataFrame):
+        """Writes one sheet, recorded as a "write" stage when profiling. Compact frames are expanded first."""
+        df = compact.expand(df)
+        with profiling.stage("write", sheet=sheet, format=self.extension.lstrip("."),
+                             rows=len(df), cols=len(df.columns)):
+            self.write_sheet(sheet, df)
+
+    def write_sheet(self, sheet: str, df: pd.DataFrame):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def discard(self):
+        """Abandons the output after a failed write, leaving the previous files in place."""
+        self.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+
+
+class XlsxWriter(SheetWriter):
+    """
+    Writes all sheets into one workbook, row by row.
+    Uses xlsxwriter in constant-memory mode when installed, otherwise an openpyxl write-only workbook.
+    """
+    extension = ".xlsx"
+    per_sheet = False
+
+    def __init__(self, output):
+        super().__init__(output)
+        self.paths = [self.output]
+        self.temp = temp_path(self.output)
+        try:
+            import xlsxwriter
+        except ImportError:
+            import openpyxl
+            self._book = openpyxl.Workbook(write_only=True)
+            self._xlsxwriter = False
+        else:
+            self._book = xlsxwriter.Workbook(str(self.temp), {
+                "constant_memory": True,
+                "nan_inf_to_errors": True,
+            })
+            self._header_format = self._book.add_format(HEADER_STYLE)
+            self._date_format = self._book.add_format({**HEADER_STYLE, "num_format": HEADER_DATE_FORMAT})
+            self._xlsxwriter = True
+
+    def write_sheet(self, sheet: str, df: pd.DataFrame):
+        header = [datetime.datetime(col.year, col.month, col.day) if isinstance(col, datetime.date) else col
+                  for col in df.columns]
+        rows = df.itertuples(index=False, name=None)
+
+        if not self._xlsxwriter:
+            ws = self._book.create_sheet(sheet)
+            ws.append([self._openpyxl_header(ws, val) for val in header])
+            for row in rows:
+                ws.append(row)
+            return
+
+        ws = self._book.add_worksheet(sheet)
+        for c, val in enumerate(header):
+            if isinstance(val, datetime.datetime):
+                ws.write_datetime(0, c, val, self._date_format)
+            else:
+                ws.write(0, c, val, self._header_format)
+        for r, row in enumerate(rows, start=1):
+            ws.write_row(r, 0, row)
+
+    @staticmethod
+    def _openpyxl_header(ws, val):
+        from openpyxl.cell import WriteOnlyCell
+        from openpyxl.styles import Alignment, Border, Font, Side
+
+        cell = WriteOnlyCell(ws, value=val)
+        side = Side(style="thin")
+        cell.font = Font(bold=True)
+        cell.border = Border(left=side, right=side, top=side, bottom=side)
+        cell.alignment = Alignment(horizontal="center", vertical="top")
+        if isinstance(val, datetime.datetime):
+            cell.number_format = HEADER_DATE_FORMAT
+        return cell
+
+    def _save(self):
+        if self._xlsxwriter:
+            self._book.close()
+        else:
+            self._book.save(self.temp)
+
+    def close(self):
+        with profiling.stage("write.close", format="xlsx"):
+            try:
+                self._save()
+                os.replace(self.temp, self.output)
+            finally:
+                discard(self.temp)
+
+    def discard(self):
+        try:
+            self._save()
+        finally:
+            discard(self.temp)
+
+
+class ColumnarWriter(SheetWriter):
+    """Base class for the formats with one file per sheet; each file is renamed into place when written."""
+
+    def write_sheet(self, sheet: str, df: pd.DataFrame):
+        path = self.sheet_path(sheet)
+        temp = temp_path(path)
+        try:
+            self.write_file(temp, columnar_frame(df))
+            os.replace(temp, path)
+        finally:
+            discard(temp)
+        self.paths.append(path)
+
+    def write_file(self, path: pathlib.Path, df: pd.DataFrame):
+        raise NotImplementedError
+
+
+class ParquetWriter(ColumnarWriter):
+    """One Parquet file per sheet (requires pyarrow)."""
+    extension = ".parquet"
+
+    def write_file(self, path: pathlib.Path, df: pd.DataFrame):
+        df.to_parquet(path, index=False)
+
+
+class CsvWriter(ColumnarWriter):
+    """One CSV file per sheet."""
+    extension = ".csv"
+
+    def write_file(self, path: pathlib.Path, df: pd.DataFrame):
+        df.to_csv(path, index=False)
+
+
+class ArrowWriter(ColumnarWriter):
+    """One Arrow IPC (Feather v2) file per sheet (requires pyarrow)."""
+    extension = ".arrow"
+
+    def write_file(self, path: pathlib.Path, df: pd.DataFrame):
+        df.to_feather(path)
+
+
+WRITERS: Dict[str, Type[SheetWriter]] = {
+    "xlsx": XlsxWriter,
+    "parquet": ParquetWriter,
+    "csv": CsvWriter,
+    "arrow": ArrowWriter,
+}
+
+
+def open_writer(fmt: str, output) -> SheetWriter:
+    """Creates the writer for fmt."""
+    if fmt not in WRITERS:
+        raise ValueError(f"Unknown output format '{fmt}', expected one of: {', '.join(WRITERS)}")
+    return WRITERS[fmt](output)
+
+
+class BackgroundWriter:
+    """
+    Runs a writer on a worker thread so the next sheet can be computed while
+    the previous one is being written. Sheets are written in submission order.
+    """
+
+    def __init__(self, writer: SheetWriter):
+        self.writer = writer
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        self._futures = []
+
+    @property
+    def paths(self) -> List[pathlib.Path]:
+        return self.writer.paths
+
+    def write(self, sheet: str, df: pd.DataFrame):
+        self._futures.append(self._executor.submit(self.writer.write, sheet, df))
+
+    def close(self):
+        """
+        Waits for pending writes, then closes the writer. Re-raises the first write error,
+        in which case the output is discarded.
+        """
+        failed = True
+        try:
+            for future in self._futures:
+                future.result()
+            failed = False
+        finally:
+            self._executor.shutdown()
+            if failed:
+                self.writer.discard()
+            else:
+                self.writer.close()
+
+    def discard(self):
+        for future in self._futures:
+            future.cancel()
+        self._executor.shutdown()
+        self.writer.discard()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
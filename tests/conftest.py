@@ -0,0 +1,41 @@
+import openpyxl
+import pytest
+
+
+def write_workbook(path, rows, sheet_name="Sheet1", extra_sheets=()):
+    """Writes rows to an .xlsx file laid out like a QuickBooks by-month export."""
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = extra_sheets[0] if extra_sheets else sheet_name
+    for name in list(extra_sheets[1:]) + ([sheet_name] if extra_sheets else []):
+        wb.create_sheet(name)
+    ws = wb[sheet_name]
+    for row in rows:
+        ws.append(list(row))
+    wb.save(path)
+    return path
+
+
+QB_ROWS = [
+    ["Example Company"],
+    ["Balance Sheet"],
+    ["As of March 31, 2023"],
+    [],
+    [None, "January 2023", "February 2023", "March 2023"],
+    ["Assets"],
+    ["Cash", 1000, 1100.5, 1200],
+    ["Accounts Receivable", 500, None, 700],
+    ["Total Assets", 1500, 1100.5, 1900],
+]
+
+
+@pytest.fixture
+def qb_rows():
+    return [list(r) for r in QB_ROWS]
+
+
+def qb_rows_for_year(year, extra_rows=()):
+    """QB_ROWS with month headers for the given year."""
+    rows = [list(r) for r in QB_ROWS]
+    rows[4] = [None] + [f"{month} {year}" for month in ("January", "February", "March")]
+    return rows + [list(r) for r in extra_rows]
@@ -0,0 +1,49 @@
+import json
+
+import pandas as pd
+import pytest
+
+from tb_processor import batch
+from tb_processor import store
+from tests.conftest import write_workbook, qb_rows_for_year
+
+
+def make_entity(directory, years, scale=1):
+    directory.mkdir()
+    for year in years:
+        rows = qb_rows_for_year(year)
+        rows = [[v * scale if isinstance(v, (int, float)) else v for v in row] for row in rows]
+        write_workbook(directory / f"Balance Sheet by Month-{year}.xlsx", rows)
+
+
+def test_batch_writes_each_entity_and_consolidates(tmp_path):
+    """Every entity gets its own output and the consolidated output sums them."""
+    make_entity(tmp_path / "acme", [2022, 2023])
+    make_entity(tmp_path / "globex", [2023], scale=10)
+    manifest = tmp_path / "batch.json"
+    manifest.write_text(json.dumps({
+        "format": "csv",
+        "entities": [{"name": "acme", "input_dir": "acme", "output": "out/acme.xlsx"},
+                     {"name": "globex", "input_dir": "globex", "output": "out/globex.xlsx"}],
+        "consolidated": "out/group.xlsx",
+    }))
+
+    entities, consolidated = batch.load_manifest(manifest)
+    with store.TrialBalanceStore(tmp_path / "tb.sqlite") as trial_balances:
+        written = batch.run(entities, consolidated, jobs=2, trial_balances=trial_balances)
+        assert trial_balances.entities() == ["acme", "consolidated", "globex"]
+
+    assert set(written) == {"acme", "globex", "consolidated"}
+    acme = pd.read_csv(tmp_path / "out" / "acme_balance_sheet.csv")
+    group = pd.read_csv(tmp_path / "out" / "group_balance_sheet.csv")
+    assert list(acme.columns[1:]) == [f"{y}-0{m}-01" for y in (2022, 2023) for m in (1, 2, 3)]
+    assert list(group["2022-01-01"]) == list(acme["2022-01-01"])
+    assert list(group["2023-03-01"]) == [x * 11 for x in acme["2023-03-01"]]
+
+
+def test_load_manifest_rejects_duplicate_entities(tmp_path):
+    manifest = tmp_path / "batch.json"
+    manifest.write_text(json.dumps({"entities": [{"name": "a", "input_dir": "x"}, {"name": "a", "input_dir": "y"}]}))
+
+    with pytest.raises(ValueError, match="more than once"):
+        batch.load_manifest(manifest)
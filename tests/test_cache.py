@@ -0,0 +1,71 @@
+import datetime
+import os
+
+import pandas as pd
+
+from tb_processor import cache
+
+
+def _frame():
+    return pd.DataFrame({
+        "Account": ["Cash", "AR"],
+        datetime.date(2023, 1, 1): [1.0, 2.0],
+        datetime.date(2023, 2, 1): [3.0, 4.0],
+    })
+
+
+def test_write_frame_round_trip_keeps_date_columns(tmp_path):
+    """Date column labels survive the columnar round trip."""
+    df = _frame()
+
+    written = cache.write_frame(tmp_path / "frame", df)
+
+    pd.testing.assert_frame_equal(cache.read_frame(written), df)
+
+
+def test_write_frame_falls_back_for_mixed_columns(tmp_path):
+    """Columns mixing text and numbers are still stored."""
+    df = _frame()
+    df[datetime.date(2023, 1, 1)] = pd.Series(["(12)", 2.0], dtype=object)
+
+    written = cache.write_frame(tmp_path / "frame", df)
+
+    pd.testing.assert_frame_equal(cache.read_frame(written), df)
+
+
+def test_cache_hits_until_contents_change(tmp_path):
+    """A touched but identical file still hits, a changed file misses."""
+    source = tmp_path / "Balance Sheet by Month-2023.xlsx"
+    source.write_bytes(b"version one")
+    store = cache.ParsedFileCache(tmp_path / "cache")
+    store.put("load_bs", source, _frame())
+    store.flush()
+
+    reopened = cache.ParsedFileCache(tmp_path / "cache")
+    assert reopened.get("load_bs", source) is not None
+    assert reopened.get("load_is", source) is None
+
+    os.utime(source, ns=(0, 0))
+    assert reopened.get("load_bs", source) is not None
+
+    source.write_bytes(b"version two")
+    assert reopened.get("load_bs", source) is None
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    """Once over the size cap the oldest entry is dropped first."""
+    store = cache.ParsedFileCache(tmp_path / "cache")
+    sources = []
+    for name in ("a", "b", "c"):
+        source = tmp_path / f"{name}.xlsx"
+        source.write_bytes(name.encode())
+        sources.append(source)
+        store.put("load_bs", source, _frame())
+    store.get("load_bs", sources[0])
+
+    store.max_bytes = store.stats()["bytes"] - 1
+    store.put("load_bs", sources[2], _frame())
+
+    assert store.get("load_bs", sources[0]) is not None
+    assert store.get("load_bs", sources[1]) is None
+    assert store.stats()["entries"] == 2
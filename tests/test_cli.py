@@ -0,0 +1,53 @@
+import pandas as pd
+import pytest
+from click.testing import CliRunner
+
+from tb_processor import cli, config, incremental, loader
+from tests.conftest import qb_rows_for_year, write_workbook
+
+
+@pytest.fixture
+def output(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "INPUT_DIR", str(tmp_path))
+    monkeypatch.setattr(config, "OUTPUT_FILE", str(tmp_path / "out" / "tb_full.xlsx"))
+    write_workbook(tmp_path / "Balance Sheet by Month-2023.xlsx", qb_rows_for_year(2023))
+    write_workbook(tmp_path / "Profit and Loss by Month-2023.xlsx", qb_rows_for_year(2023))
+    return tmp_path / "out" / "tb_full.xlsx"
+
+
+def run(*args):
+    result = CliRunner().invoke(cli.main, list(args) + ["--no-cache"])
+    assert result.exit_code == 0, result.output
+    return result.output
+
+
+@pytest.mark.parametrize("first", [["is"], ["is", "--incremental"]])
+def test_incremental_bs_keeps_income_statement(output, first):
+    """tb bs --incremental replaces only the Balance Sheet, also when it has nothing to do."""
+    run(*first)
+    run("bs", "--incremental")
+    assert list(pd.read_excel(output, sheet_name=None)) == ["Balance Sheet", "Income Statement"]
+
+    assert "up to date" in run("bs", "--incremental")
+    assert list(pd.read_excel(output, sheet_name=None)) == ["Balance Sheet", "Income Statement"]
+
+
+def test_incremental_run_keeps_sheets_saved_after_it_started(output, tmp_path):
+    """A run that read the manifest before another run saved doesn't write the older sheet back."""
+    run("all", "--incremental")
+    files = [tmp_path / "Profit and Loss by Month-2023.xlsx"]
+    manifest = incremental.RunManifest(output)
+    is_df, changed = incremental.build_sheet(manifest, "Income Statement", files, loader.load_is)
+
+    # Another run updates the Balance Sheet meanwhile
+    write_workbook(tmp_path / "Balance Sheet by Month-2023.xlsx",
+                   qb_rows_for_year(2023, [["Inventory", 5, 6, 7]]))
+    run("bs", "--incremental")
+
+    cli.write_incremental([("Income Statement", is_df, incremental.fingerprint(files), True)], "xlsx",
+                          "Income Statement")
+
+    written = pd.read_excel(output, sheet_name=None)
+    assert "Inventory" in list(written["Balance Sheet"].iloc[:, 0])
+    bs_files = [tmp_path / "Balance Sheet by Month-2023.xlsx"]
+    assert incremental.RunManifest(output).is_current("Balance Sheet", incremental.fingerprint(bs_files))
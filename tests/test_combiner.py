@@ -0,0 +1,95 @@
+import datetime
+
+import pandas as pd
+
+from tb_processor import combiner
+
+JAN = datetime.date(2023, 1, 1)
+FEB = datetime.date(2023, 2, 1)
+MAR = datetime.date(2023, 3, 1)
+
+
+def test_combine_monthly_aligns_accounts():
+    """Accounts from every file are kept and missing months are filled with 0."""
+    df1 = pd.DataFrame({"Account": ["Cash", "AR"], JAN: [100.0, 200.0]})
+    df2 = pd.DataFrame({"Account": ["Cash", "AP"], FEB: [150.0, -50.0], MAR: [160.0, -60.0]})
+
+    result = combiner.combine_monthly([df1, df2])
+
+    expected = pd.DataFrame({
+        "Account": ["AP", "AR", "Cash"],
+        JAN: [0.0, 200.0, 100.0],
+        FEB: [-50.0, 0.0, 150.0],
+        MAR: [-60.0, 0.0, 160.0],
+    })
+    pd.testing.assert_frame_equal(result, expected)
+
+
+def test_combine_monthly_latest_file_wins_on_overlap():
+    """A month present in two files is taken from the later file, without _x/_y columns."""
+    df1 = pd.DataFrame({"Account": ["Cash", "AR"], JAN: [100.0, 200.0], FEB: [1.0, 2.0]})
+    df2 = pd.DataFrame({"Account": ["Cash"], FEB: [999.0]})
+
+    result = combiner.combine_monthly([df1, df2])
+
+    assert list(result.columns) == ["Account", JAN, FEB]
+    assert list(result[FEB]) == [0.0, 999.0]
+
+
+def test_combine_monthly_repeated_labels_align_by_occurrence():
+    """A label used twice in a file keeps two rows instead of multiplying rows."""
+    df1 = pd.DataFrame({"Account": ["Other", "Cash", "Other"], JAN: [1.0, 2.0, 3.0]})
+    df2 = pd.DataFrame({"Account": ["Other", "Cash", "Other"], FEB: [4.0, 5.0, 6.0]})
+
+    result = combiner.combine_monthly([df1, df2])
+
+    assert list(result["Account"]) == ["Cash", "Other", "Other"]
+    assert list(result[FEB]) == [5.0, 4.0, 6.0]
+
+
+def test_load_files_parallel_keeps_order_and_survives_bad_file(tmp_path, qb_rows, capsys):
+    """Parallel loading returns frames in input order and reports a broken file."""
+    from tb_processor import loader
+    from tests.conftest import write_workbook
+    files = []
+    for year in (2021, 2022, 2023):
+        rows = [list(r) for r in qb_rows]
+        rows[4] = [None] + [f"{m} {year}" for m in ("January", "February", "March")]
+        files.append(write_workbook(tmp_path / f"Balance Sheet by Month-{year}.xlsx", rows))
+    broken = tmp_path / "Balance Sheet by Month-2024.xlsx"
+    broken.write_bytes(b"not a workbook")
+    files.insert(1, broken)
+
+    dfs = combiner.load_files(files, loader.load_bs, jobs=2)
+
+    assert [df.columns[1].year if not df.empty else None for df in dfs] == [2021, None, 2022, 2023]
+    assert "Balance Sheet by Month-2024.xlsx" in capsys.readouterr().out
+
+
+def test_accumulator_matches_combine_monthly_in_any_order():
+    """Folding files out of order gives exactly the combine_monthly result."""
+    dfs = [
+        pd.DataFrame({"Account": ["Other", "Cash", "Other", None], JAN: [1.0, 2.0, 3.0, 9.0], FEB: [1, 2, 3, 4]}),
+        pd.DataFrame({"Account": ["Cash", "AP"], FEB: [150.0, -50.0], MAR: ["160", "x"]}),
+        pd.DataFrame({"Account": ["Cash", "AR"], MAR: [7, 8]}),
+    ]
+    accumulator = combiner.MonthlyAccumulator()
+    for rank in (2, 0, 1):
+        accumulator.add(rank, dfs[rank])
+
+    pd.testing.assert_frame_equal(accumulator.result(), combiner.combine_monthly(dfs))
+
+
+def test_pipeline_combine_matches_load_then_combine(tmp_path, qb_rows):
+    """The pipeline folds loaded files into the same sheets as loading everything first."""
+    from tb_processor import loader
+    from tests.conftest import write_workbook, qb_rows_for_year
+    files = [write_workbook(tmp_path / f"Balance Sheet by Month-{year}.xlsx",
+                            qb_rows_for_year(year, [["Accounts Payable", year, 2, 3]]))
+             for year in (2021, 2022, 2023)]
+
+    expected = combiner.combine_monthly(combiner.load_files(files, loader.load_bs))
+    for jobs in (1, 2):
+        bs, empty = combiner.pipeline_combine([[(loader.load_bs, f) for f in files], []], jobs=jobs, in_flight=1)
+        pd.testing.assert_frame_equal(bs, expected)
+        assert empty.empty
@@ -0,0 +1,51 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+
+from tb_processor import combiner
+from tb_processor import compact
+
+JAN = datetime.date(2023, 1, 1)
+FEB = datetime.date(2023, 2, 1)
+MAR = datetime.date(2023, 3, 1)
+
+
+def sample_frames():
+    df1 = pd.DataFrame({"Account": ["Other", "Cash", "Other", "AR"], JAN: [1.1, 2.2, 3.3, np.nan],
+                        FEB: [0.1, 0.2, 0.3, 0.4]})
+    df2 = pd.DataFrame({"Account": ["Cash", "Other", "AP", None], FEB: [150.25, -0.01, 7.0, 9.0],
+                        MAR: [160.0, 1.0, -60.5, 9.0]})
+    return [df1, df2]
+
+
+def test_compact_combine_exports_same_values():
+    """A compact combine expands to exactly the plain combine."""
+    plain = combiner.combine_monthly(sample_frames())
+    result = combiner.combine_monthly(sample_frames(), compact=True)
+
+    assert compact.is_compact(result)
+    assert isinstance(result["Account"].dtype, pd.CategoricalDtype)
+    assert all(result[col].dtype == "int64" for col in (JAN, FEB, MAR))
+    pd.testing.assert_frame_equal(compact.expand(result), plain)
+
+
+def test_compact_combine_folds_compact_snapshot():
+    """An earlier compact result can be combined with new files, as incremental runs do."""
+    df1, df2 = sample_frames()
+    snapshot = combiner.combine_monthly([df1], compact=True)
+
+    result = combiner.combine_monthly([snapshot, df2], compact=True)
+
+    pd.testing.assert_frame_equal(compact.expand(result), combiner.combine_monthly([df1, df2]))
+    pd.testing.assert_frame_equal(combiner.combine_monthly([snapshot, df2]), combiner.combine_monthly([df1, df2]))
+
+
+def test_sub_cent_amounts_fall_back_to_float():
+    """Amounts that don't fit in cents keep float64 so no value changes."""
+    dfs = [pd.DataFrame({"Account": ["Cash", "AR"], JAN: [0.125, 1.0]})]
+
+    result = combiner.combine_monthly(dfs, compact=True)
+
+    assert not compact.is_compact(result)
+    pd.testing.assert_frame_equal(result, combiner.combine_monthly(dfs))
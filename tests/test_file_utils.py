@@ -20,3 +20,35 @@ def test_find_monthly_files():
     # TODO: Create dummy files in tests/fixtures and test finding them
     # This would require setting up a test directory structure
     pass
+
+def test_find_monthly_files_lists_directory_once(tmp_path, monkeypatch):
+    """Both statements come from one listing, cached until the directory changes."""
+    from tb_processor import config
+    for name in ["Balance Sheet by Month-2023.xlsx", "Balance Sheet by Month-2022.xlsx",
+                 "Profit and Loss by Month-2022.xlsx", ".Balance Sheet by Month-2021.xlsx", "notes.txt"]:
+        (tmp_path / name).touch()
+    (tmp_path / "archive").mkdir()
+    (tmp_path / "archive" / "Balance Sheet by Month-2020.xlsx").touch()
+    monkeypatch.setattr(config, "INPUT_DIR", str(tmp_path))
+    monkeypatch.setattr(file_utils, "RACY_NS", 0)
+    file_utils.clear_listing_cache()
+    scans = []
+    scandir = file_utils.os.scandir
+    monkeypatch.setattr(file_utils.os, "scandir", lambda d: scans.append(d) or scandir(d))
+
+    bs = file_utils.find_monthly_files(config.BS_PATTERN)
+    is_ = file_utils.find_monthly_files(config.IS_PATTERN)
+
+    assert [f.name for f in bs] == ["Balance Sheet by Month-2022.xlsx", "Balance Sheet by Month-2023.xlsx"]
+    assert [f.name for f in is_] == ["Profit and Loss by Month-2022.xlsx"]
+    assert len(scans) == 1
+
+    recursive = file_utils.find_monthly_files(config.BS_PATTERN, recursive=True)
+    assert [f.name for f in recursive][0] == "Balance Sheet by Month-2020.xlsx"
+
+def test_duplicate_periods_and_month_names():
+    """Files parsing to the same period are reported; month names resolve like before."""
+    files = [Path("Balance Sheet-2023-01.xlsx"), Path("Balance Sheet Jan 2023.xlsx"), Path("Balance Sheet-2023-02.xlsx")]
+
+    assert file_utils.duplicate_periods(files) == {datetime.date(2023, 1, 1): files[:2]}
+    assert file_utils.extract_date(Path("TB Dec-Mar 2023")) == datetime.date(2023, 3, 1)
@@ -0,0 +1,50 @@
+import os
+
+import pandas as pd
+
+from tb_processor import combiner, incremental, loader
+from tests.conftest import qb_rows_for_year, write_workbook
+
+
+def _write(tmp_path, year, extra_rows=()):
+    return write_workbook(tmp_path / f"Balance Sheet by Month-{year}.xlsx", qb_rows_for_year(year, extra_rows))
+
+
+def test_build_sheet_reuses_snapshot_and_folds_new_files(tmp_path):
+    """Unchanged inputs reuse the snapshot, appended files are folded into it."""
+    output = tmp_path / "tb_full.xlsx"
+    files = [_write(tmp_path, 2021), _write(tmp_path, 2022)]
+
+    manifest = incremental.RunManifest(output)
+    df, changed = incremental.build_sheet(manifest, "Balance Sheet", files, loader.load_bs)
+    assert changed
+    output.write_bytes(b"workbook")
+    manifest.record("Balance Sheet", incremental.fingerprint(files), df)
+    manifest.save([output])
+
+    manifest = incremental.RunManifest(output)
+    again, changed = incremental.build_sheet(manifest, "Balance Sheet", files, loader.load_bs)
+    assert not changed
+    pd.testing.assert_frame_equal(again, df)
+
+    files.append(_write(tmp_path, 2023, [["Inventory", 5, 6, 7]]))
+    folded, changed = incremental.build_sheet(manifest, "Balance Sheet", files, loader.load_bs)
+    assert changed
+    full = combiner.combine_monthly([loader.load_bs(f) for f in files])
+    pd.testing.assert_frame_equal(folded, full)
+
+
+def test_manifest_ignored_when_output_changed(tmp_path):
+    """A manifest describing a different output file is not trusted."""
+    output = tmp_path / "tb_full.xlsx"
+    output.write_bytes(b"workbook")
+    files = [_write(tmp_path, 2021)]
+    manifest = incremental.RunManifest(output)
+    manifest.record("Balance Sheet", incremental.fingerprint(files), loader.load_bs(files[0]))
+    manifest.save([output])
+    assert incremental.RunManifest(output).valid
+
+    output.write_bytes(b"edited by hand")
+    os.utime(output, ns=(0, 0))
+
+    assert not incremental.RunManifest(output).valid
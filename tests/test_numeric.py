@@ -0,0 +1,34 @@
+import numpy as np
+import pandas as pd
+
+from tb_processor import numeric
+
+
+def test_coerce_block_reads_accounting_formats():
+    """Accounting text is parsed, blanks stay NaN and unreadable cells are flagged."""
+    block = pd.DataFrame({
+        "a": [1.5, "(1,234.56)", "$ 1,234", "1,234.50-"],
+        "b": ["—", None, "", "abc"],
+    })
+
+    values, unparseable = numeric.coerce_block(block)
+
+    np.testing.assert_array_equal(values[:, 0], [1.5, -1234.56, 1234.0, -1234.5])
+    assert values[0, 1] == 0.0 and np.isnan(values[1:, 1]).all()
+    assert unparseable.tolist() == [[False, False], [False, False], [False, False], [False, True]]
+
+
+def test_coerce_block_rejects_several_signs():
+    """Text marked negative more than once is unreadable rather than read as positive."""
+    values, unparseable = numeric.coerce_block([["-12-", "(-12)"], ["(12-)", "-12"]])
+
+    assert np.isnan(values[0]).all() and np.isnan(values[1, 0])
+    assert values[1, 1] == -12.0
+    assert unparseable.tolist() == [[True, True], [True, False]]
+
+
+def test_coerce_block_cents_rounds_to_int64():
+    values, _ = numeric.coerce_block([["0.1", 0.2], [None, "(0.005)"]], cents=True)
+
+    assert values.dtype == np.int64
+    assert values.tolist() == [[10, 20], [0, 0]]
@@ -0,0 +1,28 @@
+import json
+
+from tb_processor import profiling
+
+
+def test_stage_is_a_no_op_without_a_profiler():
+    """Instrumented code runs unchanged when profiling is off."""
+    with profiling.stage("combine") as info:
+        info["rows"] = 10
+
+    assert profiling.active() is None
+
+
+def test_session_records_stages_and_writes_report(tmp_path, capsys):
+    """Stages land in the summary table and the JSON report."""
+    report = tmp_path / "report.json"
+
+    with profiling.session(profile=True, report_json=str(report), command="all"):
+        for name in ("load", "load", "combine"):
+            with profiling.stage(name, file="x.xlsx") as info:
+                info["rows"], info["cols"] = 5, 3
+
+    data = json.loads(report.read_text())
+    assert data["command"] == "all"
+    assert [s["stage"] for s in data["stages"]] == ["load", "load", "combine"]
+    assert data["summary"][0] == {**data["summary"][0], "stage": "load", "count": 2, "rows": 10, "cols": 3}
+    assert "combine" in capsys.readouterr().out
+    assert profiling.active() is None
@@ -0,0 +1,74 @@
+import csv
+import datetime
+
+import pandas as pd
+import pytest
+
+from tb_processor import loader, readers
+from tests.conftest import write_workbook
+
+EXCEL_READERS = [name for name, reader in readers.READERS.items() if ".xlsx" in reader.suffixes]
+
+
+def report_rows(qb_rows):
+    """A report with a section break, a numeric account code and an accounting-formatted cell."""
+    return qb_rows + [[], ["Liabilities"], ["Accounts Payable", 10, "(20.50)", 30], [2100, 1.25, 2, None]]
+
+
+def write_csv(path, rows):
+    with open(path, "w", newline="") as fh:
+        csv.writer(fh).writerows([["" if val is None else val for val in row] for row in rows])
+    return path
+
+
+@pytest.fixture
+def expected(tmp_path, qb_rows):
+    path = write_workbook(tmp_path / "expected.xlsx", report_rows(qb_rows))
+    return loader.load_sheet(path, "Sheet1", reader="openpyxl")
+
+
+@pytest.mark.parametrize("name", EXCEL_READERS)
+def test_excel_readers_build_identical_frames(tmp_path, qb_rows, expected, name):
+    """Every backend that reads .xlsx produces exactly the openpyxl frame."""
+    if not readers.READERS[name].available():
+        pytest.skip(f"{name} reader is not installed")
+    path = write_workbook(tmp_path / "Balance Sheet by Month-2023.xlsx", report_rows(qb_rows))
+
+    df = loader.load_sheet(path, "Sheet1", reader=name)
+
+    pd.testing.assert_frame_equal(df, expected)
+    assert list(df.columns[1:]) == [datetime.date(2023, m, 1) for m in (1, 2, 3)]
+
+
+def test_csv_reader_builds_identical_frame(tmp_path, qb_rows, expected):
+    path = write_csv(tmp_path / "Balance Sheet by Month-2023.csv", report_rows(qb_rows))
+
+    pd.testing.assert_frame_equal(loader.load_bs(path), expected)
+
+
+def test_reader_for_picks_by_extension_and_override():
+    preferred = "calamine" if readers.CalamineReader.available() else "openpyxl"
+    assert readers.reader_for("a.xlsx").name == preferred
+    assert readers.reader_for("a.xlsx", "openpyxl").name == "openpyxl"
+    assert readers.reader_for("a.csv", "openpyxl").name == "csv"
+    with pytest.raises(ValueError):
+        readers.reader_for("a.pdf")
+    with pytest.raises(ValueError):
+        readers.reader_for("a.xlsx", "nope")
+
+
+@pytest.mark.parametrize("name", EXCEL_READERS)
+def test_excel_readers_keep_cell_positions(tmp_path, name):
+    """Data that doesn't start at A1 keeps its row and column positions."""
+    import openpyxl
+    if not readers.READERS[name].available():
+        pytest.skip(f"{name} reader is not installed")
+    wb = openpyxl.Workbook()
+    wb.active["C3"] = "Cash"
+    wb.active["D4"] = 2.5
+    wb.save(tmp_path / "offset.xlsx")
+
+    with readers.open_reader(tmp_path / "offset.xlsx", name) as reader:
+        rows = list(loader.trim_rows(reader.rows(0)))
+
+    assert rows == [(), (), (None, None, "Cash"), (None, None, None, 2.5)]
@@ -0,0 +1,81 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+
+from tb_processor import combiner, hierarchy, rollups
+
+MONTHS = [datetime.date(2022, m, 1) for m in range(1, 13)] + [datetime.date(2023, m, 1) for m in (1, 2, 4)]
+
+
+def test_capture_nests_sections_and_marks_totals():
+    labels = ["Assets", "Current Assets", "Cash", "AR", "Total Current Assets", "Land",
+              "Total Assets", "Net Income"]
+    has_values = np.array([False, False, True, True, True, True, True, True])
+
+    structure = hierarchy.capture(labels, has_values)
+
+    assert structure["sections"] == [["Assets", -1], ["Current Assets", 0]]
+    assert structure["rows"] == [0, 1, 1, 1, 1, 0, 0, -1]
+    assert structure["totals"] == [0, 0, 0, 0, 1, 0, 1, 0]
+
+
+def test_capture_keeps_blank_accounts_out_of_sections():
+    """A detail account without amounts and without a total row doesn't swallow the rows below it."""
+    labels = ["Assets", "Cash", "Petty Cash", "AR", "Total Assets", "Liabilities", "Loan",
+              "Total Liabilities"]
+    has_values = np.array([False, True, False, True, True, False, True, True])
+
+    structure = hierarchy.capture(labels, has_values)
+
+    assert structure["sections"] == [["Assets", -1], ["Liabilities", -1]]
+    assert structure["rows"] == [0, 0, 0, 0, 0, 1, 1, 1]
+    assert structure["totals"] == [0, 0, 0, 0, 1, 0, 0, 1]
+
+
+def frame(accounts, structure):
+    """A combined-looking frame where account i has amount i + 1 in every month."""
+    df = pd.DataFrame({"Account": accounts, **{m: np.arange(1.0, len(accounts) + 1) for m in MONTHS}})
+    df.attrs["hierarchy"] = structure
+    return df
+
+
+def test_subtotals_sum_nested_sections_without_reported_totals():
+    structure = hierarchy.capture(["Assets", "Current", "Cash", "Total Current", "Land", "Total Assets"],
+                                  np.array([False, False, True, True, True, True]))
+    df = frame(["Cash", "Total Current", "Land", "Total Assets"], hierarchy.subset(structure, [2, 3, 4, 5]))
+
+    totals = rollups.subtotals(df)
+
+    assert list(totals["Section"]) == ["Assets", "Assets / Current"]
+    assert list(totals[MONTHS[0]]) == [1.0 + 3.0, 1.0]
+
+
+def test_period_rollups_follow_the_calendar():
+    df = frame(["Sales", "Cash"], {"sections": [], "rows": [-1, -1], "totals": [0, 0]})
+
+    flows = rollups.quarterly(df, flows=True)
+    balances = rollups.quarterly(df, flows=False)
+    ytd = rollups.year_to_date(df)
+    t12 = rollups.trailing_twelve(df)
+
+    assert list(flows.columns[1:]) == ["2022 Q1", "2022 Q2", "2022 Q3", "2022 Q4", "2023 Q1", "2023 Q2"]
+    assert list(flows.iloc[0, 1:]) == [3.0, 3.0, 3.0, 3.0, 2.0, 1.0]
+    assert list(balances.iloc[1, 1:]) == [2.0] * 6
+    assert list(ytd.iloc[0, 1:]) == list(range(1, 13)) + [1, 2, 3]
+    # March 2023 is missing, so only Dec 2022 and Jan/Feb 2023 have twelve months on file
+    assert list(t12.columns[1:]) == MONTHS[11:14]
+    assert list(t12.iloc[0, 1:]) == [12.0, 12.0, 12.0]
+
+
+def test_combine_keeps_hierarchy_of_newest_file():
+    old = pd.DataFrame({"Account": ["Cash", "Loan"], MONTHS[0]: [1.0, 2.0]})
+    old.attrs["hierarchy"] = {"sections": [["Assets", -1]], "rows": [0, 0], "totals": [0, 0]}
+    new = pd.DataFrame({"Account": ["Loan", "Cash"], MONTHS[1]: [3.0, 4.0]})
+    new.attrs["hierarchy"] = {"sections": [["Assets", -1], ["Liabilities", -1]], "rows": [1, 0], "totals": [0, 0]}
+
+    for compact in (False, True):
+        combined = combiner.combine_monthly([old, new], compact)
+        structure = combined.attrs["hierarchy"]
+        sections = [structure["sections"][i][0] for i in structure["rows"]]
+        assert dict(zip(combined["Account"], sections)) == {"Cash": "Assets", "Loan": "Liabilities"}
@@ -0,0 +1,49 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+from tb_processor import config
+from tb_processor import server
+from tests.conftest import write_workbook, qb_rows_for_year
+
+
+@pytest.fixture
+def running(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "INPUT_DIR", str(tmp_path))
+    for year in (2022, 2023):
+        write_workbook(tmp_path / f"Balance Sheet by Month-{year}.xlsx", qb_rows_for_year(year))
+    httpd = server.TrialBalanceServer(("127.0.0.1", 0))
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def get(httpd, path, etag=None):
+    request = urllib.request.Request(f"http://127.0.0.1:{httpd.server_port}{path}",
+                                     headers={"If-None-Match": etag} if etag else {})
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status, response.headers["ETag"], json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, e.headers["ETag"], None
+
+
+def test_query_answers_from_memory_with_etags(running, tmp_path):
+    status, etag, body = get(running, "/query?account=Cash&from=2023-02&to=2023-03&statement=bs")
+
+    assert status == 200
+    assert [(row["period"], row["amount"]) for row in body["rows"]] == [("2023-02-01", 1100.5), ("2023-03-01", 1200.0)]
+    assert get(running, "/query?statement=bs&to=2023-03&from=2023-02&account=Cash", etag)[0] == 304
+    assert get(running, "/query?statement=xx")[0] == 400
+
+    # A changed source file gives a new state and new ETags once reloaded
+    write_workbook(tmp_path / "Balance Sheet by Month-2024.xlsx", qb_rows_for_year(2024))
+    running.reload()
+    status, new_etag, body = get(running, "/query?account=Cash&from=2023-02&to=2023-03&statement=bs")
+    assert status == 200 and new_etag != etag
+    assert get(running, "/status")[2]["files"] == 3
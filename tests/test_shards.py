@@ -0,0 +1,102 @@
+import datetime
+import threading
+
+import pandas as pd
+import pytest
+
+from tb_processor import shards, writers
+
+JAN = datetime.date(2023, 1, 1)
+
+
+def _frame(amount):
+    return pd.DataFrame({"Unnamed: 0": ["Cash", "AR"], JAN: [amount, 2.0]})
+
+
+def _publish(output, group, amount, rollups=False):
+    with shards.open_output("xlsx", output, group) as writer:
+        writer.write(group, _frame(amount))
+        if rollups:
+            writer.write(f"{group} Quarterly", _frame(amount))
+
+
+def test_statements_replace_only_their_own_sheets(tmp_path):
+    """Each statement's run keeps the other's sheets and drops its own rollups when they stop."""
+    output = tmp_path / "tb_full.xlsx"
+    _publish(output, "Income Statement", 1.0, rollups=True)
+    _publish(output, "Balance Sheet", 2.0)
+    assert list(pd.read_excel(output, sheet_name=None)) == [
+        "Balance Sheet", "Income Statement", "Income Statement Quarterly"]
+
+    _publish(output, "Income Statement", 3.0)
+
+    written = pd.read_excel(output, sheet_name=None)
+    assert list(written) == ["Balance Sheet", "Income Statement"]
+    assert written["Balance Sheet"].iloc[0, 1] == 2.0
+    assert written["Income Statement"].iloc[0, 1] == 3.0
+    assert len(shards.ShardIndex(output).entries) == 2
+    assert not list(tmp_path.glob(".*tmp*"))
+
+
+def test_concurrent_runs_keep_both_statements(tmp_path):
+    """Runs publishing at the same time take turns, and the last of each statement wins."""
+    output = tmp_path / "tb_full.xlsx"
+    threads = [threading.Thread(target=_publish, args=(output, group, float(n)))
+               for n in range(4) for group in ("Balance Sheet", "Income Statement")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    written = pd.read_excel(output, sheet_name=None)
+    assert list(written) == ["Balance Sheet", "Income Statement"]
+    assert shards.ShardIndex(output).valid
+
+
+def test_workbook_without_shards_is_adopted(tmp_path):
+    """A workbook from an earlier version keeps its other sheets, with date columns intact."""
+    output = tmp_path / "tb_full.xlsx"
+    with writers.open_writer("xlsx", output) as writer:
+        writer.write("Balance Sheet", _frame(5.5))
+
+    _publish(output, "Income Statement", 1.0)
+
+    index = shards.ShardIndex(output)
+    assert [entry["sheet"] for entry in index.entries] == ["Balance Sheet", "Income Statement"]
+    pd.testing.assert_frame_equal(index.read(index.entries[0]), _frame(5.5), check_dtype=False)
+
+
+def test_failed_write_keeps_previous_output(tmp_path):
+    """An error while writing leaves the last complete workbook and no stray shards."""
+    output = tmp_path / "tb_full.xlsx"
+    _publish(output, "Balance Sheet", 1.0)
+    before = output.read_bytes()
+
+    with pytest.raises(RuntimeError):
+        with shards.open_output("xlsx", output, "Balance Sheet") as writer:
+            writer.write("Balance Sheet", _frame(9.0))
+            raise RuntimeError("load failed")
+
+    assert output.read_bytes() == before
+    assert len(list(shards.shard_dir(output).glob("balance_sheet-*"))) == 1
+
+
+def test_windows_lock_gives_up_with_a_clear_error(tmp_path, monkeypatch):
+    """When msvcrt keeps failing to lock, the run stops instead of retrying forever."""
+    attempts = []
+
+    class Msvcrt:
+        LK_LOCK = LK_UNLCK = 0
+
+        @staticmethod
+        def locking(fd, mode, size):
+            attempts.append(mode)
+            raise OSError("locked")
+
+    monkeypatch.setattr(shards, "fcntl", None)
+    monkeypatch.setattr(shards, "msvcrt", Msvcrt, raising=False)
+
+    with pytest.raises(TimeoutError, match="locked by another run"):
+        with shards.output_lock(tmp_path / "tb_full.xlsx"):
+            pass
+    assert len(attempts) == shards.LOCK_ATTEMPTS
@@ -0,0 +1,45 @@
+import zipfile
+
+import pandas as pd
+
+from tb_processor import cache, combiner, file_utils, loader, sources
+from tests.conftest import qb_rows_for_year, write_workbook
+
+
+def _archive(tmp_path):
+    """A zip holding two years of balance sheets in a subfolder, plus an unrelated file."""
+    archive = tmp_path / "month-end.zip"
+    with zipfile.ZipFile(archive, "w") as zf:
+        for year in (2023, 2022):
+            name = f"Balance Sheet by Month-{year}.xlsx"
+            path = write_workbook(tmp_path / name, qb_rows_for_year(year))
+            zf.write(path, f"exports/{name}")
+        zf.writestr("exports/notes.txt", "not a report")
+    return archive
+
+
+def test_archive_members_are_found_and_combined(tmp_path):
+    """Reports inside a zip are discovered, loaded in workers and cached without extracting."""
+    archive = _archive(tmp_path)
+
+    files = file_utils.find_monthly_files("Balance Sheet by Month-yyyy-mm.xlsx", archive)
+
+    assert [f.member for f in files] == ["exports/Balance Sheet by Month-2022.xlsx",
+                                         "exports/Balance Sheet by Month-2023.xlsx"]
+    expected = combiner.combine_all_bs([tmp_path / f.name for f in files])
+    pd.testing.assert_frame_equal(combiner.combine_all_bs(files, jobs=2), expected)
+
+    store = cache.ParsedFileCache(tmp_path / "cache")
+    combiner.combine_all_bs(files, cache=store)
+    pd.testing.assert_frame_equal(combiner.combine_all_bs(files, cache=store), expected)
+    assert store.hits == 2
+
+
+def test_load_from_bytes_matches_file(tmp_path, qb_rows):
+    """A workbook already in memory loads exactly like the file it came from."""
+    path = write_workbook(tmp_path / "Balance Sheet by Month-2023.xlsx", qb_rows)
+
+    df = loader.load_bs(path.read_bytes())
+
+    pd.testing.assert_frame_equal(df, loader.load_bs(path))
+    assert sources.as_source(path.read_bytes()).suffix == ".xlsx"
@@ -0,0 +1,10 @@
+from benchmarks import startup
+
+
+def test_info_and_help_do_not_import_pandas(tmp_path):
+    """tb info and tb --help only need click and the standard library."""
+    for command in startup.COMMANDS:
+        times = startup.import_times(command, cwd=tmp_path)
+
+        assert "tb_processor.file_utils" in times
+        assert startup.heavy_imports(times) == []
@@ -0,0 +1,56 @@
+import datetime
+
+import pandas as pd
+
+from tb_processor import combiner
+from tb_processor import store
+
+JAN = datetime.date(2023, 1, 1)
+FEB = datetime.date(2023, 2, 1)
+MAR = datetime.date(2023, 3, 1)
+
+
+def sample_sheet():
+    return pd.DataFrame({"Account": ["Cash", "Other", "Other"], JAN: [1.0, 2.0, 3.0],
+                         FEB: [4.0, 5.0, 6.0], MAR: [7.0, 8.0, 9.5]})
+
+
+def test_store_query_by_account_and_period(tmp_path):
+    """Saved sheets come back in long format, filtered by account and inclusive period range."""
+    with store.TrialBalanceStore(tmp_path / "tb.sqlite") as trial_balances:
+        assert trial_balances.save("acme", "Balance Sheet", sample_sheet()) == 9
+        result = trial_balances.query(accounts=["Other"], start="2023-02", end="2023-03")
+
+    assert list(result.columns) == store.COLUMNS
+    assert list(result["period"]) == [FEB, MAR, FEB, MAR]
+    assert list(result["occurrence"]) == [0, 0, 1, 1]
+    assert list(result["amount"]) == [5.0, 8.0, 6.0, 9.5]
+
+
+def test_store_save_replaces_sheet_and_keeps_other_entities(tmp_path):
+    """Saving a sheet again replaces its rows; other entities and statements stay."""
+    path = tmp_path / "tb.sqlite"
+    with store.TrialBalanceStore(path) as trial_balances:
+        trial_balances.save("acme", "Balance Sheet", sample_sheet())
+        trial_balances.save("globex", "Balance Sheet", sample_sheet())
+        trial_balances.save("acme", "Balance Sheet", sample_sheet().iloc[:1])
+
+    with store.TrialBalanceStore(path) as trial_balances:
+        assert trial_balances.entities() == ["acme", "globex"]
+        acme = trial_balances.query(entity="acme", statement="bs")
+        wide = store.pivot(trial_balances.query(entity="globex"))
+
+    assert len(acme) == 3
+    expected = sample_sheet()
+    pd.testing.assert_frame_equal(wide[["account", JAN, FEB, MAR]].rename(columns={"account": "Account"}),
+                                  expected, check_dtype=False)
+
+
+def test_store_accepts_compact_frames(tmp_path):
+    """Compact combines are stored with their exported values."""
+    combined = combiner.combine_monthly([sample_sheet()], compact=True)
+    with store.TrialBalanceStore(tmp_path / "tb.sqlite") as trial_balances:
+        trial_balances.save("acme", "Balance Sheet", combined)
+        result = trial_balances.query(accounts=["Other"], start=MAR, end=MAR)
+
+    assert list(result["amount"]) == [8.0, 9.5]
@@ -0,0 +1,28 @@
+import datetime
+
+from benchmarks import bench, synthetic
+from tb_processor import file_utils, loader
+
+
+def test_generated_files_load_like_real_exports(tmp_path):
+    """Generated files are found, ordered and parsed with every account kept."""
+    synthetic.generate(tmp_path, [2022, 2023], accounts=30, preamble_rows=5, trailing_format_rows=200)
+
+    bs_files = sorted(tmp_path.glob("Balance Sheet by Month-*.xlsx"), key=file_utils.extract_date)
+    df = loader.load_bs(bs_files[-1])
+
+    assert [f.name for f in bs_files] == ["Balance Sheet by Month-2022.xlsx", "Balance Sheet by Month-2023.xlsx"]
+    assert list(df.columns[1:]) == [datetime.date(2023, m, 1) for m in range(1, 13)]
+    # 30 accounts plus one "Total ..." row per section
+    assert len(df) == 30 + len(synthetic.BS_SECTIONS)
+
+
+def test_compare_flags_slowdowns_and_changed_results():
+    """Slower runs and different checksums are reported, noise is not."""
+    baseline = {"case": {"seconds": 1.0, "peak_bytes": 10_000_000, "checksum": {"total": 1.0}}}
+
+    assert bench.compare({"case": {"seconds": 1.1, "peak_bytes": 10_000_000, "checksum": {"total": 1.0}}},
+                         baseline, 0.5, 0.05) == []
+    problems = bench.compare({"case": {"seconds": 2.0, "peak_bytes": 10_000_000, "checksum": {"total": 2.0}}},
+                             baseline, 0.5, 0.05)
+    assert len(problems) == 2
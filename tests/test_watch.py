@@ -0,0 +1,30 @@
+import os
+
+from tb_processor import config
+from tb_processor import watch
+from tests.conftest import write_workbook, qb_rows_for_year
+
+
+def test_watcher_reloads_only_changed_files(tmp_path, monkeypatch, capsys):
+    """After the first build, only added or modified files are parsed again."""
+    monkeypatch.setattr(config, "INPUT_DIR", str(tmp_path))
+    monkeypatch.setattr(config, "OUTPUT_FILE", str(tmp_path / "out" / "tb_full.xlsx"))
+    for year in (2021, 2022):
+        write_workbook(tmp_path / f"Balance Sheet by Month-{year}.xlsx", qb_rows_for_year(year))
+
+    watcher = watch.Watcher("csv")
+    assert watcher.update(watch.scan())
+    assert capsys.readouterr().out.count("Loading") == 2
+
+    assert not watcher.update(watch.scan())
+
+    write_workbook(tmp_path / "Balance Sheet by Month-2023.xlsx", qb_rows_for_year(2023))
+    os.remove(tmp_path / "Balance Sheet by Month-2021.xlsx")
+    assert watcher.update(watch.scan())
+
+    out = capsys.readouterr().out
+    assert out.count("Loading") == 1
+    assert "1 added, 0 modified, 1 deleted" in out
+    combined = watcher.combined["Balance Sheet"]
+    assert [col.year for col in combined.columns[1:]] == [2022] * 3 + [2023] * 3
+    assert (tmp_path / "out" / "tb_full_balance_sheet.csv").exists()
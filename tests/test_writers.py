@@ -0,0 +1,67 @@
+import datetime
+import sys
+
+import openpyxl
+import pandas as pd
+import pytest
+
+from tb_processor import writers
+
+JAN = datetime.date(2023, 1, 1)
+FEB = datetime.date(2023, 2, 1)
+
+
+def _frame():
+    return pd.DataFrame({"Unnamed: 0": ["AR", "Cash"], JAN: [200.0, 100.0], FEB: [0.0, 150.5]})
+
+
+def test_xlsx_writer_matches_pandas_output(tmp_path):
+    """The streaming workbook reads back like the one pandas used to write."""
+    df = _frame()
+    expected_path = tmp_path / "expected.xlsx"
+    with pd.ExcelWriter(expected_path, engine="openpyxl") as writer:
+        df.to_excel(writer, sheet_name="Balance Sheet", index=False)
+
+    with writers.BackgroundWriter(writers.open_writer("xlsx", tmp_path / "tb_full.xlsx")) as writer:
+        writer.write("Balance Sheet", df)
+        writer.write("Income Statement", df)
+
+    written = pd.read_excel(tmp_path / "tb_full.xlsx", sheet_name=None)
+    assert list(written) == ["Balance Sheet", "Income Statement"]
+    pd.testing.assert_frame_equal(written["Balance Sheet"],
+                                  pd.read_excel(expected_path, sheet_name="Balance Sheet"))
+
+
+@pytest.mark.parametrize("backend", ["xlsxwriter", "openpyxl"])
+def test_xlsx_header_cells_look_like_pandas(tmp_path, monkeypatch, backend):
+    """Month headers are formatted as dates and every header cell is bold and bordered, as pandas writes them."""
+    if backend == "openpyxl":
+        monkeypatch.setitem(sys.modules, "xlsxwriter", None)
+    else:
+        pytest.importorskip("xlsxwriter")
+    with writers.open_writer("xlsx", tmp_path / "tb_full.xlsx") as writer:
+        writer.write("Balance Sheet", _frame())
+
+    account, month = openpyxl.load_workbook(tmp_path / "tb_full.xlsx")["Balance Sheet"][1][:2]
+    assert month.number_format == "YYYY-MM-DD"
+    assert account.number_format == "General"
+    for cell in (account, month):
+        assert cell.font.b
+        assert cell.border.left.style == cell.border.top.style == "thin"
+        assert (cell.alignment.horizontal, cell.alignment.vertical) == ("center", "top")
+
+
+@pytest.mark.parametrize("fmt", ["csv", "parquet", "arrow"])
+def test_columnar_writers_write_one_file_per_sheet(tmp_path, fmt):
+    """Columnar formats get one file per sheet with ISO date column names."""
+    if fmt != "csv":
+        pytest.importorskip("pyarrow")
+    with writers.open_writer(fmt, tmp_path / "tb_full.xlsx") as writer:
+        writer.write("Balance Sheet", _frame())
+
+    path = tmp_path / f"tb_full_balance_sheet.{fmt}"
+    assert writer.paths == [path]
+    read = {"csv": pd.read_csv, "parquet": pd.read_parquet, "arrow": pd.read_feather}[fmt]
+    df = read(path)
+    assert list(df.columns) == ["Unnamed: 0", "2023-01-01", "2023-02-01"]
+    assert df["2023-02-01"].tolist() == [0.0, 150.5]